@@ -0,0 +1,15 @@
+from django.contrib import admin
+from .models import Blob, UploadSession
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'content_type', 'size', 'derivative_status', 'created_at')
+    list_filter = ('content_type', 'derivative_status')
+    search_fields = ('sha256',)
+    date_hierarchy = 'created_at'
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'user', 'size', 'offset', 'blob', 'created_at')
+    search_fields = ('file_name', 'user__email')
+    date_hierarchy = 'created_at'
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from attachments.models import Blob
+from attachments.storage import generate_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Render thumbnails and previews for image blobs still pending, e.g. after a worker restart'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry blobs that failed before')
+
+    def handle(self, *args, **options):
+        statuses = ['pending', 'failed'] if options['retry_failed'] else ['pending']
+        done = 0
+        for blob in Blob.objects.filter(derivative_status__in=statuses).iterator():
+            generate_derivatives(blob)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} blobs'))
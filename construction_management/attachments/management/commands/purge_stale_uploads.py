@@ -0,0 +1,25 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from attachments.models import UploadSession
+from attachments.storage import upload_part_path
+
+
+class Command(BaseCommand):
+    help = 'Delete upload sessions left unfinished for longer than ATTACHMENT_UPLOAD_TTL, with their partial files'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=settings.ATTACHMENT_UPLOAD_TTL)
+        stale = UploadSession.objects.filter(blob__isnull=True, updated_at__lt=cutoff)
+        removed = 0
+        for session in stale.only('pk').iterator():
+            path = upload_part_path(session)
+            if os.path.exists(path):
+                os.remove(path)
+            removed += 1
+        stale.delete()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} stale upload sessions'))
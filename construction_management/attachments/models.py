@@ -0,0 +1,63 @@
+import uuid
+from django.conf import settings
+from django.db import models
+
+
+class Blob(models.Model):
+    """Model for a stored file, kept once per distinct content hash"""
+    DERIVATIVE_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+        ('none', 'Not an image'),
+    ]
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100)
+    file = models.FileField(max_length=200)
+    thumbnail = models.FileField(max_length=200, blank=True)
+    preview = models.FileField(max_length=200, blank=True)
+    derivative_status = models.CharField(
+        max_length=10,
+        choices=DERIVATIVE_STATUS_CHOICES,
+        default='pending'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.content_type})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['derivative_status'], name='blob_derivative_status_idx'),
+        ]
+
+
+class UploadSession(models.Model):
+    """Model for a resumable upload that is sent in chunks"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    file_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload_sessions'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload of {self.file_name} ({self.offset}/{self.size})"
+
+    class Meta:
+        ordering = ['-created_at']
@@ -0,0 +1,27 @@
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from transactions.models import TransactionAttachment
+from users.models import UserProfile
+from .storage import ingest
+
+
+def _store_once(instance, field_name):
+    """Route a newly assigned file through the content-addressed store"""
+    field_file = getattr(instance, field_name)
+    if not field_file or field_file._committed:
+        return
+    blob, _ = ingest(field_file.file)
+    field_file.name = blob.file.name
+    field_file._committed = True
+    instance.blob = blob
+
+
+@receiver(pre_save, sender=TransactionAttachment)
+def store_transaction_attachment(sender, instance, **kwargs):
+    _store_once(instance, 'file')
+
+
+@receiver(pre_save, sender=UserProfile)
+def store_profile_picture(sender, instance, **kwargs):
+    _store_once(instance, 'profile_picture')
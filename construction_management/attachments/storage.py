@@ -0,0 +1,181 @@
+"""Content-addressed attachment storage.
+
+Files are stored once under their SHA-256 (blobs/ab/cd/<hash>.<ext>), so a
+receipt photo uploaded twice costs one copy on disk; each attachment row
+points its file field at the shared name. Thumbnails and previews are
+generated after commit in a small thread pool so uploads return as soon
+as the bytes are stored.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from PIL import Image, ImageOps
+
+from .models import Blob
+
+logger = logging.getLogger(__name__)
+
+# Magic bytes -> content type for the formats receipts and photos arrive in
+SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+EXTENSIONS = {
+    'application/pdf': 'pdf',
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+ALLOWED_CONTENT_TYPES = frozenset(EXTENSIONS)
+DERIVATIVE_SIZES = {
+    'thumbnail': (320, 320),
+    'preview': (1600, 1600),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class AttachmentError(ValueError):
+    """Raised for uploads the pipeline refuses to store"""
+
+
+def sniff_content_type(head):
+    """Identify a file from its first bytes; unknown content is octet-stream"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return 'application/octet-stream'
+
+
+def blob_name(sha256, content_type):
+    extension = EXTENSIONS.get(content_type, 'bin')
+    return f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}.{extension}'
+
+
+class _LocalFile(File):
+    """A file already on local disk, which FileSystemStorage moves instead of copying"""
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def ingest(file):
+    """Store a file's bytes once and return (blob, created).
+
+    Accepts any django File (including uploads). The content is hashed in
+    chunks; when a blob with the same hash exists it is returned and
+    nothing is written.
+    """
+    digest = hashlib.sha256()
+    head = b''
+    size = 0
+    file.seek(0)
+    for chunk in file.chunks():
+        if len(head) < 16:
+            head += chunk[:16 - len(head)]
+        digest.update(chunk)
+        size += len(chunk)
+    sha256 = digest.hexdigest()
+
+    blob = Blob.objects.filter(sha256=sha256).first()
+    if blob is not None:
+        return blob, False
+
+    content_type = sniff_content_type(head)
+    name = blob_name(sha256, content_type)
+    # A leftover from an interrupted ingest already holds these exact bytes
+    if not default_storage.exists(name):
+        file.seek(0)
+        saved = default_storage.save(name, file)
+        if saved != name:
+            # A concurrent writer stored the same bytes first
+            default_storage.delete(saved)
+    try:
+        with transaction.atomic():
+            blob = Blob.objects.create(
+                sha256=sha256, size=size, content_type=content_type, file=name,
+                derivative_status='pending' if content_type.startswith('image/') else 'none',
+            )
+    except IntegrityError:
+        # Someone ingested the same bytes concurrently; theirs wins
+        return Blob.objects.get(sha256=sha256), False
+    if blob.derivative_status == 'pending':
+        transaction.on_commit(lambda: schedule_derivatives(blob.pk))
+    return blob, True
+
+
+def ingest_path(path):
+    """Ingest a local file, moving it into the store rather than copying"""
+    with open(path, 'rb') as f:
+        blob, created = ingest(_LocalFile(f, name=path))
+    if os.path.exists(path):
+        os.remove(path)
+    return blob, created
+
+
+def generate_derivatives(blob):
+    """Render the thumbnail and preview JPEGs for an image blob"""
+    try:
+        with blob.file.open('rb') as f, Image.open(f) as image:
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            for field, size in DERIVATIVE_SIZES.items():
+                copy = image.copy()
+                copy.thumbnail(size)
+                buffer = io.BytesIO()
+                copy.save(buffer, 'JPEG', quality=80, optimize=True)
+                name = f'blobs/derived/{blob.sha256}-{field}.jpg'
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+                setattr(blob, field, default_storage.save(name, ContentFile(buffer.getvalue())))
+        blob.derivative_status = 'ready'
+    except (OSError, Image.DecompressionBombError):
+        logger.warning("Could not render derivatives for blob %s", blob.sha256, exc_info=True)
+        blob.derivative_status = 'failed'
+    blob.save(update_fields=['thumbnail', 'preview', 'derivative_status'])
+
+
+def _generate_in_worker(blob_id):
+    try:
+        blob = Blob.objects.filter(pk=blob_id).first()
+        if blob is not None:
+            generate_derivatives(blob)
+    except Exception:
+        logger.exception("Derivative generation failed for blob %s", blob_id)
+    finally:
+        connection.close()
+
+
+def schedule_derivatives(blob_id):
+    """Queue derivative generation; ATTACHMENT_WORKERS = 0 runs it inline"""
+    workers = getattr(settings, 'ATTACHMENT_WORKERS', 2)
+    if workers <= 0:
+        blob = Blob.objects.filter(pk=blob_id).first()
+        if blob is not None:
+            generate_derivatives(blob)
+        return
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='attachments')
+    _executor.submit(_generate_in_worker, blob_id)
+
+
+def upload_part_path(session):
+    """Where the bytes received so far for an upload session are kept"""
+    return os.path.join(settings.ATTACHMENT_UPLOAD_DIR, f'{session.pk}.part')
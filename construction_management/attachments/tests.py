@@ -0,0 +1,183 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from transactions.models import FinancialTransaction, TransactionAttachment
+from users.models import UserProfile
+from .models import Blob, UploadSession
+
+
+def jpeg_bytes(size=(800, 600), color=(200, 80, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class AttachmentPipelineTests(TestCase):
+    """Tests for chunked uploads, dedup, derivatives and ranged downloads"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.upload_dir = tempfile.mkdtemp()
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, ATTACHMENT_UPLOAD_DIR=self.upload_dir,
+            ATTACHMENT_WORKERS=0, ATTACHMENT_CHUNK_SIZE=4096,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        self.addCleanup(shutil.rmtree, self.upload_dir, True)
+        self.user = get_user_model().objects.create_user(
+            email='accounts@example.com', password='test-pass-123'
+        )
+        self.client.force_login(self.user)
+
+    def upload(self, content, name='receipt.jpg'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('attachments:attachment_upload'), {
+                'file': SimpleUploadedFile(name, content),
+            })
+
+    def put_chunk(self, session_id, content, start, total):
+        return self.client.put(
+            reverse('attachments:upload_session_detail', args=[session_id]), content,
+            content_type='application/octet-stream',
+            headers={'Content-Range': f'bytes {start}-{start + len(content) - 1}/{total}'},
+        )
+
+    def test_chunked_upload_resumes_from_offset(self):
+        content = jpeg_bytes(size=(1200, 900))
+        created = self.client.post(
+            reverse('attachments:upload_session_create'),
+            {'file_name': 'site.jpg', 'size': len(content)}, content_type='application/json',
+        ).json()
+        self.assertEqual(self.put_chunk(created['id'], content[:4096], 0, len(content)).json()['offset'], 4096)
+
+        skipped = self.put_chunk(created['id'], content[8192:12288], 8192, len(content))
+        self.assertEqual(skipped.status_code, 409)
+        resume = self.client.get(reverse('attachments:upload_session_detail', args=[created['id']])).json()
+        self.assertEqual(resume['offset'], 4096)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for start in range(4096, len(content), 4096):
+                response = self.put_chunk(created['id'], content[start:start + 4096], start, len(content))
+        self.assertEqual(response.status_code, 201)
+        blob = Blob.objects.get()
+        self.assertEqual(response.json()['blob']['sha256'], blob.sha256)
+        with blob.file.open('rb') as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+        self.assertEqual(UploadSession.objects.get().blob, blob)
+
+    def test_oversized_chunks_and_unsupported_types_are_refused(self):
+        session = UploadSession.objects.create(user=self.user, file_name='x.bin', size=10000)
+        open(os.path.join(self.upload_dir, f'{session.pk}.part'), 'wb').close()
+        self.assertEqual(self.put_chunk(session.pk, b'x' * 5000, 0, 10000).status_code, 413)
+        self.assertEqual(self.put_chunk(session.pk, b'MZ' + b'x' * 100, 0, 10000).status_code, 415)
+        self.assertEqual(self.upload(b'#!/bin/sh\necho hi\n', name='run.sh').status_code, 415)
+
+    def test_identical_uploads_share_one_stored_file(self):
+        content = jpeg_bytes()
+        first = self.upload(content)
+        second = self.upload(content, name='same-receipt-again.jpg')
+        self.assertEqual((first.status_code, second.status_code), (201, 200))
+        self.assertEqual(Blob.objects.count(), 1)
+        stored = [f for _, _, files in os.walk(os.path.join(self.media_root, 'blobs')) for f in files]
+        # The original plus its thumbnail and preview
+        self.assertEqual(len(stored), 3)
+
+        transaction = FinancialTransaction.objects.create(
+            transaction_type='expense', amount=Decimal('10.00'), date=date(2024, 3, 1),
+            description='Cement', payment_method='cash',
+        )
+        url = reverse('transactions:transaction_attachment_api', args=[transaction.pk])
+        for _ in range(2):
+            self.client.post(url, {'blob': first.json()['sha256']}, content_type='application/json')
+        names = set(TransactionAttachment.objects.values_list('file', flat=True))
+        self.assertEqual(names, {Blob.objects.get().file.name})
+
+    def test_model_uploads_are_deduplicated_on_save(self):
+        transaction = FinancialTransaction.objects.create(
+            transaction_type='expense', amount=Decimal('10.00'), date=date(2024, 3, 1),
+            description='Cement', payment_method='cash',
+        )
+        content = jpeg_bytes()
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ('a.jpg', 'b.jpg'):
+                TransactionAttachment.objects.create(
+                    transaction=transaction, file=SimpleUploadedFile(name, content)
+                )
+        attachments = list(TransactionAttachment.objects.all())
+        self.assertEqual(attachments[0].file.name, attachments[1].file.name)
+        self.assertEqual(attachments[0].blob_id, attachments[1].blob_id)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'transaction_attachments')))
+
+    def test_thumbnails_are_rendered_for_images(self):
+        sha256 = self.upload(jpeg_bytes(size=(2400, 1200))).json()['sha256']
+        blob = Blob.objects.get(sha256=sha256)
+        self.assertEqual(blob.derivative_status, 'ready')
+        with blob.thumbnail.open('rb') as f, Image.open(f) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 160))
+        response = self.client.get(reverse('attachments:blob_variant', args=[sha256, 'preview']))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        pdf = self.upload(b'%PDF-1.4\n%test\n', name='invoice.pdf').json()
+        self.assertEqual(pdf['derivative_status'], 'none')
+
+    def test_downloads_honour_range_requests(self):
+        content = jpeg_bytes()
+        sha256 = self.upload(content).json()['sha256']
+        url = reverse('attachments:blob_download', args=[sha256])
+
+        partial = self.client.get(url, headers={'Range': 'bytes=10-19'})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(b''.join(partial.streaming_content), content[10:20])
+        self.assertEqual(partial['Content-Range'], f'bytes 10-19/{len(content)}')
+
+        tail = self.client.get(url, headers={'Range': 'bytes=-5'})
+        self.assertEqual(b''.join(tail.streaming_content), content[-5:])
+
+        self.assertEqual(self.client.get(url, headers={'Range': f'bytes={len(content)}-'}).status_code, 416)
+        full = self.client.get(url)
+        self.assertEqual((full.status_code, full['Accept-Ranges']), (200, 'bytes'))
+        cached = self.client.get(url, headers={'If-None-Match': full['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_downloads_are_limited_to_blobs_the_user_can_see(self):
+        sha256 = self.upload(jpeg_bytes()).json()['sha256']
+        url = reverse('attachments:blob_download', args=[sha256])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        other = get_user_model().objects.create_user(email='site@example.com', password='test-pass-123')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(reverse('attachments:blob_download', args=['0' * 64])).status_code, 404)
+
+        # Another user's profile picture stays private
+        UserProfile.objects.create(user=self.user, blob=Blob.objects.get())
+        self.assertEqual(self.client.get(url).status_code, 404)
+        UserProfile.objects.create(user=other, blob=Blob.objects.get())
+        self.assertEqual(self.client.get(url).status_code, 200)
+        UserProfile.objects.filter(user=other).delete()
+
+        # Nor can a hash the user can't see be attached to gain access
+        transaction = FinancialTransaction.objects.create(
+            transaction_type='expense', amount=Decimal('10.00'), date=date(2024, 3, 1),
+            description='Cement', payment_method='cash',
+        )
+        attach = reverse('transactions:transaction_attachment_api', args=[transaction.pk])
+        response = self.client.post(attach, {'blob': sha256}, content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        self.client.force_login(self.user)
+        self.client.post(attach, {'blob': sha256}, content_type='application/json')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 200)
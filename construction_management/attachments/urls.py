@@ -0,0 +1,12 @@
+from django.urls import path
+from . import views
+
+app_name = 'attachments'
+
+urlpatterns = [
+    path('', views.attachment_upload, name='attachment_upload'),
+    path('uploads/', views.upload_session_create, name='upload_session_create'),
+    path('uploads/<uuid:pk>/', views.upload_session_detail, name='upload_session_detail'),
+    path('<str:sha256>/', views.blob_download, name='blob_download'),
+    path('<str:sha256>/<str:variant>/', views.blob_download, name='blob_variant'),
+]
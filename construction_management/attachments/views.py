@@ -0,0 +1,177 @@
+import json
+import os
+import re
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
+
+from construction_management.delivery import serve_file
+from .models import Blob, UploadSession
+from .storage import ALLOWED_CONTENT_TYPES, ingest, ingest_path, sniff_content_type, upload_part_path
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+COPY_BLOCK_SIZE = 64 * 1024
+DOWNLOAD_VARIANTS = ('file', 'thumbnail', 'preview')
+
+
+def blob_json(blob):
+    """Serialize a blob with the URLs it can be fetched from"""
+    data = {
+        'sha256': blob.sha256,
+        'size': blob.size,
+        'content_type': blob.content_type,
+        'url': reverse('attachments:blob_download', args=[blob.sha256]),
+        'derivative_status': blob.derivative_status,
+    }
+    for variant in ('thumbnail', 'preview'):
+        if getattr(blob, variant):
+            data[f'{variant}_url'] = reverse('attachments:blob_variant', args=[blob.sha256, variant])
+    return data
+
+
+def visible_blobs(user):
+    """Blobs a user may download: transaction attachments, their own uploads and profile picture"""
+    return Blob.objects.filter(
+        Q(transaction_attachments__isnull=False) | Q(upload_sessions__user=user) | Q(profiles__user=user)
+    ).distinct()
+
+
+def _unsupported(content_type):
+    return JsonResponse({'error': f'Unsupported file type {content_type}; upload an image or PDF'}, status=415)
+
+
+def _too_large():
+    return JsonResponse({'error': f'Files are limited to {settings.ATTACHMENT_MAX_SIZE} bytes'}, status=413)
+
+
+@login_required
+@require_POST
+def attachment_upload(request):
+    """API view to store a small file in one multipart request"""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'A "file" upload is required'}, status=400)
+    if upload.size > settings.ATTACHMENT_MAX_SIZE:
+        return _too_large()
+    content_type = sniff_content_type(upload.read(16))
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        return _unsupported(content_type)
+    blob, created = ingest(upload)
+    # Recorded as a finished upload session so the uploader can fetch it back
+    UploadSession.objects.create(
+        user=request.user, file_name=upload.name[:255], size=upload.size, offset=upload.size, blob=blob
+    )
+    return JsonResponse(blob_json(blob), status=201 if created else 200)
+
+
+@login_required
+@require_POST
+def upload_session_create(request):
+    """API view to start a resumable upload of file_name and size bytes"""
+    try:
+        data = json.loads(request.body)
+        file_name, size = str(data['file_name'])[:255], int(data['size'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'A JSON body with "file_name" and "size" is required'}, status=400)
+    if size <= 0:
+        return JsonResponse({'error': '"size" must be positive'}, status=400)
+    if size > settings.ATTACHMENT_MAX_SIZE:
+        return _too_large()
+    session = UploadSession.objects.create(user=request.user, file_name=file_name, size=size)
+    os.makedirs(settings.ATTACHMENT_UPLOAD_DIR, exist_ok=True)
+    open(upload_part_path(session), 'wb').close()
+    response = JsonResponse(_session_json(session), status=201)
+    response['Location'] = reverse('attachments:upload_session_detail', args=[session.pk])
+    return response
+
+
+def _session_json(session):
+    data = {
+        'id': str(session.pk),
+        'file_name': session.file_name,
+        'size': session.size,
+        'offset': session.offset,
+        'chunk_size': settings.ATTACHMENT_CHUNK_SIZE,
+    }
+    if session.blob_id:
+        data['blob'] = blob_json(session.blob)
+    return data
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PUT'])
+def upload_session_detail(request, pk):
+    """API view to report or extend a resumable upload.
+
+    GET returns the offset to resume from. PUT appends one chunk, sent as
+    the raw body with ``Content-Range: bytes start-end/size``; the chunk
+    must start at the current offset. The final chunk stores the file and
+    returns its blob.
+    """
+    session = get_object_or_404(UploadSession.objects.select_related('blob'), pk=pk, user=request.user)
+    if request.method != 'PUT':
+        return JsonResponse(_session_json(session))
+
+    match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+    if not match:
+        return JsonResponse({'error': 'Content-Range: bytes start-end/size is required'}, status=400)
+    start, end, total = map(int, match.groups())
+    length = end - start + 1
+    if total != session.size or end >= total or length <= 0:
+        return JsonResponse({'error': 'Content-Range does not fit this upload'}, status=400)
+    if length > settings.ATTACHMENT_CHUNK_SIZE:
+        return JsonResponse({'error': f'Chunks are limited to {settings.ATTACHMENT_CHUNK_SIZE} bytes'}, status=413)
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.blob_id or start != session.offset:
+            return JsonResponse({'error': 'Chunk does not start at the upload offset', **_session_json(session)},
+                                status=409)
+        path = upload_part_path(session)
+        received = 0
+        # Stream the body to disk; request.body would hold the chunk in memory
+        with open(path, 'r+b') as part:
+            part.seek(start)
+            while received < length:
+                block = request.read(min(COPY_BLOCK_SIZE, length - received))
+                if not block:
+                    break
+                part.write(block)
+                received += len(block)
+            if received != length:
+                part.truncate(start)
+                return JsonResponse({'error': 'Chunk body is shorter than its Content-Range'}, status=400)
+            if start == 0:
+                part.seek(0)
+                content_type = sniff_content_type(part.read(16))
+                if content_type not in ALLOWED_CONTENT_TYPES:
+                    part.truncate(0)
+                    return _unsupported(content_type)
+        session.offset = end + 1
+        if session.offset == session.size:
+            session.blob, _ = ingest_path(path)
+        session.save(update_fields=['offset', 'blob', 'updated_at'])
+    return JsonResponse(_session_json(session), status=201 if session.blob_id else 200)
+
+
+@login_required
+@require_safe
+def blob_download(request, sha256, variant='file'):
+    """View to stream a stored file or one of its derivatives the user may see"""
+    if variant not in DOWNLOAD_VARIANTS:
+        raise Http404('No such derivative')
+    blob = get_object_or_404(visible_blobs(request.user), sha256=sha256)
+    field_file = getattr(blob, variant)
+    if not field_file:
+        raise Http404('No such derivative')
+    content_type = blob.content_type if variant == 'file' else 'image/jpeg'
+    # Content-addressed files never change, so the hash is a strong validator
+    response = serve_file(request, field_file.path, content_type, etag=f'"{blob.sha256}-{variant}"')
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
@@ -2,6 +2,11 @@
 ASGI config for construction_management project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The read-only JSON APIs are async views, so under ASGI they wait on the
+database without holding a worker thread. Serve it locally with the
+uvicorn profile in settings.ASGI_SERVER:
+
+    python -m construction_management.asgi
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -14,3 +19,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "construction_management.settings")
 
 application = get_asgi_application()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    from django.conf import settings
+
+    # An import string rather than the object, so workers > 1 can fork
+    uvicorn.run("construction_management.asgi:application", **settings.ASGI_SERVER)
@@ -0,0 +1,222 @@
+import itertools
+import time
+from collections import defaultdict
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+from .metrics import registry
+
+_missing = object()
+
+
+class NamespaceTimeouts:
+    """Timeouts per key namespace (the part before the first colon).
+
+    OPTIONS['NAMESPACE_TIMEOUTS'] maps namespaces to the timeout used when a
+    caller passes none; other keys get the backend's default timeout.
+    """
+
+    namespace_timeouts = {}
+
+    @staticmethod
+    def namespace(key):
+        return key.split(':', 1)[0]
+
+    def _timeout(self, key, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            return self.namespace_timeouts.get(self.namespace(key), self.default_timeout)
+        return timeout
+
+
+class InstrumentedLocMemCache(NamespaceTimeouts, LocMemCache):
+    """Local-memory cache that reports hits and misses to the metrics registry.
+
+    get_many, get_or_set and friends go through get(), so they are counted
+    too, and through set() or add(), so namespace timeouts apply to them.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.namespace_timeouts = params.get('OPTIONS', {}).get('NAMESPACE_TIMEOUTS', {})
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        super().set(key, value, self._timeout(key, timeout), version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return super().add(key, value, self._timeout(key, timeout), version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return super().touch(key, self._timeout(key, timeout), version)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            registry.record_cache(hits=0, misses=1)
+            return default
+        registry.record_cache(hits=1, misses=0)
+        return value
+
+
+class FileCache(FileBasedCache):
+    """File cache that decides whether to cull every CULL_INTERVAL writes.
+
+    Django's file cache lists the whole directory on each write to count
+    entries, which makes filling it with thousands of row fragments
+    quadratic. Checking every hundredth write lets it overshoot
+    MAX_ENTRIES by at most that many files.
+    """
+
+    def __init__(self, directory, params):
+        super().__init__(directory, params)
+        self._cull_interval = int(params.get('OPTIONS', {}).get('CULL_INTERVAL', 100))
+        self._writes = itertools.count()
+
+    def _cull(self):
+        if next(self._writes) % self._cull_interval == 0:
+            super()._cull()
+
+
+class TieredCache(NamespaceTimeouts, BaseCache):
+    """Small in-process LRU in front of a cache shared by every worker.
+
+    Reads try process memory, then the shared tier, copying what they find
+    back into memory. Writes go to both. Values are served from memory for
+    at most LOCAL_TIMEOUT seconds, which bounds how long another worker's
+    write (a bumped version key, say) takes to be seen here.
+
+    OPTIONS:
+
+    - SHARED: the shared tier's settings, shaped like a CACHES entry
+    - LOCAL_MAX_ENTRIES, LOCAL_TIMEOUT: size and lifetime of the memory tier
+    - NAMESPACE_TIMEOUTS: timeout per key namespace (the part before the
+      first colon), used when a caller passes none
+    - LOCK_TIMEOUT, LOCK_WAIT: while one caller computes a missing value in
+      get_or_set, others wait up to LOCK_WAIT seconds for it instead of all
+      computing it at once; the lock lapses after LOCK_TIMEOUT if its holder dies
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        shared = dict(options['SHARED'])
+        self._shared = import_string(shared.pop('BACKEND'))(shared.pop('LOCATION', ''), shared)
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._local = LocMemCache(f'tiered-{location}-{id(self)}', {
+            'TIMEOUT': self.local_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES', 1000)},
+        })
+        self.namespace_timeouts = options.get('NAMESPACE_TIMEOUTS', {})
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 30)
+        self.lock_wait = options.get('LOCK_WAIT', 10)
+
+    def _local_timeout(self, timeout):
+        return self.local_timeout if timeout is None else min(timeout, self.local_timeout)
+
+    def _record(self, tier, hits, misses):
+        for namespace, (hit, miss) in _tally(hits, misses).items():
+            registry.record_cache_tier(tier, namespace, hits=hit, misses=miss)
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self._local.get_many(keys, version=version)
+        missing = [key for key in keys if key not in found]
+        self._record('local', found, missing)
+        if missing:
+            shared = self._shared.get_many(missing, version=version)
+            self._record('shared', shared, [key for key in missing if key not in shared])
+            if shared:
+                self._local.set_many(shared, self.local_timeout, version=version)
+            found.update(shared)
+        registry.record_cache(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def has_key(self, key, version=None):
+        return self._local.has_key(key, version) or self._shared.has_key(key, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(key, timeout)
+        self._shared.set(key, value, timeout, version)
+        self._local.set(key, value, self._local_timeout(timeout), version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        by_timeout = defaultdict(dict)
+        for key, value in data.items():
+            by_timeout[self._timeout(key, timeout)][key] = value
+        failed = []
+        for key_timeout, values in by_timeout.items():
+            failed.extend(self._shared.set_many(values, key_timeout, version))
+            self._local.set_many(values, self._local_timeout(key_timeout), version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(key, timeout)
+        if self._shared.add(key, value, timeout, version):
+            self._local.set(key, value, self._local_timeout(timeout), version)
+            return True
+        return False
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local.delete(key, version)
+        return self._shared.touch(key, self._timeout(key, timeout), version)
+
+    def incr(self, key, delta=1, version=None):
+        # Counted in the shared tier so every worker bumps the same value
+        value = self._shared.incr(key, delta, version)
+        self._local.set(key, value, self.local_timeout, version)
+        return value
+
+    def delete(self, key, version=None):
+        self._local.delete(key, version)
+        return self._shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._local.delete_many(keys, version)
+        self._shared.delete_many(keys, version)
+
+    def clear(self):
+        self._local.clear()
+        self._shared.clear()
+
+    def close(self, **kwargs):
+        self._shared.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """Fetch a key, computing a callable default once across all workers on a miss"""
+        value = self.get(key, _missing, version)
+        if value is not _missing:
+            return value
+        if not callable(default):
+            return super().get_or_set(key, default, timeout, version)
+
+        lock = f'{key}:lock'
+        locked = self._shared.add(lock, 1, self.lock_timeout, version)
+        if not locked:
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = self._shared.get(key, _missing, version)
+                if value is not _missing:
+                    self._local.set(key, value, self.local_timeout, version)
+                    return value
+            # The holder is slow or gone; compute rather than wait any longer
+        try:
+            value = default()
+            self.set(key, value, timeout, version)
+        finally:
+            if locked:
+                self._shared.delete(lock, version)
+        return value
+
+
+def _tally(hits, misses):
+    counts = defaultdict(lambda: [0, 0])
+    for key in hits:
+        counts[TieredCache.namespace(key)][0] += 1
+    for key in misses:
+        counts[TieredCache.namespace(key)][1] += 1
+    return counts
@@ -0,0 +1,177 @@
+"""File delivery with HTTP Range and conditional request support.
+
+Views check permissions and then call serve_file(), which hands the
+transfer to whichever backend FILE_DELIVERY_BACKEND names:
+
+- ``python``: stream the file from Django in blocks (the default).
+- ``sendfile``: return a FileResponse so servers with wsgi.file_wrapper
+  (gunicorn, uWSGI) copy the bytes with os.sendfile.
+- ``x-accel``: send an empty response with X-Accel-Redirect for nginx,
+  which needs an ``internal`` location aliasing MEDIA_ROOT at
+  FILE_DELIVERY_ACCEL_PREFIX.
+- ``x-sendfile``: send an empty response with X-Sendfile for Apache
+  mod_xsendfile or lighttpd.
+
+With the proxy backends the front server handles Range and
+If-Modified-Since itself. FileDeliveryEmulationMiddleware plays that
+role when no proxy is present.
+"""
+import os
+import re
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_BLOCK_SIZE = 64 * 1024
+PROXY_BACKENDS = ('x-accel', 'x-sendfile')
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised for a Range header that lies outside the file"""
+
+
+def parse_range(header, size):
+    """Return the inclusive (start, end) byte range requested by header.
+
+    Returns None when there is no usable single range, in which case the
+    whole file is sent; multi-range requests fall back to that too.
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+def accel_redirect_path(path):
+    """Map a file under MEDIA_ROOT to its internal nginx location"""
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(path)
+    if os.path.commonpath([media_root, path]) != media_root:
+        raise SuspiciousFileOperation(f'{path} is outside MEDIA_ROOT')
+    relative = os.path.relpath(path, media_root)
+    prefix = getattr(settings, 'FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/').rstrip('/')
+    return f'{prefix}/{quote(relative.replace(os.sep, "/"))}'
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(STREAM_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+class _FileRange:
+    """File object limited to one byte range that still exposes fileno().
+
+    wsgi.file_wrapper implementations send from the current offset for at
+    most Content-Length bytes, so a ranged response keeps the sendfile path.
+    """
+
+    def __init__(self, path, start, length):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = length
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def read(self, size=-1):
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return bool(etag) and etag in [tag.strip() for tag in if_none_match.split(',')]
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and int(last_modified) <= since
+
+
+def serve_file(request, path, content_type, filename=None, as_attachment=False, etag=None, backend=None):
+    """Deliver a file from disk through the configured backend.
+
+    Raises FileNotFoundError if the file is missing, so callers can handle
+    it before a proxy turns it into a bare 404.
+    """
+    stat = os.stat(path)
+    backend = backend or getattr(settings, 'FILE_DELIVERY_BACKEND', 'python')
+
+    if backend in PROXY_BACKENDS:
+        response = HttpResponse(content_type=content_type)
+        if backend == 'x-accel':
+            response['X-Accel-Redirect'] = accel_redirect_path(path)
+        else:
+            response['X-Sendfile'] = os.fspath(path)
+    elif _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponse(status=304)
+    else:
+        size = stat.st_size
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if request.method == 'GET' and (not if_range or if_range in (etag, http_date(stat.st_mtime))):
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        status = 206 if byte_range else 200
+        if request.method == 'HEAD':
+            response = HttpResponse(status=status, content_type=content_type)
+        elif backend == 'sendfile':
+            response = FileResponse(_FileRange(path, start, length), status=status, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(_read_range(path, start, length), status=status,
+                                             content_type=content_type)
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if etag:
+        response['ETag'] = etag
+    if filename and response.status_code != 304:
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
+
+
+def resolve_accel_redirect(location):
+    """Map an X-Accel-Redirect location back to its file under MEDIA_ROOT"""
+    prefix = getattr(settings, 'FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/').rstrip('/') + '/'
+    if not location.startswith(prefix):
+        raise SuspiciousFileOperation(f'{location} is outside {prefix}')
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(os.path.join(media_root, unquote(location[len(prefix):])))
+    if os.path.commonpath([media_root, path]) != media_root:
+        raise SuspiciousFileOperation(f'{location} is outside MEDIA_ROOT')
+    return path
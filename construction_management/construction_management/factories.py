@@ -0,0 +1,272 @@
+"""Bulk factories for realistic volumes of project data.
+
+Every factory inserts with bulk_create in batches and draws values from a
+seeded random.Random, so the same arguments always produce the same rows.
+They back the query-budget test suite and the synthetic data generator.
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from contractors.accruals import refresh_balances
+from contractors.models import Contractor, ContractorPayment
+from labour.models import LabourType, Skill, Labourer, WageRate, WorkLog
+from transactions.models import Project, FinancialTransaction
+from vendors.ingestion import bulk_create_purchases
+from vendors.models import MaterialType, Vendor, VendorProduct, Purchase, Payment
+from vendors.pricing import refresh_best_prices
+
+BATCH_SIZE = 500
+PAYMENT_METHODS = ['cash', 'easypaisa', 'jazzcash', 'bank']
+
+LABOUR_TYPES = {
+    'Mason': ('1500.00', ['Bricklaying', 'Plastering', 'Tiling']),
+    'Carpenter': ('1700.00', ['Shuttering', 'Joinery']),
+    'Steel Fixer': ('1600.00', ['Bar Bending', 'Mesh Tying']),
+    'Electrician': ('1800.00', ['Wiring', 'Panel Fitting']),
+    'Helper': ('1000.00', ['Lifting', 'Mixing', 'Cleaning']),
+}
+MATERIALS = {
+    'Cement': ('bag', '1150.00'),
+    'Steel': ('kg', '265.00'),
+    'Sand': ('sqm', '95.00'),
+    'Bricks': ('unit', '17.00'),
+    'Paint': ('l', '850.00'),
+    'Tiles': ('sqm', '1400.00'),
+}
+
+
+def _money(rng, low, high):
+    return Decimal(rng.randint(int(low * 100), int(high * 100))) / 100
+
+
+def _cnic(n):
+    return f'{35200 + n // 10_000_000:05d}-{n % 10_000_000:07d}-{n % 10}'
+
+
+def make_projects(count, rng=None, start=date(2024, 1, 1)):
+    rng = rng or random.Random(0)
+    return Project.objects.bulk_create([
+        Project(
+            name=f'Project {i:03d}',
+            description='Synthetic project',
+            location=rng.choice(['Lahore', 'Karachi', 'Islamabad', 'Multan']),
+            start_date=start + timedelta(days=rng.randint(0, 180)),
+            budget=_money(rng, 5_000_000, 50_000_000),
+        )
+        for i in range(count)
+    ], batch_size=BATCH_SIZE)
+
+
+def make_labour_types():
+    """Create any missing standard labour types and skills, returning (types, skills)"""
+    existing = {t.name: t for t in LabourType.objects.filter(name__in=LABOUR_TYPES)}
+    LabourType.objects.bulk_create([
+        LabourType(name=name, base_daily_wage=Decimal(wage))
+        for name, (wage, _) in LABOUR_TYPES.items()
+        if name not in existing
+    ])
+    labour_types = list(LabourType.objects.filter(name__in=LABOUR_TYPES))
+    skill_names = {skill for _, names in LABOUR_TYPES.values() for skill in names}
+    known_skills = set(Skill.objects.filter(name__in=skill_names).values_list('name', flat=True))
+    Skill.objects.bulk_create([
+        Skill(name=skill, labour_type=labour_type)
+        for labour_type in labour_types
+        for skill in LABOUR_TYPES[labour_type.name][1]
+        if skill not in known_skills
+    ])
+    return labour_types, list(Skill.objects.filter(name__in=skill_names))
+
+
+def make_labourers(count, labour_types, skills, rng=None, start=0):
+    """Create labourers with one to three skills each from their trade"""
+    rng = rng or random.Random(0)
+    skills_by_type = {}
+    for skill in skills:
+        skills_by_type.setdefault(skill.labour_type_id, []).append(skill)
+
+    labourers = Labourer.objects.bulk_create([
+        Labourer(
+            name=f'Labourer {i:05d}',
+            cnic=_cnic(i),
+            phone=f'0300-{i % 10_000_000:07d}',
+            address='Site camp',
+            labour_type=labour_type,
+            daily_wage=labour_type.base_daily_wage + _money(rng, 0, 400),
+            joining_date=date(2023, 1, 1) + timedelta(days=rng.randint(0, 500)),
+            is_active=rng.random() > 0.1,
+        )
+        for i in range(start, start + count)
+        for labour_type in [rng.choice(labour_types)]
+    ], batch_size=BATCH_SIZE)
+
+    # bulk_create skips the signal that records each labourer's first wage rate
+    WageRate.objects.bulk_create([
+        WageRate(labourer_id=labourer.id, effective_from=labourer.joining_date, daily_wage=labourer.daily_wage)
+        for labourer in labourers
+    ], batch_size=BATCH_SIZE)
+
+    Through = Labourer.skills.through
+    Through.objects.bulk_create([
+        Through(labourer_id=labourer.id, skill_id=skill.id)
+        for labourer in labourers
+        for trade in [skills_by_type[labourer.labour_type_id]]
+        for skill in rng.sample(trade, rng.randint(1, min(3, len(trade))))
+    ], batch_size=BATCH_SIZE)
+    return labourers
+
+
+def make_work_logs(labourers, skills, start, days, attendance=0.85, rng=None):
+    """Create one log per labourer per working day at the given attendance rate"""
+    rng = rng or random.Random(0)
+    skills_by_type = {}
+    for skill in skills:
+        skills_by_type.setdefault(skill.labour_type_id, []).append(skill)
+
+    logs = WorkLog.objects.bulk_create([
+        WorkLog(
+            labourer=labourer,
+            work_date=start + timedelta(days=offset),
+            hours_worked=Decimal(rng.choice(['4.00', '8.00', '8.00', '8.00', '10.00'])),
+        )
+        for offset in range(days)
+        if (start + timedelta(days=offset)).weekday() != 6
+        for labourer in labourers
+        if rng.random() < attendance
+    ], batch_size=BATCH_SIZE)
+
+    labour_type_ids = {labourer.id: labourer.labour_type_id for labourer in labourers}
+    Through = WorkLog.tasks_performed.through
+    Through.objects.bulk_create([
+        Through(worklog_id=log.id, skill_id=skill.id)
+        for log in logs
+        for trade in [skills_by_type[labour_type_ids[log.labourer_id]]]
+        for skill in rng.sample(trade, rng.randint(1, min(2, len(trade))))
+    ], batch_size=BATCH_SIZE)
+    return logs
+
+
+def make_vendors(count, products_per_vendor=4, rng=None):
+    """Create vendors with material types and catalogue products, returning (vendors, products)"""
+    rng = rng or random.Random(0)
+    materials = {m.name: m for m in MaterialType.objects.all()}
+    missing = [MaterialType(name=name) for name in MATERIALS if name not in materials]
+    for material in MaterialType.objects.bulk_create(missing):
+        materials[material.name] = material
+
+    vendors = Vendor.objects.bulk_create([
+        Vendor(
+            name=f'Vendor {i:04d}',
+            contact_person=f'Contact {i:04d}',
+            phone=f'042-{i:07d}',
+            address='Industrial area',
+        )
+        for i in range(count)
+    ], batch_size=BATCH_SIZE)
+
+    products = []
+    Through = Vendor.material_types.through
+    links = []
+    for vendor in vendors:
+        supplied = rng.sample(list(materials), rng.randint(1, 3))
+        links.extend(Through(vendor_id=vendor.id, materialtype_id=materials[name].id) for name in supplied)
+        for n in range(products_per_vendor):
+            name = supplied[n % len(supplied)]
+            unit, base_price = MATERIALS[name]
+            products.append(VendorProduct(
+                vendor=vendor,
+                name=f'{name} grade {n}',
+                material_type=materials[name],
+                unit_type=unit,
+                price_per_unit=(Decimal(base_price) * Decimal(rng.uniform(0.85, 1.2))).quantize(Decimal('0.01')),
+            ))
+    Through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+    products = VendorProduct.objects.bulk_create(products, batch_size=BATCH_SIZE)
+    refresh_best_prices()
+    return vendors, products
+
+
+def make_purchases(count, products, start, days=365, paid_share=0.6, rng=None):
+    """Create purchases spread over a period, with payments for the paid share"""
+    rng = rng or random.Random(0)
+    purchases = []
+    for _ in range(count):
+        product = rng.choice(products)
+        paid = rng.random() < paid_share
+        purchases.append(Purchase(
+            vendor_id=product.vendor_id,
+            product=product,
+            quantity=_money(rng, 1, 500),
+            price_per_unit=product.price_per_unit,
+            purchase_date=start + timedelta(days=rng.randrange(days)),
+            payment_status='paid' if paid else 'pending',
+            payment_method=rng.choice(PAYMENT_METHODS) if paid else None,
+        ))
+    purchases = bulk_create_purchases(purchases, batch_size=BATCH_SIZE)
+    Payment.objects.bulk_create([
+        Payment(
+            purchase=purchase,
+            amount=purchase.total_amount,
+            payment_date=purchase.purchase_date + timedelta(days=rng.randint(0, 30)),
+            payment_method=purchase.payment_method,
+        )
+        for purchase in purchases
+        if purchase.payment_status == 'paid'
+    ], batch_size=BATCH_SIZE)
+    return purchases
+
+
+def make_transactions(count, projects, start, days=365, rng=None):
+    rng = rng or random.Random(0)
+    return FinancialTransaction.objects.bulk_create([
+        FinancialTransaction(
+            transaction_type=rng.choice(['expense', 'expense', 'expense', 'income', 'transfer']),
+            amount=_money(rng, 500, 2_000_000),
+            date=start + timedelta(days=rng.randrange(days)),
+            description='Synthetic transaction',
+            payment_method=rng.choice(PAYMENT_METHODS),
+            project=rng.choice(projects) if projects else None,
+        )
+        for _ in range(count)
+    ], batch_size=BATCH_SIZE)
+
+
+def make_contractors(count, projects, payments_per_contractor=6, start=date(2024, 1, 1), rng=None):
+    """Create contractors on one to three projects each, with payments and their balances"""
+    rng = rng or random.Random(0)
+    contractors = Contractor.objects.bulk_create([
+        Contractor(
+            name=f'Contractor {i:04d}',
+            contact_person=f'Foreman {i:04d}',
+            phone=f'0321-{i:07d}',
+            address='Lahore',
+            specialization=rng.choice(['Electrical', 'Plumbing', 'Shuttering', 'Finishing']),
+            rate_per_day=_money(rng, 2000, 8000),
+        )
+        for i in range(count)
+    ], batch_size=BATCH_SIZE)
+
+    Through = Contractor.projects.through
+    assignments = {
+        contractor.id: rng.sample(projects, min(len(projects), rng.randint(1, 3)))
+        for contractor in contractors
+    }
+    Through.objects.bulk_create([
+        Through(contractor_id=contractor_id, project_id=project.id)
+        for contractor_id, assigned in assignments.items()
+        for project in assigned
+    ], batch_size=BATCH_SIZE)
+    ContractorPayment.objects.bulk_create([
+        ContractorPayment(
+            contractor_id=contractor_id,
+            project=rng.choice(assigned),
+            amount=_money(rng, 10_000, 500_000),
+            payment_date=start + timedelta(days=rng.randrange(365)),
+            payment_method=rng.choice(PAYMENT_METHODS),
+        )
+        for contractor_id, assigned in assignments.items()
+        for _ in range(payments_per_contractor)
+    ], batch_size=BATCH_SIZE)
+    # bulk_create skips the signals that keep balances current
+    refresh_balances(assignments)
+    return contractors
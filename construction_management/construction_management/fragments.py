@@ -0,0 +1,159 @@
+"""Cached template fragments for the layout and list pages.
+
+Table rows are cached under (model, pk, updated_at), so saving a row gives
+it a new key and the old HTML simply expires, after the 'fragments'
+namespace timeout in CACHE_NAMESPACE_TIMEOUTS. What a row's own timestamp
+can't see (a renamed labour type, a labourer's skills) bumps a version
+for the model instead, which is part of every row key for it. Navigation
+is cached per role and active page, under a version bumped whenever roles
+or their permissions change.
+
+    {% load fragments %}
+    {% prefetch_rows labourers %}
+    {% for labourer in labourers %}
+        {% cacherow labourer %}<tr>...</tr>{% endcacherow %}
+    {% endfor %}
+
+    {% cachenav 'desktop' %}{% if 'vendors' in nav_modules %}...{% endif %}{% endcachenav %}
+
+prefetch_rows is optional; it fetches every row of the page from the
+cache in one round trip instead of one per row. A row showing values its
+own timestamp doesn't cover, like an annotation, names those attributes
+after the instance in both tags, e.g. {% cacherow labourer 'current_wage' %}.
+"""
+from django import template
+from django.core.cache import cache
+from users.models import Permission
+
+FRAGMENT_VERSION_KEY = 'fragments:version:{}'
+NAV_NAMESPACE = 'nav'
+
+register = template.Library()
+
+
+def fragment_version(namespace):
+    """Return the current version of a fragment namespace, initialising it if missing"""
+    return cache.get_or_set(FRAGMENT_VERSION_KEY.format(namespace), 1, None)
+
+
+def invalidate_fragments(namespace):
+    """Bump a namespace's version so every fragment cached under it goes stale"""
+    key = FRAGMENT_VERSION_KEY.format(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _versions(context):
+    # Versions are read once per render, not once per row
+    return context.render_context.setdefault('fragment_versions', {})
+
+
+def _version(context, namespace):
+    versions = _versions(context)
+    if namespace not in versions:
+        versions[namespace] = fragment_version(namespace)
+    return versions[namespace]
+
+
+def row_fragment_key(instance, version, vary_on=()):
+    stamp = instance.updated_at.timestamp() if instance.updated_at else ''
+    key = f'fragments:row:{instance._meta.label_lower}:v{version}:{instance.pk}:{stamp}'
+    return ':'.join([key, *(str(getattr(instance, attr)) for attr in vary_on)])
+
+
+def nav_modules(user):
+    """Modules whose navigation links a user sees; users without a role see all"""
+    if user.is_superuser or not user.role_id:
+        return {module for module, _ in Permission.MODULE_CHOICES}
+    return set(user.role.permissions.filter(action='view').values_list('module', flat=True))
+
+
+def _vary_on(context, attrs):
+    return [attr.resolve(context) for attr in attrs]
+
+
+class RowNode(template.Node):
+    def __init__(self, nodelist, instance, vary_on):
+        self.nodelist = nodelist
+        self.instance = instance
+        self.vary_on = vary_on
+
+    def render(self, context):
+        instance = self.instance.resolve(context)
+        key = row_fragment_key(
+            instance, _version(context, instance._meta.label_lower), _vary_on(context, self.vary_on)
+        )
+        html = context.render_context.get('fragment_rows', {}).get(key)
+        if html is None:
+            html = cache.get_or_set(key, lambda: self.nodelist.render(context))
+        return html
+
+
+class PrefetchRowsNode(template.Node):
+    def __init__(self, rows, vary_on):
+        self.rows = rows
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = _vary_on(context, self.vary_on)
+        keys = [
+            row_fragment_key(instance, _version(context, instance._meta.label_lower), vary_on)
+            for instance in self.rows.resolve(context)
+        ]
+        found = cache.get_many(keys)
+        rows = context.render_context.setdefault('fragment_rows', {})
+        rows.update({key: found.get(key) for key in keys})
+        return ''
+
+
+class NavNode(template.Node):
+    def __init__(self, nodelist, name):
+        self.nodelist = nodelist
+        self.name = name
+
+    def render(self, context):
+        request = context.get('request')
+        user = context.get('user')
+        match = getattr(request, 'resolver_match', None)
+        role = 'all' if user.is_superuser or not user.role_id else user.role_id
+        key = (f'fragments:nav:v{_version(context, NAV_NAMESPACE)}:{self.name.resolve(context)}'
+               f':{role}:{match.url_name if match else ""}')
+
+        def render_nav():
+            with context.push(nav_modules=nav_modules(user)):
+                return self.nodelist.render(context)
+
+        return cache.get_or_set(key, render_nav)
+
+
+@register.tag
+def cacherow(parser, token):
+    """Cache a table row's HTML under its model, pk, updated_at and any attributes named after it"""
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes the row's model instance, then attribute names")
+    nodelist = parser.parse(('endcacherow',))
+    parser.delete_first_token()
+    return RowNode(nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]])
+
+
+@register.tag
+def prefetch_rows(parser, token):
+    """Fetch the cached HTML of every row in a list with one cache read"""
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes the list of rows, then attribute names")
+    return PrefetchRowsNode(parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]])
+
+
+@register.tag
+def cachenav(parser, token):
+    """Cache navigation HTML per role and active page; nav_modules is set inside"""
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes one argument, the fragment name")
+    nodelist = parser.parse(('endcachenav',))
+    parser.delete_first_token()
+    return NavNode(nodelist, parser.compile_filter(bits[1]))
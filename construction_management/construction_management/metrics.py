@@ -0,0 +1,123 @@
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Upper bounds for the latency (seconds) and query-count histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# View currently being served, so cache lookups can be attributed to it
+current_view = ContextVar('metrics_current_view', default='-')
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the shape Prometheus expects"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+def _labels(**labels):
+    """Render a Prometheus label set with escaped values"""
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+class MetricsRegistry:
+    """Process-local request, database and cache metrics.
+
+    Each worker process keeps its own registry; Prometheus aggregates
+    across workers by scraping (or summing) each one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = {}
+            self.query_counts = {}
+            self.query_seconds = {}
+            self.cache_requests = {}
+            self.cache_tiers = {}
+
+    def observe_request(self, view, method, status, duration, query_count, query_seconds):
+        with self._lock:
+            key = (view, method, status)
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.latency[key].observe(duration)
+            if view not in self.query_counts:
+                self.query_counts[view] = Histogram(QUERY_COUNT_BUCKETS)
+            self.query_counts[view].observe(query_count)
+            self.query_seconds[view] = self.query_seconds.get(view, 0.0) + query_seconds
+
+    def record_cache(self, hits, misses):
+        view = current_view.get()
+        with self._lock:
+            for result, amount in (('hit', hits), ('miss', misses)):
+                if amount:
+                    key = (view, result)
+                    self.cache_requests[key] = self.cache_requests.get(key, 0) + amount
+
+    def record_cache_tier(self, tier, namespace, hits, misses):
+        with self._lock:
+            for result, amount in (('hit', hits), ('miss', misses)):
+                if amount:
+                    key = (tier, namespace, result)
+                    self.cache_tiers[key] = self.cache_tiers.get(key, 0) + amount
+
+    def render(self):
+        """Serialize all metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def histogram(name, help_text, series):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, hist in series:
+                for bound, total in hist.cumulative():
+                    lines.append(f'{name}_bucket{{{_labels(**labels, le=bound)}}} {total}')
+                lines.append(f'{name}_sum{{{_labels(**labels)}}} {hist.sum:.6f}')
+                lines.append(f'{name}_count{{{_labels(**labels)}}} {hist.count}')
+
+        with self._lock:
+            histogram(
+                'http_request_duration_seconds', 'Request latency by view.',
+                [({'view': v, 'method': m, 'status': s}, h) for (v, m, s), h in sorted(self.latency.items())],
+            )
+            histogram(
+                'http_request_db_queries', 'Database queries issued per request by view.',
+                [({'view': v}, h) for v, h in sorted(self.query_counts.items())],
+            )
+            lines.append('# HELP http_request_db_seconds_total Time spent in database queries by view.')
+            lines.append('# TYPE http_request_db_seconds_total counter')
+            for view, seconds in sorted(self.query_seconds.items()):
+                lines.append(f'http_request_db_seconds_total{{{_labels(view=view)}}} {seconds:.6f}')
+            lines.append('# HELP cache_requests_total Cache lookups by view and result.')
+            lines.append('# TYPE cache_requests_total counter')
+            for (view, result), count in sorted(self.cache_requests.items()):
+                lines.append(f'cache_requests_total{{{_labels(view=view, result=result)}}} {count}')
+            lines.append('# HELP cache_tier_requests_total Tiered cache lookups by tier, key namespace and result.')
+            lines.append('# TYPE cache_tier_requests_total counter')
+            for (tier, namespace, result), count in sorted(self.cache_tiers.items()):
+                lines.append(f'cache_tier_requests_total{{{_labels(tier=tier, namespace=namespace, result=result)}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,336 @@
+import datetime
+import gzip
+import hashlib
+import logging
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, CharField, Count, Max, Value
+from django.db.models.functions import Cast
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.http import Http404, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_etags
+from django.utils.text import compress_sequence
+from .delivery import resolve_accel_redirect, serve_file
+from .metrics import registry, current_view
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript')
+
+
+def _check_watermarked(labels):
+    """Refuse models whose edits would leave the ETag unchanged"""
+    for label in labels:
+        model = apps.get_model(label)
+        field_names = {field.name for field in model._meta.concrete_fields}
+        if 'updated_at' not in field_names and not model._meta.auto_created:
+            raise ImproperlyConfigured(
+                f'CONDITIONAL_GET_VIEWS: {label} has no updated_at, so edits to it would not change the ETag'
+            )
+
+
+def _watermarks(labels):
+    """Row count and newest change for each model, in one UNION ALL query.
+
+    Models with updated_at report its maximum; M2M through tables, whose
+    rows are only ever inserted or deleted, report the highest primary key,
+    which moves on insert, while the count moves on delete. Values come
+    back as text so the branches of the union share a column type.
+    """
+    queries = []
+    for label in labels:
+        model = apps.get_model(label)
+        field_names = {field.name for field in model._meta.concrete_fields}
+        newest = 'updated_at' if 'updated_at' in field_names else 'pk'
+        queries.append(model._default_manager.order_by().annotate(
+            source=Value(label, output_field=CharField()),
+        ).values('source').annotate(
+            count=Count('pk'),
+            newest=Cast(Max(newest), output_field=CharField()),
+            has_timestamp=Value(newest == 'updated_at', output_field=BooleanField()),
+        ).values_list('source', 'count', 'newest', 'has_timestamp'))
+    rows = queries[0].union(*queries[1:], all=True)
+    return {source: (count, newest, has_timestamp) for source, count, newest, has_timestamp in rows}
+
+
+class HybridMiddleware:
+    """Base for middleware that runs natively under both WSGI and ASGI.
+
+    Subclasses implement process_response(); under ASGI it is called in
+    the event loop, so it must not touch the database. Sync-only
+    middleware would make Django hop threads around every async view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        return response
+
+
+class ConditionalJSONMiddleware(HybridMiddleware):
+    """Weak ETags and 304s for read-only JSON views, computed before the view runs.
+
+    settings.CONDITIONAL_GET_VIEWS maps URL names to the model labels whose
+    data the view renders. The ETag is derived from those models' change
+    signatures, the full path and the user, so an unchanged resource is
+    answered with 304 without touching the view or serializing anything.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.views = getattr(settings, 'CONDITIONAL_GET_VIEWS', {})
+        for labels in self.views.values():
+            _check_watermarked(labels)
+
+    def process_response(self, request, response):
+        etag = getattr(request, '_conditional_etag', None)
+        if etag and response.status_code == 200 and not response.has_header('ETag'):
+            response['ETag'] = etag
+            if request._conditional_last_modified:
+                response['Last-Modified'] = http_date(request._conditional_last_modified.timestamp())
+            patch_vary_headers(response, ('Cookie', 'Authorization'))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD') or request.resolver_match is None:
+            return None
+        labels = self.views.get(request.resolver_match.view_name)
+        user = getattr(request, 'user', None)
+        # Anonymous requests fall through so the view's login check still applies
+        if not labels or user is None or not user.is_authenticated:
+            return None
+
+        # request.auser() caches separately from request.user, so hand async
+        # views the user loaded above instead of fetching it a second time
+        async def auser():
+            return user
+        request.auser = auser
+
+        watermarks = _watermarks(labels)
+        signatures = [watermarks.get(label, (0, None, False))[:2] for label in labels]
+        digest = hashlib.md5(
+            repr((request.get_full_path(), user.pk, signatures)).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        etag = f'W/"{digest}"'
+        timestamps = [
+            parse_datetime(newest) for _, newest, has_timestamp in watermarks.values()
+            if has_timestamp and newest
+        ]
+        timestamps = [
+            value if timezone.is_aware(value) else timezone.make_aware(value, datetime.timezone.utc)
+            for value in timestamps if value
+        ]
+        request._conditional_etag = etag
+        request._conditional_last_modified = max(timestamps) if timestamps else None
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            client_tags = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+            if '*' in client_tags or etag.removeprefix('W/') in client_tags:
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
+        return None
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """Brotli or gzip compression for text and JSON responses above a size threshold"""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+    def process_response(self, request, response):
+        if response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accepted = {
+            part.split(';')[0].strip()
+            for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+        }
+        encoding = 'br' if brotli is not None and 'br' in accepted else 'gzip' if 'gzip' in accepted else None
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if encoding != 'gzip' or response.is_async:
+                return response
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response['Content-Length']
+        else:
+            if len(response.content) < self.min_size:
+                return response
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=5)
+            else:
+                compressed = gzip.compress(response.content, compresslevel=6, mtime=0)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # A compressed body is no longer byte-identical, so strong ETags weaken
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+
+class FileDeliveryEmulationMiddleware(HybridMiddleware):
+    """Stand-in for nginx/Apache when FILE_DELIVERY_EMULATE_PROXY is on.
+
+    Responses carrying X-Accel-Redirect or X-Sendfile are checked and the
+    file is served from Django, so the proxy backends can be run and
+    tested locally. The header that was resolved is echoed back in
+    X-File-Delivery-Emulated.
+    """
+
+    HEADERS_KEPT = ('Content-Type', 'Content-Disposition', 'Cache-Control', 'ETag', 'Expires')
+
+    def process_response(self, request, response):
+        if not getattr(settings, 'FILE_DELIVERY_EMULATE_PROXY', False):
+            return response
+        if response.has_header('X-Accel-Redirect'):
+            header, location = 'X-Accel-Redirect', response['X-Accel-Redirect']
+        elif response.has_header('X-Sendfile'):
+            header, location = 'X-Sendfile', response['X-Sendfile']
+        else:
+            return response
+
+        try:
+            path = resolve_accel_redirect(location) if header == 'X-Accel-Redirect' else location
+            served = serve_file(request, path, response['Content-Type'], etag=response.get('ETag'), backend='python')
+        except (FileNotFoundError, SuspiciousFileOperation):
+            logger.warning("%s %s does not resolve to a servable file", header, location)
+            raise Http404(f'{header} target not found')
+        for name in self.HEADERS_KEPT:
+            if response.has_header(name) and not (name == 'Content-Disposition' and served.status_code == 304):
+                served[name] = response[name]
+        served['X-File-Delivery-Emulated'] = f'{header}: {location}'
+        return served
+
+
+class QueryRecorder:
+    """execute_wrapper that counts and times every query on a connection"""
+
+    def __init__(self, keep_sql=False):
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if self.keep_sql:
+                self.queries.append((elapsed, sql))
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Per-view latency, query count/time and cache metrics for every request.
+
+    Results feed the registry served at /metrics. Requests slower than
+    METRICS_SLOW_REQUEST_MS are logged with their slowest queries.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.slow_ms = getattr(settings, 'METRICS_SLOW_REQUEST_MS', None)
+        self.top_queries = getattr(settings, 'METRICS_SLOW_REQUEST_TOP_QUERIES', 5)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = QueryRecorder(keep_sql=self.slow_ms is not None)
+        token = current_view.set('-')
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self._wrap_connections(stack, recorder)
+                response = self.get_response(request)
+        finally:
+            current_view.reset(token)
+        self._observe(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(keep_sql=self.slow_ms is not None)
+        token = current_view.set('-')
+        start = time.perf_counter()
+        try:
+            # The async ORM runs queries on the request's sync thread, whose
+            # connections are separate from the event loop's
+            stack = ExitStack()
+            await sync_to_async(self._wrap_connections)(stack, recorder)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            current_view.reset(token)
+        self._observe(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    @staticmethod
+    def _wrap_connections(stack, recorder):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+    def _observe(self, request, response, duration, recorder):
+        view = self._view_label(request)
+        registry.observe_request(
+            view, request.method, response.status_code, duration, recorder.count, recorder.seconds
+        )
+        if self.slow_ms is not None and duration * 1000 >= self.slow_ms:
+            slowest = sorted(recorder.queries, key=lambda query: query[0], reverse=True)[:self.top_queries]
+            logger.warning(
+                'Slow request %s %s (%s): %.0fms, %d queries in %.0fms%s',
+                request.method, request.path, view, duration * 1000, recorder.count,
+                recorder.seconds * 1000,
+                ''.join(f'\n  {elapsed * 1000:.1f}ms {sql}' for elapsed, sql in slowest),
+            )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current_view.set(self._view_label(request))
+
+    @staticmethod
+    def _view_label(request):
+        # URL names keep label cardinality bounded; unmatched paths share one label
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else '<unresolved>'
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -33,10 +34,16 @@ INSTALLED_APPS = [
     'transactions.apps.TransactionsConfig',
     'reports.apps.ReportsConfig',
     'contractors.apps.ContractorsConfig',
+    'sync.apps.SyncConfig',
+    'idempotency.apps.IdempotencyConfig',
+    'attachments.apps.AttachmentsConfig',
 ]
 
 MIDDLEWARE = [
+    'construction_management.middleware.MetricsMiddleware',
+    'construction_management.middleware.FileDeliveryEmulationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'construction_management.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,16 +51,94 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'construction_management.middleware.ConditionalJSONMiddleware',
 ]
 
+# Request metrics served at /metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # bearer token for scrapers; staff users need none
+METRICS_SLOW_REQUEST_MS = 1000  # log slower requests with their top queries; None disables
+METRICS_SLOW_REQUEST_TOP_QUERIES = 5
+
+# Cache profile: 'local' keeps a separate cache in each worker's memory;
+# 'file' (CACHE_DIR) and 'redis' (a Redis-compatible server at CACHE_REDIS_URL,
+# needs the redis package) share one cache between workers, with a small
+# in-process LRU in front. The shared tiers keep no default timeout so
+# incr() on version keys never shortens their life.
+CACHE_PROFILE = os.environ.get('CACHE_PROFILE', 'local')
+CACHE_SHARED_TIERS = {
+    'file': {
+        'BACKEND': 'construction_management.cache.FileCache',
+        'LOCATION': os.environ.get('CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'construction-management-cache'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0'),
+        'TIMEOUT': None,
+    },
+}
+# Seconds keys in each namespace (the key's first segment) live when set
+# without a timeout
+CACHE_NAMESPACE_TIMEOUTS = {
+    'labour': 60 * 15,  # roster facet counts
+    'transactions': 60 * 60,  # project choices
+    'fragments': 60 * 60 * 24,  # list rows and navigation
+}
+if CACHE_PROFILE == 'local':
+    CACHES = {
+        'default': {
+            'BACKEND': 'construction_management.cache.InstrumentedLocMemCache',
+            'OPTIONS': {'NAMESPACE_TIMEOUTS': CACHE_NAMESPACE_TIMEOUTS},
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'construction_management.cache.TieredCache',
+            'OPTIONS': {
+                'SHARED': CACHE_SHARED_TIERS[CACHE_PROFILE],
+                'LOCAL_MAX_ENTRIES': 2000,
+                'LOCAL_TIMEOUT': 5,  # longest another worker's write goes unseen here
+                'NAMESPACE_TIMEOUTS': CACHE_NAMESPACE_TIMEOUTS,
+                'LOCK_TIMEOUT': 30,
+                'LOCK_WAIT': 10,
+            },
+        },
+    }
+
+# Idempotency keys on payment-creating endpoints live this long (seconds)
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# Response compression and conditional GET
+COMPRESSION_MIN_SIZE = 1024  # bytes; smaller bodies are sent as-is
+# URL name -> models whose updated_at (or pk) watermarks make up the ETag
+CONDITIONAL_GET_VIEWS = {
+    'contractors:contractor_list_create': ['contractors.Contractor', 'contractors.Contractor_projects', 'transactions.Project'],
+    'contractors:contractor_payments': ['contractors.ContractorPayment', 'transactions.Project'],
+    'contractors:contractor_balances': ['contractors.ContractorBalance', 'contractors.Contractor', 'transactions.Project'],
+    'labour:labour_types_api': ['labour.LabourType'],
+    'vendor-list': ['vendors.Vendor', 'vendors.Vendor_material_types', 'vendors.MaterialType', 'vendors.VendorProduct'],
+    'vendor-detail': ['vendors.Vendor', 'vendors.Vendor_material_types', 'vendors.MaterialType', 'vendors.VendorProduct'],
+}
+
 ROOT_URLCONF = 'construction_management.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parsed templates are kept in memory outside development
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
+            'libraries': {
+                'fragments': 'construction_management.fragments',
+            },
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -106,6 +191,50 @@ STATICFILES_DIRS = [
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Attachment pipeline: uploads larger than one chunk go through resumable
+# upload sessions whose partial files live outside MEDIA_ROOT
+ATTACHMENT_MAX_SIZE = 25 * 1024 * 1024
+ATTACHMENT_CHUNK_SIZE = 5 * 1024 * 1024
+ATTACHMENT_UPLOAD_DIR = BASE_DIR / 'uploads'
+ATTACHMENT_UPLOAD_TTL = 60 * 60 * 24
+# Threads rendering thumbnails and previews; 0 renders inline
+ATTACHMENT_WORKERS = 2
+
+# How protected files (reports, attachments) leave the server: 'python',
+# 'sendfile', 'x-accel' (nginx) or 'x-sendfile' (Apache). For x-accel,
+# nginx needs:  location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+FILE_DELIVERY_BACKEND = os.environ.get('FILE_DELIVERY_BACKEND', 'python')
+FILE_DELIVERY_ACCEL_PREFIX = '/protected-media/'
+# Resolve X-Accel-Redirect/X-Sendfile in Django when there is no proxy in front
+FILE_DELIVERY_EMULATE_PROXY = DEBUG and FILE_DELIVERY_BACKEND in ('x-accel', 'x-sendfile')
+
+# uvicorn profile for `python -m construction_management.asgi`. Django has
+# no lifespan support, and keep-alive outlasts a mobile client's poll interval
+ASGI_SERVER = {
+    'host': os.environ.get('ASGI_HOST', '127.0.0.1'),
+    'port': int(os.environ.get('ASGI_PORT', '8000')),
+    'workers': int(os.environ.get('ASGI_WORKERS', '1')),
+    'loop': 'auto',
+    'http': 'auto',
+    'lifespan': 'off',
+    'backlog': 2048,
+    'timeout_keep_alive': 30,
+    'limit_concurrency': int(os.environ['ASGI_LIMIT_CONCURRENCY']) if os.environ.get('ASGI_LIMIT_CONCURRENCY') else None,
+    'proxy_headers': True,
+    'access_log': DEBUG,
+}
+
+# Server-sent change events (/api/sync/events/). The default backend only
+# reaches streams in the same process; with several ASGI workers use
+# 'sync.events.SocketBackend', which fans out through EVENT_STREAM_SOCKET_DIR
+EVENT_STREAM_BACKEND = os.environ.get('EVENT_STREAM_BACKEND', 'sync.events.LocalBackend')
+EVENT_STREAM_SOCKET_DIR = os.environ.get('EVENT_STREAM_SOCKET_DIR') or None
+EVENT_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+EVENT_STREAM_MAX_AGE = 600  # seconds before a stream is closed for the client to reconnect
+EVENT_STREAM_BUFFER = 500  # recent events kept for Last-Event-ID replay
+EVENT_STREAM_QUEUE_SIZE = 256  # events a slow stream may lag before it is reset
+EVENT_STREAM_BULK_LIMIT = 200  # larger bulk writes send one reset instead of per-row events
+
 # Authentication settings
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
@@ -141,12 +270,12 @@ LOGGING = {
     'loggers': {
         'django.request': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': 'WARNING',
             'propagate': False,
         },
         'users': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': 'INFO',
             'propagate': False,
         },
     },
@@ -0,0 +1,179 @@
+"""Query-count and wall-clock budgets for every list and API view.
+
+The dataset is built once per run at production-like volume, and each
+view must stay within a fixed number of queries no matter how many rows
+it lists. Wall-clock budgets are deliberately loose and can be scaled
+with PERF_BUDGET_SCALE on slow CI machines. Run just this suite with
+``python manage.py test --tag performance``.
+"""
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from reports.models import Report
+from . import factories
+
+BUDGET_SCALE = float(os.environ.get('PERF_BUDGET_SCALE', '1'))
+YEAR_START = date(2024, 1, 1)
+
+
+@tag('performance')
+class QueryBudgetTests(TestCase):
+    """Fixed query budgets for list and API views at realistic volume"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(42)
+        cls.user = get_user_model().objects.create_user(
+            email='budget@example.com', password='test-pass-123', is_staff=True
+        )
+        cls.projects = factories.make_projects(20, rng=rng)
+        labour_types, skills = factories.make_labour_types()
+        cls.labourers = factories.make_labourers(2000, labour_types, skills, rng=rng)
+        # Two busy weeks for the whole roster: ~24,000 logs
+        factories.make_work_logs(cls.labourers, skills, date(2024, 3, 4), 14, rng=rng)
+        cls.vendors, products = factories.make_vendors(300, rng=rng)
+        cls.product = products[0]
+        factories.make_purchases(3000, products, YEAR_START, rng=rng)
+        factories.make_transactions(3000, cls.projects, YEAR_START, rng=rng)
+        cls.contractors = factories.make_contractors(400, cls.projects, rng=rng)
+        Report.objects.bulk_create([
+            Report(name=f'Report {i}', generated_by=cls.user, file=f'reports/report_{i}.pdf')
+            for i in range(200)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    @contextmanager
+    def assertBudget(self, queries, seconds):
+        """Fail if the block runs more than `queries` queries or takes longer than `seconds`"""
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            yield
+            elapsed = time.perf_counter() - start
+        executed = len(captured)
+        if executed > queries:
+            self.fail(
+                f'{executed} queries executed, budget is {queries}:\n'
+                + '\n'.join(f"{i}. {query['sql']}" for i, query in enumerate(captured, 1))
+            )
+        self.assertLessEqual(
+            elapsed, seconds * BUDGET_SCALE, f'took {elapsed:.2f}s, budget is {seconds * BUDGET_SCALE:.2f}s'
+        )
+
+    def get(self, url, params=None, status=200):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    # labour
+
+    def test_labour_list(self):
+        self.get(reverse('labour:labour_list'), {'active': '1'})  # warm the facet cache
+        with self.assertBudget(queries=5, seconds=0.5):
+            self.get(reverse('labour:labour_list'), {'page': 3, 'active': '1'})
+
+    def test_labour_types_api(self):
+        with self.assertBudget(queries=4, seconds=0.2):
+            self.get(reverse('labour:labour_types_api'))
+
+    def test_worklog_list(self):
+        with self.assertBudget(queries=7, seconds=1.0):
+            response = self.get(reverse('labour:worklog_list'), {'start': '2024-03-04', 'labour_type': 1})
+        self.assertGreater(len(response.context['work_logs']), 1000)
+
+    def test_worklog_list_json(self):
+        with self.assertBudget(queries=4, seconds=2.0):
+            response = self.get(reverse('labour:worklog_list'), {'start': '2024-03-04', 'format': 'json'})
+        self.assertGreater(len(response.json()['results']), 10000)
+
+    # contractors
+
+    def test_contractor_list(self):
+        with self.assertBudget(queries=5, seconds=0.5):
+            response = self.get(reverse('contractors:contractor_list_create'))
+        self.assertEqual(len(response.json()), 400)
+
+    def test_contractor_detail(self):
+        with self.assertBudget(queries=4, seconds=0.2):
+            self.get(reverse('contractors:contractor_detail', args=[self.contractors[0].id]))
+
+    def test_contractor_payments(self):
+        with self.assertBudget(queries=5, seconds=0.2):
+            response = self.get(reverse('contractors:contractor_payments', args=[self.contractors[0].id]))
+        self.assertEqual(len(response.json()), 6)
+
+    # vendors
+
+    def test_vendor_list(self):
+        with self.assertBudget(queries=6, seconds=0.5):
+            self.get(reverse('vendor-list'), {'page_size': 500, 'expand': 'products'})
+
+    def test_vendor_detail(self):
+        with self.assertBudget(queries=6, seconds=0.2):
+            self.get(reverse('vendor-detail', args=[self.vendors[0].id]), {'expand': 'products'})
+
+    def test_vendor_products(self):
+        with self.assertBudget(queries=5, seconds=0.2):
+            self.get(reverse('vendor-products', args=[self.vendors[0].id]))
+
+    def test_product_list(self):
+        with self.assertBudget(queries=3, seconds=0.5):
+            self.get('/api/vendors/products/', {'page_size': 1000})
+
+    def test_product_price_history(self):
+        with self.assertBudget(queries=4, seconds=0.2):
+            self.get(reverse('vendor-product-price-history', args=[self.product.id]))
+
+    def test_purchase_list(self):
+        with self.assertBudget(queries=3, seconds=0.5):
+            self.get('/api/vendors/purchases/', {'page_size': 1000})
+
+    def test_payment_list(self):
+        with self.assertBudget(queries=3, seconds=0.5):
+            self.get('/api/vendors/payments/', {'page_size': 1000})
+
+    def test_material_type_list(self):
+        with self.assertBudget(queries=3, seconds=0.2):
+            self.get('/api/vendors/material-types/')
+
+    def test_best_price_list(self):
+        with self.assertBudget(queries=3, seconds=0.2):
+            self.get(reverse('best_price_list'))
+
+    # transactions, reports, sync and pages
+
+    def test_transaction_list(self):
+        with self.assertBudget(queries=3, seconds=3.0):
+            response = self.get(reverse('transactions:transaction_list'))
+        self.assertEqual(len(response.context['transactions']), 3000)
+
+    def test_report_list(self):
+        with self.assertBudget(queries=5, seconds=0.5):
+            self.get(reverse('reports:report_list'))
+
+    def test_sync_changes(self):
+        with self.assertBudget(queries=20, seconds=2.0):
+            self.get(reverse('sync:sync_changes'), {'limit': 500})
+
+    def test_frontend_pages(self):
+        for name in ('dashboard', 'labour', 'transactions'):
+            with self.subTest(page=name), self.assertBudget(queries=2, seconds=0.2):
+                self.get(reverse(name))
+        with self.assertBudget(queries=3, seconds=0.5):
+            self.get(reverse('vendors'))
+
+    def test_metrics(self):
+        with self.assertBudget(queries=2, seconds=0.2):
+            self.get(reverse('metrics'))
@@ -0,0 +1,312 @@
+import json
+import logging
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from unittest import skipUnless
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from contractors.models import Contractor, ContractorPayment
+from labour.facets import labourer_facets
+from labour.models import LabourType, Labourer, Skill
+from transactions.models import FinancialTransaction, Project
+from users.models import Permission, Role
+from users.provisioning import provision_roles
+from .cache import InstrumentedLocMemCache, TieredCache
+from .metrics import registry
+
+
+class MetricsTests(TestCase):
+    """Tests for per-view request metrics and the /metrics endpoint"""
+
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='ops@example.com', password='test-pass-123'
+        )
+        self.client.force_login(self.user)
+        LabourType.objects.create(name='Mason', base_daily_wage='1500.00')
+
+    def scrape(self, **headers):
+        return self.client.get(reverse('metrics'), **headers)
+
+    def test_endpoint_requires_staff_or_token(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.client.logout()
+            self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    def test_request_latency_queries_and_cache_are_recorded(self):
+        self.client.get(reverse('labour:labour_list'))
+        self.client.get(reverse('labour:labour_list'))
+        self.client.get('/no-such-page/')
+        body = registry.render()
+
+        self.assertIn(
+            'http_request_duration_seconds_count{view="labour:labour_list",method="GET",status="200"} 2', body
+        )
+        self.assertIn('http_request_duration_seconds_bucket{view="labour:labour_list",method="GET",status="200",le="+Inf"} 2', body)
+        self.assertIn('http_request_db_queries_count{view="labour:labour_list"} 2', body)
+        self.assertIn('http_request_db_seconds_total{view="labour:labour_list"}', body)
+        # The facet cache misses on the first request and hits on the second
+        self.assertIn('cache_requests_total{view="labour:labour_list",result="hit"}', body)
+        self.assertIn('cache_requests_total{view="labour:labour_list",result="miss"}', body)
+        self.assertIn('view="<unresolved>",method="GET",status="404"', body)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0, METRICS_SLOW_REQUEST_TOP_QUERIES=2)
+    def test_slow_requests_are_logged_with_top_queries(self):
+        with self.assertLogs('construction_management.middleware', logging.WARNING) as logs:
+            self.client.get(reverse('labour:labour_types_api'))
+        message = logs.output[0]
+        self.assertIn('Slow request GET /api/labour/types/ (labour:labour_types_api)', message)
+        self.assertEqual(message.count('SELECT'), 2)
+
+
+class AsyncViewTests(TestCase):
+    """Tests for the async JSON views and middleware under the ASGI handler"""
+
+    def setUp(self):
+        registry.reset()
+        self.user = get_user_model().objects.create_user(
+            email='ops@example.com', password='test-pass-123'
+        )
+        self.async_client.force_login(self.user)
+        LabourType.objects.create(name='Mason', base_daily_wage='1500.00')
+        self.project = Project.objects.create(
+            name='Tower A', description='', start_date='2024-01-01', budget=Decimal('1000000.00')
+        )
+        self.contractor = Contractor.objects.create(
+            name='Electrician', contact_person='Site office', phone='0300-0000000',
+            address='Lahore', specialization='Electrical', rate_per_day=Decimal('2500.00'),
+        )
+        self.contractor.projects.add(self.project)
+
+    def test_middleware_runs_natively_in_async_mode(self):
+        async def get_response(request):
+            return None
+        for path in settings.MIDDLEWARE:
+            middleware = import_string(path)(get_response)
+            self.assertTrue(iscoroutinefunction(middleware), path)
+
+    async def test_json_views_answer_under_asgi(self):
+        response = await self.async_client.get(reverse('labour:labour_types_api'))
+        self.assertEqual([row['name'] for row in response.json()], ['Mason'])
+
+        listing = await self.async_client.get(reverse('contractors:contractor_list_create'))
+        self.assertEqual(listing.json()[0]['projects'], [{'id': self.project.id, 'name': 'Tower A'}])
+        cached = await self.async_client.get(
+            reverse('contractors:contractor_list_create'), headers={'If-None-Match': listing['ETag']}
+        )
+        self.assertEqual(cached.status_code, 304)
+
+        missing = await self.async_client.get(reverse('contractors:contractor_payments', args=[0]))
+        self.assertEqual(missing.status_code, 404)
+
+        # Queries made through the async ORM are still counted per view
+        self.assertIn('http_request_db_queries_count{view="labour:labour_types_api"} 1', registry.render())
+        self.assertIn('http_request_db_queries_sum{view="labour:labour_types_api"} 4.000000', registry.render())
+
+    async def test_writes_still_run_through_the_sync_path(self):
+        url = reverse('contractors:contractor_payments', args=[self.contractor.id])
+        body = json.dumps({
+            'project_id': self.project.id, 'amount': '5000.00', 'payment_date': '2024-03-01',
+            'payment_method': 'cash',
+        })
+        for _ in range(2):
+            response = await self.async_client.post(
+                url, body, content_type='application/json', headers={'Idempotency-Key': 'pay-1'}
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(await ContractorPayment.objects.acount(), 1)
+        payments = (await self.async_client.get(url)).json()
+        self.assertEqual([payment['amount'] for payment in payments], ['5000.00'])
+
+
+class FragmentCacheTests(TestCase):
+    """Tests for cached table rows and navigation"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='clerk@example.com', password='test-pass-123'
+        )
+        self.client.force_login(self.user)
+
+    def test_rows_are_keyed_on_updated_at(self):
+        entry = FinancialTransaction.objects.create(
+            transaction_type='expense', amount=Decimal('1250.00'), date=date(2024, 3, 1),
+            description='Cement', payment_method='cash',
+        )
+        self.assertContains(self.client.get(reverse('transactions:transaction_list')), '₹1250.00')
+        # A write that leaves updated_at alone is served from the cached row
+        FinancialTransaction.objects.filter(pk=entry.pk).update(amount=Decimal('9999.00'))
+        self.assertContains(self.client.get(reverse('transactions:transaction_list')), '₹1250.00')
+
+        entry.refresh_from_db()
+        entry.save()
+        self.assertContains(self.client.get(reverse('transactions:transaction_list')), '₹9999.00')
+
+    def test_related_changes_invalidate_labourer_rows(self):
+        mason = LabourType.objects.create(name='Mason', base_daily_wage=Decimal('1500.00'))
+        tiling = Skill.objects.create(name='Tiling', labour_type=mason)
+        labourer = Labourer.objects.create(
+            name='Imran', cnic='35202-0000001-1', phone='0300-0000000', address='Site camp',
+            labour_type=mason, daily_wage=Decimal('1600.00'), joining_date=date(2024, 1, 1),
+        )
+        url = reverse('labour:labour_list')
+        self.assertNotContains(self.client.get(url), 'Tiling')
+
+        labourer.skills.add(tiling)
+        self.assertContains(self.client.get(url), 'Tiling')
+        LabourType.objects.filter(pk=mason.pk).update(name='Stone Mason')
+        mason.refresh_from_db()
+        mason.save()
+        self.assertContains(self.client.get(url), 'Stone Mason')
+
+    def test_navigation_follows_the_role(self):
+        provision_roles()
+        role = Role.objects.get(name='staff')
+        role.permissions.set(Permission.objects.filter(module='labour', action='view'))
+        self.user.role = role
+        self.user.save()
+
+        page = self.client.get(reverse('dashboard'))
+        self.assertContains(page, '</i> Labour', count=2)
+        self.assertNotContains(page, '</i> Vendors')
+        self.assertContains(page, 'clerk@example.com')
+
+        # The cached links are shared by the role; the email is not
+        colleague = get_user_model().objects.create_user(
+            email='colleague@example.com', password='test-pass-123', role=role
+        )
+        self.client.force_login(colleague)
+        with self.assertNumQueries(2):
+            page = self.client.get(reverse('dashboard'))
+        self.assertContains(page, 'colleague@example.com')
+        self.assertNotContains(page, 'clerk@example.com')
+
+        role.permissions.add(Permission.objects.get(module='vendors', action='view'))
+        self.assertContains(self.client.get(reverse('dashboard')), '</i> Vendors', count=2)
+
+    def test_users_without_a_role_see_every_module(self):
+        page = self.client.get(reverse('dashboard'))
+        for label in ('Vendors', 'Labour', 'Transactions', 'Reports'):
+            self.assertContains(page, f'</i> {label}', count=2)
+
+
+class TieredCacheTests(TestCase):
+    """Tests for the in-process tier in front of a shared cache.
+
+    Each TieredCache stands in for one worker; a file cache in a temporary
+    directory stands in for the shared server.
+    """
+
+    def setUp(self):
+        registry.reset()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def worker(self, **options):
+        return TieredCache('default', {'OPTIONS': {
+            'SHARED': {
+                'BACKEND': 'construction_management.cache.FileCache',
+                'LOCATION': self.directory,
+                'TIMEOUT': None,
+            },
+            'NAMESPACE_TIMEOUTS': {'dashboard': 60},
+            **options,
+        }})
+
+    def test_reads_fall_through_to_the_shared_tier(self):
+        first, second = self.worker(), self.worker()
+        first.set('dashboard:totals', {'vendors': 3})
+        self.assertEqual(second.get('dashboard:totals'), {'vendors': 3})
+        self.assertEqual(second.get('dashboard:totals'), {'vendors': 3})
+        self.assertIsNone(second.get('dashboard:missing'))
+        self.assertEqual(second.get_many(['dashboard:totals', 'dashboard:missing']), {'dashboard:totals': {'vendors': 3}})
+
+        body = registry.render()
+        self.assertIn('cache_tier_requests_total{tier="local",namespace="dashboard",result="hit"} 2', body)
+        self.assertIn('cache_tier_requests_total{tier="shared",namespace="dashboard",result="hit"} 1', body)
+        self.assertIn('cache_tier_requests_total{tier="shared",namespace="dashboard",result="miss"} 2', body)
+
+    def test_namespace_timeouts_apply_when_none_is_given(self):
+        cache = self.worker()
+        self.assertEqual(cache._timeout('dashboard:totals', DEFAULT_TIMEOUT), 60)
+        self.assertEqual(cache._timeout('dashboard:totals', 5), 5)
+        self.assertEqual(cache._timeout('reports:kinds', DEFAULT_TIMEOUT), 300)
+        cache.set('dashboard:totals', 1, timeout=-1)
+        self.assertIsNone(self.worker().get('dashboard:totals'))
+
+    def test_local_profile_applies_namespace_timeouts_to_get_or_set(self):
+        local = InstrumentedLocMemCache('namespaces', {'OPTIONS': {'NAMESPACE_TIMEOUTS': {'dashboard': 60}}})
+        self.assertEqual(local.get_or_set('dashboard:totals', lambda: 3), 3)
+        local.set('reports:kinds', 1)
+        expiry = local._expire_info
+        self.assertAlmostEqual(expiry[local.make_key('dashboard:totals')] - time.time(), 60, delta=1)
+        self.assertAlmostEqual(expiry[local.make_key('reports:kinds')] - time.time(), 300, delta=1)
+
+    @skipUnless(settings.CACHE_PROFILE == 'local', 'reads the local-memory cache directly')
+    def test_callers_leave_timeouts_to_their_namespace(self):
+        cache.clear()
+        labourer_facets()
+        (key,) = [k for k in cache._expire_info if k.endswith(':labour:facets:v1:None')]
+        self.assertAlmostEqual(cache._expire_info[key] - time.time(), settings.CACHE_NAMESPACE_TIMEOUTS['labour'], delta=1)
+
+    def test_other_workers_see_writes_once_their_memory_tier_expires(self):
+        first, second = self.worker(LOCAL_TIMEOUT=0.2), self.worker(LOCAL_TIMEOUT=0.2)
+        self.assertEqual(first.get_or_set('fragments:version:nav', 1, None), 1)
+        self.assertEqual(second.get('fragments:version:nav'), 1)
+        self.assertEqual(first.incr('fragments:version:nav'), 2)
+        self.assertEqual(first.get('fragments:version:nav'), 2)
+        time.sleep(0.3)
+        self.assertEqual(second.get('fragments:version:nav'), 2)
+
+        second.delete('fragments:version:nav')
+        time.sleep(0.3)
+        self.assertIsNone(first.get('fragments:version:nav'))
+
+    def test_a_missing_value_is_computed_once(self):
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.3)
+            return 42
+
+        workers = [self.worker() for _ in range(4)]
+        results = []
+        threads = [
+            threading.Thread(target=lambda w=w: results.append(w.get_or_set('analytics:summary', compute)))
+            for w in workers
+        ]
+        threads[0].start()
+        started.wait(1)
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [42] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(workers[0].has_key('analytics:summary:lock'))
@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic.base import RedirectView
+from .views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -15,6 +16,9 @@ urlpatterns = [
     path('reports/', include('reports.urls', namespace='reports')),  # Include reports URLs at both paths
     path('users/', include('users.urls', namespace='users')),
     path('api/contractors/', include('contractors.urls', namespace='contractors')),
+    path('api/sync/', include('sync.urls', namespace='sync')),
+    path('api/attachments/', include('attachments.urls', namespace='attachments')),
+    path('metrics', metrics_view, name='metrics'),
     path('logout/', RedirectView.as_view(url='/users/logout/', permanent=False)),
     path('logout', RedirectView.as_view(url='/users/logout/', permanent=False)),
 ]
@@ -23,8 +27,3 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
-# Serve static and media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,91 @@
+"""Contractor accruals: earned from attendance, paid from payments.
+
+Both sides are grouped by (contractor, project) in the database, so a
+settlement across any number of contractors and projects costs two
+aggregate queries. ContractorBalance keeps the all-time result so the
+payable list is a single indexed read; signals refresh the rows of the
+contractor whose attendance or payments changed.
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum
+from .models import Contractor, ContractorAttendance, ContractorBalance, ContractorPayment
+
+ZERO = Decimal('0.00')
+
+
+def _scope(queryset, date_field, contractor_ids, project_ids, start, end):
+    if contractor_ids is not None:
+        queryset = queryset.filter(contractor_id__in=contractor_ids)
+    if project_ids is not None:
+        queryset = queryset.filter(project_id__in=project_ids)
+    if start:
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{date_field}__lte': end})
+    return queryset.order_by()
+
+
+def accrual_summary(contractor_ids=None, project_ids=None, start=None, end=None):
+    """Return earned, paid and balance per (contractor_id, project_id).
+
+    Dates bound attendance by its date and payments by payment_date, both
+    inclusive. Pairs with attendance but no payments (or the reverse) are
+    included with zero on the missing side.
+    """
+    earned = _scope(ContractorAttendance.objects, 'date', contractor_ids, project_ids, start, end).values(
+        'contractor_id', 'project_id'
+    ).annotate(days=Sum('days'), earned=Sum('amount'))
+    paid = _scope(ContractorPayment.objects, 'payment_date', contractor_ids, project_ids, start, end).values(
+        'contractor_id', 'project_id'
+    ).annotate(paid=Sum('amount'))
+
+    summary = {}
+    for row in earned:
+        summary[(row['contractor_id'], row['project_id'])] = {
+            'days': row['days'], 'earned': row['earned'], 'paid': ZERO,
+        }
+    for row in paid:
+        entry = summary.setdefault(
+            (row['contractor_id'], row['project_id']), {'days': ZERO, 'earned': ZERO, 'paid': ZERO}
+        )
+        entry['paid'] = row['paid']
+    for entry in summary.values():
+        entry['balance'] = entry['earned'] - entry['paid']
+    return summary
+
+
+def refresh_balances(contractor_ids=None):
+    """Rebuild the cached balances for the given contractors (or all).
+
+    The contractors' rows are locked first, so concurrent refreshes for
+    one contractor run one after the other and each sums committed rows.
+    Balances are upserted and only pairs that no longer have attendance or
+    payments are deleted.
+    """
+    if contractor_ids is not None:
+        contractor_ids = set(contractor_ids)
+    contractors = Contractor.objects.all()
+    balances = ContractorBalance.objects.all()
+    if contractor_ids is not None:
+        contractors = contractors.filter(id__in=contractor_ids)
+        balances = balances.filter(contractor_id__in=contractor_ids)
+
+    with transaction.atomic():
+        list(contractors.select_for_update().order_by('id').values_list('id', flat=True))
+        summary = accrual_summary(contractor_ids=contractor_ids)
+        ContractorBalance.objects.bulk_create(
+            [
+                ContractorBalance(contractor_id=contractor_id, project_id=project_id, **entry)
+                for (contractor_id, project_id), entry in summary.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['contractor', 'project'],
+            update_fields=['days', 'earned', 'paid', 'balance', 'updated_at'],
+        )
+        stale = [
+            pk for pk, contractor_id, project_id in balances.values_list('id', 'contractor_id', 'project_id')
+            if (contractor_id, project_id) not in summary
+        ]
+        if stale:
+            ContractorBalance.objects.filter(id__in=stale).delete()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Contractor, ContractorPayment
+from .models import Contractor, ContractorPayment, ContractorAttendance, ContractorBalance
 
 @admin.register(Contractor)
 class ContractorAdmin(admin.ModelAdmin):
@@ -42,3 +42,17 @@ class ContractorPaymentAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+@admin.register(ContractorAttendance)
+class ContractorAttendanceAdmin(admin.ModelAdmin):
+    list_display = ('contractor', 'project', 'date', 'days', 'rate', 'amount')
+    list_filter = ('date', 'project')
+    search_fields = ('contractor__name', 'project__name')
+    readonly_fields = ('amount', 'created_at')
+
+@admin.register(ContractorBalance)
+class ContractorBalanceAdmin(admin.ModelAdmin):
+    list_display = ('contractor', 'project', 'days', 'earned', 'paid', 'balance', 'updated_at')
+    list_filter = ('project',)
+    search_fields = ('contractor__name', 'project__name')
+    readonly_fields = ('contractor', 'project', 'days', 'earned', 'paid', 'balance', 'updated_at')
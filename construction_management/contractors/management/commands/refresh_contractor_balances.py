@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from contractors.accruals import refresh_balances
+from contractors.models import ContractorBalance
+
+
+class Command(BaseCommand):
+    help = 'Rebuild cached contractor balances from attendance and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('contractor_ids', nargs='*', type=int,
+                            help='Contractors to refresh; all when omitted')
+
+    def handle(self, *args, **options):
+        contractor_ids = options['contractor_ids'] or None
+        refresh_balances(contractor_ids)
+        balances = ContractorBalance.objects.all()
+        if contractor_ids:
+            balances = balances.filter(contractor_id__in=contractor_ids)
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {balances.count()} contractor balances'))
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:41
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('transactions', '0002_financialtransaction_transaction_updated_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contractor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('company_name', models.CharField(blank=True, max_length=200)),
+                ('contact_person', models.CharField(max_length=100)),
+                ('phone', models.CharField(max_length=20)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('address', models.TextField()),
+                ('specialization', models.CharField(max_length=200)),
+                ('rate_per_day', models.DecimalField(decimal_places=2, help_text='Daily rate in PKR', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('projects', models.ManyToManyField(blank=True, related_name='contractors', to='transactions.project')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ContractorPayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('payment_date', models.DateField()),
+                ('payment_method', models.CharField(choices=[('cash', 'Cash'), ('easypaisa', 'Easypaisa'), ('jazzcash', 'JazzCash'), ('bank', 'Bank Transfer')], max_length=10)),
+                ('transaction_id', models.CharField(blank=True, help_text='Transaction ID for non-cash payments', max_length=100, null=True)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('contractor', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payments', to='contractors.contractor')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='contractor_payments', to='transactions.project')),
+            ],
+            options={
+                'ordering': ['-payment_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='contractor',
+            index=models.Index(fields=['updated_at', 'id'], name='contractor_updated_idx'),
+        ),
+    ]
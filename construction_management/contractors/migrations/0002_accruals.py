@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:12
+
+import django.core.validators
+import django.db.models.deletion
+import django.db.models.expressions
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_balances(apps, schema_editor):
+    """Seed cached balances from the payments recorded so far"""
+    ContractorPayment = apps.get_model('contractors', 'ContractorPayment')
+    ContractorBalance = apps.get_model('contractors', 'ContractorBalance')
+    paid = ContractorPayment.objects.order_by().values('contractor_id', 'project_id').annotate(paid=Sum('amount'))
+    ContractorBalance.objects.bulk_create([
+        ContractorBalance(
+            contractor_id=row['contractor_id'], project_id=row['project_id'],
+            paid=row['paid'], balance=-row['paid'],
+        )
+        for row in paid
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contractors', '0001_initial'),
+        ('transactions', '0005_transactionattachment_blob_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractorAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('days', models.DecimalField(decimal_places=2, default=Decimal('1.00'), help_text='Days engaged, e.g. 0.5 for a half day', max_digits=4, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('rate', models.DecimalField(blank=True, decimal_places=2, help_text="Daily rate in PKR; defaults to the contractor's current rate", max_digits=10)),
+                ('amount', models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('days'), '*', models.F('rate')), output_field=models.DecimalField(decimal_places=2, max_digits=12))),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('contractor', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='attendance', to='contractors.contractor')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='contractor_attendance', to='transactions.project')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('contractor', 'project', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ContractorBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('earned', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('paid', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Earned less paid; negative when the contractor has been advanced', max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contractor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='contractors.contractor')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contractor_balances', to='transactions.project')),
+            ],
+            options={
+                'ordering': ['contractor', 'project'],
+                'unique_together': {('contractor', 'project')},
+            },
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contractors', '0002_accruals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contractorpayment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -32,6 +32,9 @@ class Contractor(models.Model):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='contractor_updated_idx'),
+        ]
 
 class ContractorPayment(models.Model):
     """Model for tracking payments made to contractors"""
@@ -70,9 +73,80 @@ class ContractorPayment(models.Model):
     )
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Payment to {self.contractor.name} - {self.payment_date}"
 
     class Meta:
         ordering = ['-payment_date']
+
+class ContractorAttendance(models.Model):
+    """Days a contractor was engaged on a project, priced at the day's rate"""
+    contractor = models.ForeignKey(
+        Contractor,
+        on_delete=models.PROTECT,
+        related_name='attendance'
+    )
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.PROTECT,
+        related_name='contractor_attendance'
+    )
+    date = models.DateField()
+    days = models.DecimalField(
+        max_digits=4,
+        decimal_places=2,
+        default=Decimal('1.00'),
+        validators=[MinValueValidator(Decimal('0.01'))],
+        help_text='Days engaged, e.g. 0.5 for a half day'
+    )
+    rate = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        help_text="Daily rate in PKR; defaults to the contractor's current rate"
+    )
+    # Computed by the database so bulk writes can never leave a stale total behind
+    amount = models.GeneratedField(
+        expression=models.F('days') * models.F('rate'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        # Snapshot the rate so later rate changes don't rewrite past earnings
+        if self.rate is None:
+            self.rate = self.contractor.rate_per_day
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.contractor.name} on {self.project.name} - {self.date}"
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['contractor', 'project', 'date']
+
+class ContractorBalance(models.Model):
+    """Precomputed earned, paid and payable amounts per contractor and project"""
+    contractor = models.ForeignKey(Contractor, on_delete=models.CASCADE, related_name='balances')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='contractor_balances')
+    days = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    earned = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    paid = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    balance = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Earned less paid; negative when the contractor has been advanced'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.contractor.name} on {self.project.name}: PKR {self.balance}"
+
+    class Meta:
+        ordering = ['contractor', 'project']
+        unique_together = ['contractor', 'project']
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .accruals import refresh_balances
+from .models import ContractorAttendance, ContractorPayment
+
+
+@receiver(post_save, sender=ContractorAttendance)
+@receiver(post_delete, sender=ContractorAttendance)
+@receiver(post_save, sender=ContractorPayment)
+@receiver(post_delete, sender=ContractorPayment)
+def contractor_ledger_changed(sender, instance, **kwargs):
+    """Keep the contractor's cached balances current"""
+    refresh_balances({instance.contractor_id})
@@ -1,3 +1,236 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.urls import reverse
+
+from construction_management.middleware import ConditionalJSONMiddleware
+from transactions.models import Project
+from .accruals import accrual_summary
+from .models import Contractor, ContractorAttendance, ContractorBalance, ContractorPayment
+
+
+class ConditionalGetTests(TestCase):
+    """Tests for ETag/304 handling and compression of the contractor JSON API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='accounts@example.com', password='test-pass-123'
+        )
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name='Tower A', description='', start_date='2024-01-01', budget=Decimal('1000000.00')
+        )
+        self.contractor = self.make_contractor('Electrician')
+        self.url = reverse('contractors:contractor_list_create')
+
+    def make_contractor(self, name):
+        contractor = Contractor.objects.create(
+            name=name, contact_person='Site office', phone='0300-0000000',
+            address='Lahore', specialization='Electrical', rate_per_day=Decimal('2500.00'),
+        )
+        contractor.projects.add(self.project)
+        return contractor
+
+    def test_unchanged_list_returns_304_without_running_view(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+
+        # session, user and a single watermark query across the source models
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_etag_changes_with_data(self):
+        etag = self.client.get(self.url)['ETag']
+        self.contractor.rate_per_day = Decimal('2700.00')
+        self.contractor.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        self.contractor.projects.clear()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_editing_a_payment_changes_the_etag(self):
+        payment = ContractorPayment.objects.create(
+            contractor=self.contractor, project=self.project, amount=Decimal('500.00'),
+            payment_date=date(2024, 3, 1), payment_method='cash',
+        )
+        url = reverse('contractors:contractor_payments', args=[self.contractor.id])
+        etag = self.client.get(url)['ETag']
+        payment.amount = Decimal('750.00')
+        payment.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '750.00')
+
+    def test_models_without_updated_at_are_refused(self):
+        with override_settings(CONDITIONAL_GET_VIEWS={'contractors:contractor_payments': ['labour.Skill']}):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'labour.Skill has no updated_at'):
+                ConditionalJSONMiddleware(lambda request: None)
+
+    def test_anonymous_request_is_not_answered_with_304(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.logout()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(COMPRESSION_MIN_SIZE=200)
+    def test_large_responses_are_gzipped(self):
+        for i in range(5):
+            self.make_contractor(f'Plumber {i}')
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 6)
+
+        small = self.client.get(reverse('labour:labour_types_api'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+
+class AccrualTests(TestCase):
+    """Tests for earned/paid accruals and cached contractor balances"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='accounts@example.com', password='test-pass-123'
+        )
+        self.client.force_login(self.user)
+        self.tower = Project.objects.create(
+            name='Tower A', description='', start_date='2024-01-01', budget=Decimal('1000000.00')
+        )
+        self.plaza = Project.objects.create(
+            name='Plaza', description='', start_date='2024-01-01', budget=Decimal('500000.00')
+        )
+        self.mason = Contractor.objects.create(
+            name='Mason', contact_person='Site office', phone='0300-0000000',
+            address='Lahore', specialization='Masonry', rate_per_day=Decimal('2000.00'),
+        )
+        self.painter = Contractor.objects.create(
+            name='Painter', contact_person='Site office', phone='0300-0000001',
+            address='Lahore', specialization='Painting', rate_per_day=Decimal('1500.00'),
+        )
+
+    def attend(self, contractor, project, day, days='1.00', **kwargs):
+        return ContractorAttendance.objects.create(
+            contractor=contractor, project=project, date=date(2024, 3, day), days=Decimal(days), **kwargs
+        )
+
+    def pay(self, contractor, project, amount, day):
+        return ContractorPayment.objects.create(
+            contractor=contractor, project=project, amount=Decimal(amount),
+            payment_date=date(2024, 3, day), payment_method='cash',
+        )
+
+    def test_attendance_snapshots_rate_and_computes_amount(self):
+        entry = self.attend(self.mason, self.tower, 1, days='0.50')
+        self.mason.rate_per_day = Decimal('2400.00')
+        self.mason.save()
+        entry.refresh_from_db()
+        self.assertEqual((entry.rate, entry.amount), (Decimal('2000.00'), Decimal('1000.00')))
+        override = self.attend(self.mason, self.tower, 2, rate=Decimal('3000.00'))
+        override.refresh_from_db()
+        self.assertEqual(override.amount, Decimal('3000.00'))
+
+    def test_summary_groups_by_contractor_and_project_in_two_queries(self):
+        for day in (1, 2, 3):
+            self.attend(self.mason, self.tower, day)
+        self.attend(self.mason, self.plaza, 4, days='0.50')
+        self.pay(self.mason, self.tower, '5000.00', 3)
+        self.pay(self.painter, self.plaza, '800.00', 5)
+
+        with self.assertNumQueries(2):
+            summary = accrual_summary()
+        self.assertEqual(summary[(self.mason.id, self.tower.id)], {
+            'days': Decimal('3.00'), 'earned': Decimal('6000.00'),
+            'paid': Decimal('5000.00'), 'balance': Decimal('1000.00'),
+        })
+        self.assertEqual(summary[(self.mason.id, self.plaza.id)]['balance'], Decimal('1000.00'))
+        # Paid with nothing earned yet is an advance
+        self.assertEqual(summary[(self.painter.id, self.plaza.id)]['balance'], Decimal('-800.00'))
+
+        march_first_two = accrual_summary(start=date(2024, 3, 1), end=date(2024, 3, 2))
+        self.assertEqual(list(march_first_two), [(self.mason.id, self.tower.id)])
+        self.assertEqual(march_first_two[(self.mason.id, self.tower.id)]['paid'], Decimal('0.00'))
+
+    def test_cached_balances_follow_attendance_and_payments(self):
+        entry = self.attend(self.mason, self.tower, 1)
+        payment = self.pay(self.mason, self.tower, '1500.00', 1)
+        balance = ContractorBalance.objects.get(contractor=self.mason, project=self.tower)
+        self.assertEqual((balance.earned, balance.paid, balance.balance),
+                         (Decimal('2000.00'), Decimal('1500.00'), Decimal('500.00')))
+
+        payment.delete()
+        entry.delete()
+        self.assertFalse(ContractorBalance.objects.exists())
+
+        self.attend(self.painter, self.plaza, 2)
+        ContractorBalance.objects.all().delete()
+        call_command('refresh_contractor_balances', stdout=io.StringIO())
+        self.assertEqual(ContractorBalance.objects.get().earned, Decimal('1500.00'))
+
+    def test_balances_are_updated_in_place(self):
+        self.attend(self.mason, self.tower, 1)
+        plaza_entry = self.attend(self.mason, self.plaza, 1)
+        balance = ContractorBalance.objects.get(contractor=self.mason, project=self.tower)
+        self.pay(self.mason, self.tower, '500.00', 2)
+        updated = ContractorBalance.objects.get(contractor=self.mason, project=self.tower)
+        self.assertEqual((updated.id, updated.balance), (balance.id, Decimal('1500.00')))
+        plaza_entry.delete()
+        self.assertEqual(list(ContractorBalance.objects.values_list('id', flat=True)), [balance.id])
+
+    def test_balances_api_reads_the_cache(self):
+        self.attend(self.mason, self.tower, 1)
+        self.attend(self.painter, self.plaza, 1)
+        self.pay(self.painter, self.plaza, '1500.00', 1)
+        url = reverse('contractors:contractor_balances')
+
+        # session, user, watermark and the balances themselves
+        with self.assertNumQueries(4):
+            data = self.client.get(url).json()
+        self.assertEqual(data['totals'], {'earned': '3500.00', 'paid': '1500.00', 'balance': '2000.00'})
+        outstanding = self.client.get(url, {'outstanding': '1'}).json()['balances']
+        self.assertEqual([row['contractor']['name'] for row in outstanding], ['Mason'])
+
+    def test_settlement_api_totals_a_period_per_contractor(self):
+        self.attend(self.mason, self.tower, 1)
+        self.attend(self.mason, self.plaza, 2)
+        self.attend(self.mason, self.plaza, 20)
+        self.pay(self.mason, self.plaza, '500.00', 10)
+        response = self.client.get(reverse('contractors:contractor_settlement'),
+                                   {'from': '2024-03-01', 'to': '2024-03-15'})
+        settlement, = response.json()['contractors']
+        self.assertEqual([row['project']['name'] for row in settlement['projects']], ['Plaza', 'Tower A'])
+        self.assertEqual((settlement['earned'], settlement['paid'], settlement['balance']),
+                         ('4000.00', '500.00', '3500.00'))
+
+        bad = self.client.get(reverse('contractors:contractor_settlement'),
+                              {'from': '2024-03-15', 'to': '2024-03-01'})
+        self.assertEqual(bad.status_code, 400)
+        for params in ({'from': '2024-02-30'}, {'to': 'soon'}):
+            bad = self.client.get(reverse('contractors:contractor_settlement'), params)
+            self.assertEqual(bad.status_code, 400, params)
+
+    def test_attendance_api_records_days(self):
+        url = reverse('contractors:contractor_attendance', args=[self.mason.id])
+        response = self.client.post(url, {'project_id': self.tower.id, 'date': '2024-03-01', 'days': '0.5'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['amount'], '1000.00')
+        duplicate = self.client.post(url, {'project_id': self.tower.id, 'date': '2024-03-01'},
+                                     content_type='application/json')
+        self.assertEqual(duplicate.status_code, 400)
+        self.assertEqual(ContractorBalance.objects.get().earned, Decimal('1000.00'))
+        self.assertEqual(self.client.get(url).json()[0]['days'], '0.50')
 
-# Create your tests here.
@@ -7,4 +7,7 @@ urlpatterns = [
     path('', views.contractor_list_create, name='contractor_list_create'),
     path('<int:pk>/', views.contractor_detail, name='contractor_detail'),
     path('<int:contractor_id>/payments/', views.contractor_payments, name='contractor_payments'),
+    path('<int:contractor_id>/attendance/', views.contractor_attendance, name='contractor_attendance'),
+    path('balances/', views.contractor_balances, name='contractor_balances'),
+    path('settlement/', views.contractor_settlement, name='contractor_settlement'),
 ]
@@ -1,19 +1,24 @@
-from django.shortcuts import render, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.core.serializers import serialize
 from django.views.decorators.http import require_http_methods
+from django.utils.dateparse import parse_date
+from decimal import Decimal
 import json
-from .models import Contractor, ContractorPayment
+from .accruals import accrual_summary
+from .models import Contractor, ContractorPayment, ContractorAttendance, ContractorBalance
 from transactions.models import Project
+from idempotency.keys import idempotent
 
 @login_required
 @require_http_methods(["GET", "POST"])
-def contractor_list_create(request):
+async def contractor_list_create(request):
     if request.method == "GET":
-        contractors = Contractor.objects.all()
+        contractors = Contractor.objects.prefetch_related('projects')
         data = []
-        for contractor in contractors:
+        async for contractor in contractors.aiterator(chunk_size=500):
             data.append({
                 'id': contractor.id,
                 'name': contractor.name,
@@ -29,33 +34,36 @@ def contractor_list_create(request):
         return JsonResponse(data, safe=False)
     
     elif request.method == "POST":
-        try:
-            data = json.loads(request.body)
-            contractor = Contractor.objects.create(
-                name=data['name'],
-                company_name=data.get('company_name', ''),
-                contact_person=data['contact_person'],
-                phone=data['phone'],
-                email=data.get('email', ''),
-                address=data['address'],
-                specialization=data['specialization'],
-                rate_per_day=data['rate_per_day'],
-                is_active=data.get('is_active', True)
-            )
-            
-            # Add projects if provided
-            if 'projects' in data:
-                project_ids = data['projects']
-                projects = Project.objects.filter(id__in=project_ids)
-                contractor.projects.set(projects)
-            
-            return JsonResponse({
-                'id': contractor.id,
-                'name': contractor.name,
-                'message': 'Contractor created successfully'
-            })
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=400)
+        return await sync_to_async(_create_contractor)(request)
+
+def _create_contractor(request):
+    try:
+        data = json.loads(request.body)
+        contractor = Contractor.objects.create(
+            name=data['name'],
+            company_name=data.get('company_name', ''),
+            contact_person=data['contact_person'],
+            phone=data['phone'],
+            email=data.get('email', ''),
+            address=data['address'],
+            specialization=data['specialization'],
+            rate_per_day=data['rate_per_day'],
+            is_active=data.get('is_active', True)
+        )
+
+        # Add projects if provided
+        if 'projects' in data:
+            project_ids = data['projects']
+            projects = Project.objects.filter(id__in=project_ids)
+            contractor.projects.set(projects)
+
+        return JsonResponse({
+            'id': contractor.id,
+            'name': contractor.name,
+            'message': 'Contractor created successfully'
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
 
 @login_required
 @require_http_methods(["GET", "PUT", "DELETE"])
@@ -110,13 +118,13 @@ def contractor_detail(request, pk):
 
 @login_required
 @require_http_methods(["GET", "POST"])
-def contractor_payments(request, contractor_id):
-    contractor = get_object_or_404(Contractor, pk=contractor_id)
+async def contractor_payments(request, contractor_id):
+    contractor = await aget_object_or_404(Contractor, pk=contractor_id)
     
     if request.method == "GET":
-        payments = contractor.payments.all()
+        payments = contractor.payments.select_related('project')
         data = []
-        for payment in payments:
+        async for payment in payments.aiterator():
             data.append({
                 'id': payment.id,
                 'amount': str(payment.amount),
@@ -128,24 +136,168 @@ def contractor_payments(request, contractor_id):
             })
         return JsonResponse(data, safe=False)
     
+    elif request.method == "POST":
+        return await sync_to_async(_record_contractor_payment)(request, contractor)
+
+@idempotent('contractors:contractor_payments')
+def _record_contractor_payment(request, contractor):
+    try:
+        data = json.loads(request.body)
+        project = get_object_or_404(Project, pk=data['project_id'])
+
+        payment = ContractorPayment.objects.create(
+            contractor=contractor,
+            project=project,
+            amount=data['amount'],
+            payment_date=data['payment_date'],
+            payment_method=data['payment_method'],
+            transaction_id=data.get('transaction_id'),
+            description=data.get('description', '')
+        )
+
+        return JsonResponse({
+            'id': payment.id,
+            'message': 'Payment recorded successfully'
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+def _id_list(value):
+    """Parse a comma separated id filter, or None when absent"""
+    if not value:
+        return None
+    return [int(pk) for pk in value.split(',') if pk.strip().isdigit()]
+
+def _optional_date(value):
+    """Parse an optional ISO date filter, raising ValueError for a bad one"""
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f'Invalid date: {value!r}')
+    return parsed
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def contractor_attendance(request, contractor_id):
+    """API view to list or record the days a contractor was engaged"""
+    contractor = get_object_or_404(Contractor, pk=contractor_id)
+
+    if request.method == "GET":
+        attendance = contractor.attendance.select_related('project')
+        project_ids = _id_list(request.GET.get('project'))
+        if project_ids is not None:
+            attendance = attendance.filter(project_id__in=project_ids)
+        data = [{
+            'id': entry.id,
+            'project': {'id': entry.project.id, 'name': entry.project.name},
+            'date': entry.date.strftime('%Y-%m-%d'),
+            'days': str(entry.days),
+            'rate': str(entry.rate),
+            'amount': str(entry.amount),
+            'notes': entry.notes,
+        } for entry in attendance]
+        return JsonResponse(data, safe=False)
+
     elif request.method == "POST":
         try:
             data = json.loads(request.body)
             project = get_object_or_404(Project, pk=data['project_id'])
-            
-            payment = ContractorPayment.objects.create(
+            entry = ContractorAttendance(
                 contractor=contractor,
                 project=project,
-                amount=data['amount'],
-                payment_date=data['payment_date'],
-                payment_method=data['payment_method'],
-                transaction_id=data.get('transaction_id'),
-                description=data.get('description', '')
+                date=data['date'],
+                days=data.get('days', '1'),
+                rate=data.get('rate'),
+                notes=data.get('notes', '')
             )
-            
+            entry.full_clean()
+            entry.save()
+            entry.refresh_from_db(fields=['amount'])
             return JsonResponse({
-                'id': payment.id,
-                'message': 'Payment recorded successfully'
-            })
+                'id': entry.id,
+                'amount': str(entry.amount),
+                'message': 'Attendance recorded successfully'
+            }, status=201)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
+
+@login_required
+@require_http_methods(["GET"])
+def contractor_balances(request):
+    """API view to list cached payable balances per contractor and project"""
+    balances = ContractorBalance.objects.select_related('contractor', 'project')
+    contractor_ids = _id_list(request.GET.get('contractor'))
+    project_ids = _id_list(request.GET.get('project'))
+    if contractor_ids is not None:
+        balances = balances.filter(contractor_id__in=contractor_ids)
+    if project_ids is not None:
+        balances = balances.filter(project_id__in=project_ids)
+    if request.GET.get('outstanding'):
+        balances = balances.filter(balance__gt=0)
+
+    rows = []
+    totals = {'earned': Decimal('0.00'), 'paid': Decimal('0.00'), 'balance': Decimal('0.00')}
+    for row in balances:
+        rows.append({
+            'contractor': {'id': row.contractor.id, 'name': row.contractor.name},
+            'project': {'id': row.project.id, 'name': row.project.name},
+            'days': str(row.days),
+            'earned': str(row.earned),
+            'paid': str(row.paid),
+            'balance': str(row.balance),
+            'updated_at': row.updated_at.isoformat(),
+        })
+        for key in totals:
+            totals[key] += getattr(row, key)
+    return JsonResponse({
+        'balances': rows,
+        'totals': {key: str(value) for key, value in totals.items()},
+    })
+
+@login_required
+@require_http_methods(["GET"])
+def contractor_settlement(request):
+    """API view to total earnings and payments per contractor and project for a period"""
+    try:
+        start = _optional_date(request.GET.get('from'))
+        end = _optional_date(request.GET.get('to'))
+    except ValueError:
+        return JsonResponse({'error': 'from and to must be valid YYYY-MM-DD dates'}, status=400)
+    if start and end and start > end:
+        return JsonResponse({'error': 'from must not be after to'}, status=400)
+    summary = accrual_summary(
+        contractor_ids=_id_list(request.GET.get('contractor')),
+        project_ids=_id_list(request.GET.get('project')),
+        start=start,
+        end=end,
+    )
+    contractors = Contractor.objects.only('name').in_bulk({key[0] for key in summary})
+    projects = Project.objects.only('name').in_bulk({key[1] for key in summary})
+
+    by_contractor = {}
+    for (contractor_id, project_id), entry in sorted(
+        summary.items(), key=lambda item: (contractors[item[0][0]].name, projects[item[0][1]].name)
+    ):
+        settlement = by_contractor.setdefault(contractor_id, {
+            'contractor': {'id': contractor_id, 'name': contractors[contractor_id].name},
+            'projects': [],
+            'earned': Decimal('0.00'),
+            'paid': Decimal('0.00'),
+            'balance': Decimal('0.00'),
+        })
+        settlement['projects'].append({
+            'project': {'id': project_id, 'name': projects[project_id].name},
+            **{key: str(value) for key, value in entry.items()},
+        })
+        for key in ('earned', 'paid', 'balance'):
+            settlement[key] += entry[key]
+
+    for settlement in by_contractor.values():
+        for key in ('earned', 'paid', 'balance'):
+            settlement[key] = str(settlement[key])
+    return JsonResponse({
+        'from': start.isoformat() if start else None,
+        'to': end.isoformat() if end else None,
+        'contractors': list(by_contractor.values()),
+    })
@@ -6,36 +6,13 @@ def setup_django():
     django.setup()
 
 def create_initial_data():
-    from users.models import Role, Permission, CustomUser
+    from users.models import Role, CustomUser
+    from users.provisioning import DEFAULT_ROLE_SPEC, provision_roles
 
-    # Create admin role if it doesn't exist
-    admin_role, created = Role.objects.get_or_create(
-        name='admin',
-        defaults={
-            'description': 'Administrator with full system access'
-        }
-    )
-    if created:
-        print('Admin role created successfully')
-    else:
-        print('Admin role already exists')
-
-    # Create permissions for each module and action
-    modules = ['vendors', 'labour', 'transactions', 'reporting', 'users']
-    actions = ['view', 'add', 'edit', 'delete', 'approve']
-
-    for module in modules:
-        for action in actions:
-            permission, created = Permission.objects.get_or_create(
-                module=module,
-                action=action,
-                defaults={
-                    'description': f'{action.title()} {module}'
-                }
-            )
-            if created:
-                print(f'Created permission: {permission}')
-            admin_role.permissions.add(permission)
+    # Create the admin role and every module/action permission in bulk
+    summary = provision_roles({'roles': {'admin': DEFAULT_ROLE_SPEC['roles']['admin']}})
+    print(f"Admin role ready ({summary['permissions_created']} permissions created)")
+    admin_role = Role.objects.get(name='admin')
 
     # Create superuser if it doesn't exist
     if not CustomUser.objects.filter(email='admin@example.com').exists():
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import IdempotencyKey
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'scope', 'user', 'status_code', 'created_at', 'expires_at')
+    list_filter = ('scope', 'status_code')
+    search_fields = ('key', 'user__email')
+    exclude = ('response_body',)
+    date_hierarchy = 'created_at'
@@ -0,0 +1,117 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+# HTML forms can't set headers, so they post the key in a hidden field
+IDEMPOTENCY_FIELD = 'idempotency_key'
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL = 60 * 60 * 24
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _replay(record):
+    response = HttpResponse(bytes(record.response_body), status=record.status_code, content_type=record.content_type)
+    if record.location:
+        response['Location'] = record.location
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def run_idempotent(request, scope, handler, payload=None):
+    """Run handler at most once per (user, Idempotency-Key).
+
+    The first request with a key reserves it before running the handler
+    and stores the successful response afterwards. A retry with the same
+    key and body gets that response back without the write being redone;
+    a retry while the first is still running gets 409, and reusing a key
+    for a different request gets 422. Failed requests (4xx/5xx or an
+    exception) release the key so the client can try again.
+    """
+    if request.method != 'POST' or not request.user.is_authenticated:
+        return handler()
+    if payload is None:
+        payload = request.body  # read before request.POST so multipart bodies stay readable
+    key = request.headers.get(IDEMPOTENCY_HEADER) or request.POST.get(IDEMPOTENCY_FIELD)
+    if not key:
+        return handler()
+    if len(key) > MAX_KEY_LENGTH:
+        return JsonResponse({'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'}, status=400)
+
+    request_hash = _sha256(f'{request.method} {request.path}\n'.encode() + payload)
+    now = timezone.now()
+    ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL))
+    try:
+        with transaction.atomic():
+            # Expired keys are free for reuse even if the purge hasn't run yet
+            IdempotencyKey.objects.filter(user=request.user, key=key, expires_at__lte=now).delete()
+            record = IdempotencyKey.objects.create(
+                user=request.user, key=key, scope=scope, request_hash=request_hash, expires_at=now + ttl,
+            )
+    except IntegrityError:
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is None:
+            return JsonResponse({'error': 'Idempotency key is being released; retry shortly'}, status=409)
+        if record.scope != scope or record.request_hash != request_hash:
+            return JsonResponse(
+                {'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}, status=422
+            )
+        if record.status_code is None:
+            response = JsonResponse({'error': 'A request with this idempotency key is still in progress'}, status=409)
+            response['Retry-After'] = '1'
+            return response
+        return _replay(record)
+
+    try:
+        response = handler()
+    except Exception:
+        record.delete()
+        raise
+    if response.status_code >= 400 or response.streaming:
+        record.delete()
+        return response
+
+    body = response.content
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        status_code=response.status_code,
+        content_type=response.get('Content-Type', ''),
+        location=response.get('Location', ''),
+        response_body=body,
+        response_hash=_sha256(body),
+    )
+    return response
+
+
+def idempotent(scope):
+    """Decorator applying run_idempotent to a function-based view"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            return run_idempotent(request, scope, lambda: view_func(request, *args, **kwargs))
+        return wrapped
+    return decorator
+
+
+class IdempotentCreateMixin:
+    """Viewset mixin making create() idempotent under idempotency_scope"""
+    idempotency_scope = None
+
+    def create(self, request, *args, **kwargs):
+        def handler():
+            # Render now so the body can be stored; dispatch passes it through
+            response = self.finalize_response(request, super(IdempotentCreateMixin, self).create(request, *args, **kwargs))
+            return response.render()
+
+        payload = json.dumps(request.data, sort_keys=True, default=str).encode()
+        return run_idempotent(request, self.idempotency_scope, handler, payload=payload)
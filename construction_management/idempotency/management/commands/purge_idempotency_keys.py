@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from idempotency.models import IdempotencyKey
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Delete expired idempotency keys; schedule it hourly or daily'
+
+    def handle(self, *args, **options):
+        expired = IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+        deleted = 0
+        # Short deletes by primary key keep each write lock brief; no
+        # cascades or signals apply to these rows, so skip the collector
+        while batch := list(expired.values_list('pk', flat=True)[:BATCH_SIZE]):
+            batch_rows = IdempotencyKey.objects.filter(pk__in=batch)
+            deleted += batch_rows._raw_delete(batch_rows.db)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
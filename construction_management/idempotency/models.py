@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import models
+
+class IdempotencyKey(models.Model):
+    """Client-supplied key for a write request and the response it produced.
+
+    A row with no status_code is a request still in flight. Rows expire
+    after IDEMPOTENCY_KEY_TTL and are removed by purge_idempotency_keys.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys'
+    )
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=100, help_text='Endpoint the key was used on')
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    location = models.CharField(max_length=500, blank=True)
+    response_body = models.BinaryField(blank=True, default=b'')
+    response_hash = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
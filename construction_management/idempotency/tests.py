@@ -0,0 +1,128 @@
+import json
+from io import StringIO
+import random
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from construction_management import factories
+from labour.models import LabourPayment
+from transactions.models import FinancialTransaction
+from vendors.models import Payment
+
+from .models import IdempotencyKey
+
+
+class IdempotencyKeyTests(TestCase):
+    """Tests for Idempotency-Key handling on payment endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='accounts@example.com', password='test-pass-123'
+        )
+        self.client.force_login(self.user)
+        rng = random.Random(7)
+        labour_types, skills = factories.make_labour_types()
+        self.labourer = factories.make_labourers(1, labour_types, skills, rng=rng)[0]
+        self.logs = factories.make_work_logs([self.labourer], skills, date(2024, 3, 1), 3, attendance=1, rng=rng)
+
+    def post_payment(self, key='pay-001', **overrides):
+        payload = {
+            'labourer': self.labourer.id,
+            'work_logs': [log.id for log in self.logs],
+            'amount': '4500.00',
+            'payment_date': '2024-03-04',
+            'payment_method': 'cash',
+            **overrides,
+        }
+        return self.client.post(
+            reverse('labour:labour_payment_api'), json.dumps(payload),
+            content_type='application/json', headers={'Idempotency-Key': key},
+        )
+
+    def test_retry_replays_stored_response_without_second_write(self):
+        first = self.post_payment()
+        self.assertEqual(first.status_code, 201)
+        retry = self.post_payment()
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(LabourPayment.objects.count(), 1)
+        self.assertEqual(LabourPayment.objects.get().work_logs.count(), len(self.logs))
+
+    def test_key_reused_for_different_body_is_rejected(self):
+        self.post_payment()
+        response = self.post_payment(amount='9999.00')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(LabourPayment.objects.count(), 1)
+
+    def test_failed_request_releases_key(self):
+        response = self.post_payment(amount='0')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post_payment().status_code, 201)
+
+    def test_work_logs_must_belong_to_labourer(self):
+        other = factories.make_labourers(1, *factories.make_labour_types(), start=1)[0]
+        response = self.post_payment(labourer=other.id)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('work_logs', response.json()['errors'])
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.post_payment(key='')
+        self.post_payment(key='')
+        self.assertEqual(LabourPayment.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_vendor_payment_viewset_replays(self):
+        _, products = factories.make_vendors(1, rng=random.Random(3))
+        purchase = factories.make_purchases(1, products, date(2024, 3, 1), days=1, paid_share=0, rng=random.Random(3))[0]
+        payload = {'purchase': purchase.id, 'amount': '100.00', 'payment_date': '2024-03-05', 'payment_method': 'cash'}
+        responses = [
+            self.client.post(reverse('payment-list'), payload, content_type='application/json',
+                             headers={'Idempotency-Key': 'vendor-pay-1'})
+            for _ in range(2)
+        ]
+        self.assertEqual([r.status_code for r in responses], [201, 201])
+        self.assertEqual(responses[1].content, responses[0].content)
+        self.assertEqual(Payment.objects.filter(purchase=purchase).count(), 1)
+
+    def test_transaction_form_hidden_key_prevents_double_submit(self):
+        form = self.client.get(reverse('transactions:transaction_add'))
+        key = form.context['idempotency_key']
+        payload = {
+            'transaction_type': 'expense', 'amount': '2500.00', 'date': '2024-03-04',
+            'description': 'Cement delivery', 'payment_method': 'cash', 'idempotency_key': key,
+        }
+        first = self.client.post(reverse('transactions:transaction_add'), payload)
+        second = self.client.post(reverse('transactions:transaction_add'), payload)
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(FinancialTransaction.objects.count(), 1)
+
+    def test_purge_removes_expired_keys(self):
+        self.post_payment(key='old')
+        self.post_payment(key='fresh', amount='10.00')
+        IdempotencyKey.objects.filter(key='old').update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['fresh'])
+
+    def test_purge_deletes_keys_expiring_now_in_batches(self):
+        for key in ('a', 'b', 'c'):
+            self.post_payment(key=key)
+        now = timezone.now()
+        IdempotencyKey.objects.filter(key__in=['a', 'b']).update(expires_at=now)
+        IdempotencyKey.objects.filter(key='c').update(expires_at=now + timedelta(microseconds=1))
+        command = 'idempotency.management.commands.purge_idempotency_keys'
+        out = StringIO()
+        with mock.patch(f'{command}.timezone.now', return_value=now), mock.patch(f'{command}.BATCH_SIZE', 1):
+            call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 2 expired', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['c'])
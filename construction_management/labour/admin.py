@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import LabourType, Skill, Labourer, WorkLog, LabourPayment
+from .models import LabourType, Skill, Labourer, WageRate, WorkLog, LabourPayment
+from .wages import with_current_wage, with_wage_rates
 
 @admin.register(LabourType)
 class LabourTypeAdmin(admin.ModelAdmin):
@@ -12,13 +13,20 @@ class SkillAdmin(admin.ModelAdmin):
     list_filter = ('labour_type',)
     search_fields = ('name', 'description')
 
+class WageRateInline(admin.TabularInline):
+    model = WageRate
+    fields = ('effective_from', 'effective_to', 'daily_wage')
+    readonly_fields = ('effective_to',)
+    extra = 0
+
 @admin.register(Labourer)
 class LabourerAdmin(admin.ModelAdmin):
-    list_display = ('name', 'cnic', 'phone', 'labour_type', 'daily_wage', 'is_active')
+    list_display = ('name', 'cnic', 'phone', 'labour_type', 'current_wage', 'is_active')
     list_filter = ('labour_type', 'is_active', 'joining_date')
     search_fields = ('name', 'cnic', 'phone')
     filter_horizontal = ('skills',)
     date_hierarchy = 'joining_date'
+    inlines = [WageRateInline]
     fieldsets = (
         ('Personal Information', {
             'fields': ('name', 'cnic', 'phone', 'address')
@@ -34,6 +42,13 @@ class LabourerAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return with_current_wage(super().get_queryset(request))
+
+    @admin.display(description='Daily wage', ordering='current_wage')
+    def current_wage(self, obj):
+        return f'{obj.current_wage:.2f}'
+
 @admin.register(WorkLog)
 class WorkLogAdmin(admin.ModelAdmin):
     list_display = ('labourer', 'work_date', 'hours_worked', 'daily_wage_amount')
@@ -43,6 +58,9 @@ class WorkLogAdmin(admin.ModelAdmin):
     filter_horizontal = ('tasks_performed',)
     readonly_fields = ('daily_wage_amount',)
 
+    def get_queryset(self, request):
+        return with_wage_rates(super().get_queryset(request))
+
 @admin.register(LabourPayment)
 class LabourPaymentAdmin(admin.ModelAdmin):
     list_display = ('labourer', 'amount', 'payment_date', 'payment_method', 'bonus_amount')
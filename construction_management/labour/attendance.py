@@ -0,0 +1,137 @@
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from sync.events import publish_changes
+from .models import Labourer, WorkLog, Skill
+
+MAX_HOURS_PER_DAY = Decimal('24')
+ON_CONFLICT_CHOICES = ('skip', 'update')
+
+
+def _clean_entries(entries):
+    """Validate crew entries in bulk, returning normalised rows"""
+    if not isinstance(entries, list) or not entries:
+        raise ValidationError('At least one attendance entry is required')
+
+    errors = []
+    rows = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append(f'Entry {index}: must be an object')
+            continue
+        try:
+            labourer_id = int(entry['labourer'])
+        except (KeyError, TypeError, ValueError):
+            errors.append(f'Entry {index}: labourer is required')
+            continue
+        if labourer_id in seen:
+            errors.append(f'Entry {index}: labourer {labourer_id} is listed more than once')
+            continue
+        seen.add(labourer_id)
+        try:
+            hours = Decimal(str(entry.get('hours_worked', '8')))
+        except InvalidOperation:
+            errors.append(f'Entry {index}: invalid hours_worked')
+            continue
+        if not Decimal('0') < hours <= MAX_HOURS_PER_DAY:
+            errors.append(f'Entry {index}: hours_worked must be between 0 and {MAX_HOURS_PER_DAY}')
+            continue
+        try:
+            skill_ids = {int(skill) for skill in entry.get('tasks_performed', [])}
+        except (TypeError, ValueError):
+            errors.append(f'Entry {index}: tasks_performed must be a list of skill ids')
+            continue
+        rows.append({
+            'index': index,
+            'labourer_id': labourer_id,
+            'hours_worked': hours.quantize(Decimal('0.01')),
+            'skill_ids': skill_ids,
+            'description': str(entry.get('description', '')),
+        })
+
+    # One query each for the referenced labourers and skills
+    active_ids = set(Labourer.objects.filter(
+        id__in=[row['labourer_id'] for row in rows], is_active=True
+    ).values_list('id', flat=True))
+    all_skill_ids = set().union(*(row['skill_ids'] for row in rows))
+    known_skill_ids = set(Skill.objects.filter(id__in=all_skill_ids).values_list('id', flat=True))
+    for row in rows:
+        if row['labourer_id'] not in active_ids:
+            errors.append(f"Entry {row['index']}: labourer {row['labourer_id']} does not exist or is inactive")
+        unknown = row['skill_ids'] - known_skill_ids
+        if unknown:
+            errors.append(f"Entry {row['index']}: unknown skills {sorted(unknown)}")
+
+    if errors:
+        raise ValidationError(errors)
+    return rows
+
+
+def record_crew_attendance(work_date, entries, on_conflict='skip'):
+    """Create work logs for a whole crew on one date in a fixed number of queries.
+
+    Existing logs for the same labourer and date are left untouched when
+    on_conflict is 'skip', or have their hours, description and tasks
+    replaced when it is 'update'.
+    """
+    if on_conflict not in ON_CONFLICT_CHOICES:
+        raise ValidationError(f'on_conflict must be one of {", ".join(ON_CONFLICT_CHOICES)}')
+    rows = _clean_entries(entries)
+    labourer_ids = [row['labourer_id'] for row in rows]
+
+    with transaction.atomic():
+        # Single existence check against unique_together (labourer, work_date)
+        existing = set(WorkLog.objects.filter(
+            work_date=work_date, labourer_id__in=labourer_ids
+        ).order_by().values_list('labourer_id', flat=True))
+        if on_conflict == 'skip':
+            rows = [row for row in rows if row['labourer_id'] not in existing]
+
+        logs = [
+            WorkLog(
+                labourer_id=row['labourer_id'],
+                work_date=work_date,
+                hours_worked=row['hours_worked'],
+                description=row['description'],
+            )
+            for row in rows
+        ]
+        if on_conflict == 'update':
+            WorkLog.objects.bulk_create(
+                logs,
+                update_conflicts=True,
+                unique_fields=['labourer', 'work_date'],
+                update_fields=['hours_worked', 'description', 'updated_at'],
+            )
+        else:
+            WorkLog.objects.bulk_create(logs, ignore_conflicts=True)
+
+        log_ids = dict(WorkLog.objects.filter(
+            work_date=work_date, labourer_id__in=[row['labourer_id'] for row in rows]
+        ).order_by().values_list('labourer_id', 'id'))
+
+        Through = WorkLog.tasks_performed.through
+        if on_conflict == 'update' and existing:
+            Through.objects.filter(
+                worklog_id__in=[log_ids[labourer_id] for labourer_id in existing]
+            ).delete()
+        Through.objects.bulk_create([
+            Through(worklog_id=log_ids[row['labourer_id']], skill_id=skill_id)
+            for row in rows
+            for skill_id in row['skill_ids']
+        ], ignore_conflicts=True)
+
+        # bulk_create sends no post_save, so live streams are told here
+        for log in logs:
+            log.pk = log_ids[log.labourer_id]
+        publish_changes('created', [log for log in logs if log.labourer_id not in existing])
+        publish_changes('updated', [log for log in logs if log.labourer_id in existing])
+
+    updated = len(existing) if on_conflict == 'update' else 0
+    return {
+        'created': len(rows) - updated,
+        'updated': updated,
+        'skipped': sorted(existing) if on_conflict == 'skip' else [],
+        'work_logs': log_ids,
+    }
@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from django.db.models import Count, F, Value, CharField
+from .models import Labourer
+
+FACETS_VERSION_KEY = 'labour:facets:version'
+
+
+def _facets_version():
+    """Return the current facet cache version, initialising it if missing"""
+    return cache.get_or_set(FACETS_VERSION_KEY, 1, None)
+
+
+def invalidate_labourer_facets():
+    """Bump the facet cache version so every cached facet set goes stale"""
+    try:
+        cache.incr(FACETS_VERSION_KEY)
+    except ValueError:
+        cache.set(FACETS_VERSION_KEY, 1, None)
+
+
+def _compute_facets(is_active=None):
+    """Count labourers per labour type and per skill in one grouped query"""
+    labourers = Labourer.objects.all()
+    skill_links = Labourer.skills.through.objects.all()
+    if is_active is not None:
+        labourers = labourers.filter(is_active=is_active)
+        skill_links = skill_links.filter(labourer__is_active=is_active)
+
+    type_counts = labourers.order_by().annotate(
+        facet=Value('labour_type', output_field=CharField()),
+        facet_id=F('labour_type_id'),
+        facet_name=F('labour_type__name'),
+    ).values('facet', 'facet_id', 'facet_name').annotate(count=Count('id'))
+    skill_counts = skill_links.order_by().annotate(
+        facet=Value('skill', output_field=CharField()),
+        facet_id=F('skill_id'),
+        facet_name=F('skill__name'),
+    ).values('facet', 'facet_id', 'facet_name').annotate(count=Count('labourer_id'))
+
+    facets = {'labour_type': [], 'skill': []}
+    for row in type_counts.union(skill_counts, all=True):
+        facets[row['facet']].append({
+            'id': row['facet_id'],
+            'name': row['facet_name'],
+            'count': row['count'],
+        })
+    for values in facets.values():
+        values.sort(key=lambda item: item['name'])
+    return facets
+
+
+def labourer_facets(is_active=None):
+    """Return cached labour type and skill facet counts for the roster"""
+    key = f'labour:facets:v{_facets_version()}:{is_active}'
+    return cache.get_or_set(key, lambda: _compute_facets(is_active))
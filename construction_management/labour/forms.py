@@ -0,0 +1,39 @@
+from django import forms
+from .models import LabourPayment, WageRate
+
+
+class LabourPaymentForm(forms.ModelForm):
+    """Form for recording a payment against a labourer's work logs"""
+
+    class Meta:
+        model = LabourPayment
+        fields = [
+            'labourer', 'work_logs', 'amount', 'payment_date', 'payment_method',
+            'transaction_id', 'bonus_amount', 'notes',
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['bonus_amount'].required = False
+
+    def clean_bonus_amount(self):
+        bonus = self.cleaned_data['bonus_amount']
+        return self.fields['bonus_amount'].initial if bonus is None else bonus
+
+    def clean(self):
+        cleaned_data = super().clean()
+        labourer = cleaned_data.get('labourer')
+        work_logs = cleaned_data.get('work_logs')
+        if labourer and work_logs:
+            foreign = [log.id for log in work_logs if log.labourer_id != labourer.id]
+            if foreign:
+                self.add_error('work_logs', f'Work logs {foreign} belong to another labourer')
+        return cleaned_data
+
+
+class WageRateForm(forms.ModelForm):
+    """Form for setting a labourer's daily wage from a date"""
+
+    class Meta:
+        model = WageRate
+        fields = ['daily_wage', 'effective_from']
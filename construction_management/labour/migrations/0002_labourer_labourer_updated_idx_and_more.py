@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labour', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='labourer',
+            index=models.Index(fields=['updated_at', 'id'], name='labourer_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='worklog',
+            index=models.Index(fields=['updated_at', 'id'], name='worklog_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labour', '0002_labourer_labourer_updated_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='labourtype',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
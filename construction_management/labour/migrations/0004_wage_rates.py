@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:38
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def backfill_wage_rates(apps, schema_editor):
+    """Seed each labourer's rate history with their current wage from joining"""
+    Labourer = apps.get_model('labour', 'Labourer')
+    WageRate = apps.get_model('labour', 'WageRate')
+    WageRate.objects.bulk_create([
+        WageRate(labourer_id=labourer_id, effective_from=joining_date, daily_wage=daily_wage)
+        for labourer_id, joining_date, daily_wage in Labourer.objects.values_list('id', 'joining_date', 'daily_wage')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labour', '0003_labourtype_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WageRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_from', models.DateField()),
+                ('effective_to', models.DateField(blank=True, editable=False, help_text='Start of the next rate (exclusive); empty while this rate is current', null=True)),
+                ('daily_wage', models.DecimalField(decimal_places=2, help_text='Daily wage in PKR', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('labourer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wage_rates', to='labour.labourer')),
+            ],
+            options={
+                'ordering': ['labourer', 'effective_from'],
+                'unique_together': {('labourer', 'effective_from')},
+            },
+        ),
+        migrations.RunPython(backfill_wage_rates, migrations.RunPython.noop),
+    ]
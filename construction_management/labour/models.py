@@ -12,6 +12,7 @@ class LabourType(models.Model):
         validators=[MinValueValidator(Decimal('0.01'))],
         help_text='Base daily wage in PKR for this labour type'
     )
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -76,11 +77,60 @@ class Labourer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded wage so changes can be recorded as wage rates"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_daily_wage = instance.__dict__.get('daily_wage')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        if fields is None or 'daily_wage' in fields:
+            self._loaded_daily_wage = self.daily_wage
+
+    def wage_on(self, day):
+        """Daily wage in force on a date, falling back to the labourer's daily_wage"""
+        rate = self.wage_rates.filter(effective_from__lte=day).order_by('-effective_from').first()
+        return rate.daily_wage if rate else self.daily_wage
+
     def __str__(self):
         return f"{self.name} - {self.labour_type.name}"
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='labourer_updated_idx'),
+        ]
+
+class WageRate(models.Model):
+    """A labourer's daily wage from one date until the next rate takes over"""
+    labourer = models.ForeignKey(
+        Labourer,
+        on_delete=models.CASCADE,
+        related_name='wage_rates'
+    )
+    effective_from = models.DateField()
+    effective_to = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='Start of the next rate (exclusive); empty while this rate is current'
+    )
+    daily_wage = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        help_text='Daily wage in PKR'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.labourer.name} - {self.daily_wage} from {self.effective_from}"
+
+    class Meta:
+        ordering = ['labourer', 'effective_from']
+        unique_together = ['labourer', 'effective_from']
 
 class WorkLog(models.Model):
     """Model for tracking labourer work hours and tasks"""
@@ -110,10 +160,18 @@ class WorkLog(models.Model):
     
     @property
     def daily_wage_amount(self):
-        """Calculate daily wage based on hours worked"""
+        """Calculate daily wage based on hours worked.
+
+        Work logs from labour.wages.with_wage_rates are priced at the rate in
+        force on the work date; others at the labourer's daily_wage, so that
+        listing them doesn't look up a rate per row.
+        """
         full_day_hours = Decimal('8.0')  # Standard work day
         wage_ratio = self.hours_worked / full_day_hours
-        return self.labourer.daily_wage * wage_ratio
+        rate = getattr(self, 'daily_rate', None)
+        if rate is None:
+            rate = self.labourer.daily_wage
+        return rate * wage_ratio
     
     def __str__(self):
         return f"{self.labourer.name} - {self.work_date}"
@@ -121,6 +179,9 @@ class WorkLog(models.Model):
     class Meta:
         ordering = ['-work_date']
         unique_together = ['labourer', 'work_date']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='worklog_updated_idx'),
+        ]
 
 class LabourPayment(models.Model):
     """Model for tracking payments made to labourers"""
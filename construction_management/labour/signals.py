@@ -0,0 +1,65 @@
+from decimal import Decimal
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from construction_management.fragments import invalidate_fragments
+from .facets import invalidate_labourer_facets
+from .models import LabourType, Skill, Labourer, WageRate
+from .wages import refresh_wage_intervals, set_wage_rate
+
+
+@receiver(post_save, sender=Labourer)
+@receiver(post_delete, sender=Labourer)
+@receiver(post_save, sender=LabourType)
+@receiver(post_delete, sender=LabourType)
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def labourer_roster_changed(sender, **kwargs):
+    """Drop cached facet counts whenever the roster or its labels change"""
+    invalidate_labourer_facets()
+
+
+@receiver(m2m_changed, sender=Labourer.skills.through)
+def labourer_skills_changed(sender, action, **kwargs):
+    """Drop cached facet counts and rows when a labourer's skills change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_labourer_facets()
+        invalidate_fragments(Labourer._meta.label_lower)
+
+
+@receiver(post_save, sender=LabourType)
+@receiver(post_delete, sender=LabourType)
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def labourer_labels_changed(sender, **kwargs):
+    """Drop cached labourer rows, which show labour type and skill names"""
+    invalidate_fragments(Labourer._meta.label_lower)
+
+
+@receiver(post_save, sender=Labourer)
+def labourer_wage_changed(sender, instance, created, **kwargs):
+    """Record a new labourer's wage, or a changed one, as an effective-dated rate.
+
+    A new labourer's rate starts on their joining date; a change starts on
+    instance.wage_effective_from if the caller set it, otherwise today.
+    daily_wage keeps the value entered; listings show the rate in force
+    through with_current_wage. A labourer with no rates yet (bulk inserted)
+    first gets their previous wage from joining, so earlier work keeps it.
+    """
+    wage = Decimal(str(instance.daily_wage))
+    loaded = getattr(instance, '_loaded_daily_wage', None)
+    if created:
+        set_wage_rate(instance, wage, instance.joining_date)
+    elif wage != loaded:
+        effective_from = getattr(instance, 'wage_effective_from', None) or timezone.localdate()
+        if loaded is not None and not instance.wage_rates.exists():
+            set_wage_rate(instance, loaded, instance.joining_date)
+        set_wage_rate(instance, wage, effective_from)
+    instance._loaded_daily_wage = wage
+
+
+@receiver(post_save, sender=WageRate)
+@receiver(post_delete, sender=WageRate)
+def wage_rate_changed(sender, instance, **kwargs):
+    """Keep the labourer's rate intervals contiguous"""
+    refresh_wage_intervals([instance.labourer_id])
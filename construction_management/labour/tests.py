@@ -1,3 +1,391 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .facets import labourer_facets
+from .models import LabourType, Skill, Labourer, WageRate, WorkLog
+from .wages import WageSchedule, payroll_summary, with_current_wage, with_wage_rates
+
+
+class LabourTestMixin:
+    """Shared fixtures for labour view tests"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='supervisor@example.com', password='test-pass-123'
+        )
+        self.client.force_login(self.user)
+        self.mason = LabourType.objects.create(name='Mason', base_daily_wage=Decimal('1500.00'))
+        self.helper = LabourType.objects.create(name='Helper', base_daily_wage=Decimal('1000.00'))
+        self.bricklaying = Skill.objects.create(name='Bricklaying', labour_type=self.mason)
+        self.plastering = Skill.objects.create(name='Plastering', labour_type=self.mason)
+        self.lifting = Skill.objects.create(name='Lifting', labour_type=self.helper)
+
+    def make_labourers(self, count, labour_type=None, start=0):
+        labour_type = labour_type or self.mason
+        return [
+            Labourer.objects.create(
+                name=f'Labourer {i:04d}',
+                cnic=f'35202-{i:07d}-1',
+                phone='0300-0000000',
+                address='Site camp',
+                labour_type=labour_type,
+                daily_wage=Decimal('1600.00'),
+                joining_date=date(2024, 1, 1),
+            )
+            for i in range(start, start + count)
+        ]
+
+    def make_work_logs(self, labourers, work_date, skills=None):
+        skills = skills or [self.bricklaying, self.plastering]
+        logs = []
+        for labourer in labourers:
+            log = WorkLog.objects.create(
+                labourer=labourer, work_date=work_date, hours_worked=Decimal('8.00')
+            )
+            log.tasks_performed.set(skills)
+            logs.append(log)
+        return logs
+
+
+class WorkLogListTests(LabourTestMixin, TestCase):
+    """Tests for the date-windowed work log browser"""
+
+    window_start = date(2024, 3, 4)
+
+    def get(self, **params):
+        params.setdefault('start', self.window_start.isoformat())
+        return self.client.get(reverse('labour:worklog_list'), params)
+
+    def test_query_count_is_fixed_regardless_of_rows(self):
+        labourers = self.make_labourers(5)
+        self.make_work_logs(labourers, self.window_start)
+        # session, user, logs, prefetched tasks, labourer/type/skill dropdowns
+        with self.assertNumQueries(7):
+            self.get()
+
+        more = self.make_labourers(40, start=5)
+        for offset in range(3):
+            self.make_work_logs(more, self.window_start + timedelta(days=offset + 1))
+        with self.assertNumQueries(7):
+            response = self.get()
+        self.assertEqual(len(response.context['work_logs']), 125)
+
+    def test_json_mode_query_count_and_payload(self):
+        labourers = self.make_labourers(10)
+        self.make_work_logs(labourers, self.window_start)
+        with self.assertNumQueries(4):
+            response = self.get(format='json')
+        payload = response.json()
+        self.assertEqual(payload['start'], '2024-03-04')
+        self.assertEqual(payload['end'], '2024-03-10')
+        self.assertEqual(len(payload['results']), 10)
+        self.assertEqual(
+            [task['name'] for task in payload['results'][0]['tasks_performed']],
+            ['Bricklaying', 'Plastering'],
+        )
+        self.assertEqual(payload['results'][0]['daily_wage_amount'], '1600.00')
+        self.assertIn('start=2024-02-26', payload['previous'])
+        self.assertIn('start=2024-03-11', payload['next'])
+
+    def test_window_excludes_other_weeks(self):
+        labourers = self.make_labourers(2)
+        self.make_work_logs(labourers[:1], self.window_start)
+        self.make_work_logs(labourers[1:], self.window_start + timedelta(days=7))
+        payload = self.get(format='json').json()
+        self.assertEqual([r['labourer']['id'] for r in payload['results']], [labourers[0].id])
+
+        payload = self.get(format='json', days='14').json()
+        self.assertEqual(len(payload['results']), 2)
+
+    def test_filters(self):
+        masons = self.make_labourers(3)
+        helpers = self.make_labourers(2, labour_type=self.helper, start=3)
+        self.make_work_logs(masons, self.window_start)
+        self.make_work_logs(helpers, self.window_start, skills=[self.lifting])
+
+        payload = self.get(format='json', labour_type=self.helper.id).json()
+        self.assertEqual(len(payload['results']), 2)
+
+        payload = self.get(format='json', skill=self.bricklaying.id).json()
+        self.assertEqual(len(payload['results']), 3)
+        # Filtering on a skill must not drop the other prefetched tasks
+        self.assertEqual(len(payload['results'][0]['tasks_performed']), 2)
+
+        payload = self.get(format='json', labourer=masons[1].id).json()
+        self.assertEqual([r['id'] for r in payload['results']], [masons[1].work_logs.get().id])
+
+
+class LabourListTests(LabourTestMixin, TestCase):
+    """Tests for the filtered, paginated labourer directory"""
+
+    def get(self, **params):
+        return self.client.get(reverse('labour:labour_list'), params)
+
+    def test_query_count_is_fixed_with_warm_facets(self):
+        labourers = self.make_labourers(120)
+        for labourer in labourers:
+            labourer.skills.set([self.bricklaying, self.plastering])
+        self.get()
+        # session, user, page count, page rows, prefetched skills
+        with self.assertNumQueries(5):
+            response = self.get(page='2')
+        self.assertEqual(len(response.context['labourers']), 50)
+        self.assertEqual(response.context['page_obj'].paginator.count, 120)
+
+    def test_facets_computed_in_one_query_and_cached(self):
+        masons = self.make_labourers(3)
+        self.make_labourers(2, labour_type=self.helper, start=3)
+        masons[0].skills.set([self.bricklaying, self.plastering])
+        masons[1].skills.set([self.bricklaying])
+        with self.assertNumQueries(1):
+            facets = labourer_facets()
+        with self.assertNumQueries(0):
+            self.assertEqual(labourer_facets(), facets)
+        self.assertEqual(
+            [(f['name'], f['count']) for f in facets['labour_type']],
+            [('Helper', 2), ('Mason', 3)],
+        )
+        self.assertEqual(
+            [(f['name'], f['count']) for f in facets['skill']],
+            [('Bricklaying', 2), ('Plastering', 1)],
+        )
+
+    def test_facets_invalidated_on_roster_change(self):
+        labourer = self.make_labourers(1)[0]
+        self.assertEqual(labourer_facets()['skill'], [])
+        labourer.skills.add(self.lifting)
+        self.assertEqual(labourer_facets()['skill'][0]['count'], 1)
+        labourer.is_active = False
+        labourer.save()
+        self.assertEqual(labourer_facets(is_active=True)['labour_type'], [])
+
+    def test_filters(self):
+        masons = self.make_labourers(3)
+        self.make_labourers(2, labour_type=self.helper, start=3)
+        masons[0].skills.set([self.plastering])
+        masons[1].is_active = False
+        masons[1].joining_date = date(2024, 6, 1)
+        masons[1].save()
+
+        def names(**params):
+            return [l.name for l in self.get(**params).context['labourers']]
+
+        self.assertEqual(len(names(labour_type=self.helper.id)), 2)
+        self.assertEqual(names(skill=self.plastering.id), [masons[0].name])
+        self.assertEqual(names(active='0'), [masons[1].name])
+        self.assertEqual(names(joined_from='2024-05-01'), [masons[1].name])
+        self.assertEqual(len(names(joined_to='2024-05-01')), 4)
+        self.assertEqual(names(q='0002'), [masons[2].name])
+
+
+class CrewAttendanceTests(LabourTestMixin, TestCase):
+    """Tests for bulk crew attendance entry"""
+
+    work_date = '2024-03-04'
+
+    def post(self, entries, **extra):
+        body = {'work_date': self.work_date, 'entries': entries, **extra}
+        return self.client.post(
+            reverse('labour:crew_attendance_api'), json.dumps(body), content_type='application/json'
+        )
+
+    def crew_entries(self, labourers, hours='8'):
+        return [
+            {'labourer': l.id, 'hours_worked': hours, 'tasks_performed': [self.bricklaying.id, self.plastering.id]}
+            for l in labourers
+        ]
+
+    def test_whole_crew_in_fixed_queries(self):
+        crew = self.make_labourers(150)
+        # session, user, labourers, skills, savepoint, existing, insert,
+        # log ids, through-table insert, release savepoint
+        with self.assertNumQueries(10):
+            response = self.post(self.crew_entries(crew))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 150)
+        self.assertEqual(WorkLog.objects.count(), 150)
+        self.assertEqual(WorkLog.tasks_performed.through.objects.count(), 300)
+
+    def test_existing_logs_skipped_or_updated(self):
+        crew = self.make_labourers(3)
+        self.make_work_logs(crew[:1], date(2024, 3, 4), skills=[self.lifting])
+
+        payload = self.post(self.crew_entries(crew, hours='6')).json()
+        self.assertEqual((payload['created'], payload['updated'], payload['skipped']), (2, 0, [crew[0].id]))
+        self.assertEqual(crew[0].work_logs.get().hours_worked, Decimal('8.00'))
+
+        payload = self.post(self.crew_entries(crew, hours='4'), on_conflict='update').json()
+        self.assertEqual((payload['created'], payload['updated']), (0, 3))
+        self.assertEqual(WorkLog.objects.count(), 3)
+        log = crew[0].work_logs.get()
+        self.assertEqual(log.hours_worked, Decimal('4.00'))
+        self.assertEqual(
+            sorted(log.tasks_performed.values_list('name', flat=True)), ['Bricklaying', 'Plastering']
+        )
+
+    def test_validation_rejects_whole_batch(self):
+        crew = self.make_labourers(2)
+        crew[1].is_active = False
+        crew[1].save()
+        entries = self.crew_entries(crew)
+        entries.append({'labourer': crew[0].id})
+        entries.append({'labourer': 999999, 'hours_worked': '30'})
+        response = self.post(entries)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()['errors']), 3)
+        self.assertFalse(WorkLog.objects.exists())
+
+
+class WageRateTests(LabourTestMixin, TestCase):
+    """Tests for effective-dated wage rates and payroll"""
+
+    def setUp(self):
+        super().setUp()
+        self.labourer = self.make_labourers(1)[0]
+
+    def edit_wage(self, wage, effective_from=''):
+        labourer = self.labourer
+        return self.client.post(reverse('labour:labour_edit', args=[labourer.id]), {
+            'name': labourer.name, 'cnic': labourer.cnic, 'phone': labourer.phone,
+            'address': labourer.address, 'labour_type': labourer.labour_type_id,
+            'daily_wage': wage, 'wage_effective_from': effective_from,
+            'emergency_contact': '', 'emergency_phone': '',
+            'joining_date': labourer.joining_date.isoformat(), 'is_active': 'on', 'notes': '',
+        })
+
+    def log(self, work_date, hours='8.00'):
+        return WorkLog.objects.create(labourer=self.labourer, work_date=work_date, hours_worked=Decimal(hours))
+
+    def test_a_raise_leaves_earlier_work_at_the_old_rate(self):
+        self.edit_wage('2000.00', '2024-03-01')
+        self.assertEqual(
+            list(self.labourer.wage_rates.values_list('effective_from', 'effective_to', 'daily_wage')),
+            [(date(2024, 1, 1), date(2024, 3, 1), Decimal('1600.00')), (date(2024, 3, 1), None, Decimal('2000.00'))],
+        )
+        before, after, first_day = self.log(date(2024, 2, 29)), self.log(date(2024, 3, 1), '4.00'), self.log(date(2024, 1, 1))
+        # Work before the labourer's first rate is paid at their current daily_wage
+        earlier = self.log(date(2023, 12, 31))
+
+        logs = with_wage_rates(WorkLog.objects.filter(labourer=self.labourer)).in_bulk()
+        self.assertEqual(logs[before.id].daily_rate, Decimal('1600.00'))
+        self.assertEqual(logs[after.id].wage_amount, Decimal('1000.00'))
+        self.assertEqual(logs[first_day.id].daily_rate, Decimal('1600.00'))
+        self.assertEqual(logs[earlier.id].daily_rate, Decimal('2000.00'))
+        self.assertEqual(logs[before.id].daily_wage_amount, Decimal('1600.00'))
+        # Without the annotation the labourer's daily_wage is used, with no rate query per log
+        unannotated = WorkLog.objects.select_related('labourer').get(pk=before.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(unannotated.daily_wage_amount, Decimal('2000.00'))
+
+        response = self.client.get(reverse('labour:worklog_list'), {'start': '2024-02-26', 'format': 'json'})
+        wages = {row['work_date']: row['daily_wage_amount'] for row in response.json()['results']}
+        self.assertEqual(wages, {'2024-02-29': '1600.00', '2024-03-01': '1000.00'})
+
+    def test_labourers_without_rates_fall_back_to_their_own_wage(self):
+        # bulk_create skips the signal that records a first rate
+        labourer, = Labourer.objects.bulk_create([Labourer(
+            name='Bulk', cnic='35202-9999999-1', phone='0300', address='Camp', labour_type=self.mason,
+            daily_wage=Decimal('1800.00'), joining_date=date(2024, 1, 1),
+        )])
+        log = WorkLog.objects.create(labourer=labourer, work_date=date(2024, 3, 1), hours_worked=Decimal('8.00'))
+        self.assertEqual(with_wage_rates(WorkLog.objects.filter(pk=log.pk)).get().daily_rate, Decimal('1800.00'))
+        self.assertEqual(WageSchedule([labourer.id]).rate_on(labourer.id, log.work_date), Decimal('1800.00'))
+        self.assertEqual(with_current_wage(Labourer.objects.filter(pk=labourer.pk)).get().current_wage,
+                         Decimal('1800.00'))
+        self.assertEqual(labourer.wage_on(log.work_date), Decimal('1800.00'))
+
+    def test_rates_api_backdates_a_change(self):
+        url = reverse('labour:labourer_wage_rates', args=[self.labourer.id])
+        response = self.client.post(url, json.dumps({'daily_wage': '1800.00', 'effective_from': '2024-06-01'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        created = WageRate.objects.get(labourer=self.labourer, effective_from=date(2024, 6, 1))
+        self.assertEqual(response.json(), {
+            'id': created.id, 'effective_from': '2024-06-01', 'effective_to': None, 'daily_wage': '1800.00',
+        })
+        rates = self.client.get(url).json()
+        self.assertEqual([(rate['effective_from'], rate['effective_to']) for rate in rates],
+                         [('2024-01-01', '2024-06-01'), ('2024-06-01', None)])
+        self.labourer.refresh_from_db()
+        self.assertEqual(self.labourer.daily_wage, Decimal('1800.00'))
+        # Saving the mirrored wage again does not add another rate
+        self.labourer.save()
+        self.assertEqual(self.labourer.wage_rates.count(), 2)
+
+        WageRate.objects.get(labourer=self.labourer, effective_from=date(2024, 6, 1)).delete()
+        self.assertIsNone(WageRate.objects.get(labourer=self.labourer).effective_to)
+        bad = self.client.post(url, json.dumps({'daily_wage': '0', 'effective_from': 'soon'}),
+                               content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+
+    def test_dated_edits_keep_todays_rate_current(self):
+        today = timezone.localdate()
+        response = self.edit_wage('2000.00', (today + timedelta(days=30)).isoformat())
+        # The edited wage is kept as entered and scheduled, and the user is told when it applies
+        self.labourer.refresh_from_db()
+        self.assertEqual(self.labourer.daily_wage, Decimal('2000.00'))
+        self.assertEqual(self.labourer.wage_on(today), Decimal('1600.00'))
+        self.assertEqual(self.labourer.wage_on(today + timedelta(days=30)), Decimal('2000.00'))
+        listing = self.client.get(reverse('labour:labour_list'))
+        self.assertContains(listing, 'Rs. 1600.00')
+        self.assertContains(listing, 'Rs. 2000.00 applies from')
+
+        # A rate reaching its start date shows in the list, cached row or not
+        WageRate.objects.create(labourer=self.labourer, effective_from=today, daily_wage=Decimal('1700.00'))
+        self.assertContains(self.client.get(reverse('labour:labour_list')), 'Rs. 1700.00')
+
+        self.edit_wage('1650.00', (today - timedelta(days=1)).isoformat())
+        # The backdated rate is superseded by today's
+        self.assertContains(self.client.get(reverse('labour:labour_list')), 'Rs. 1700.00')
+
+    def test_first_edit_of_a_bulk_inserted_labourer_keeps_earlier_work_at_the_old_wage(self):
+        labourer, = Labourer.objects.bulk_create([Labourer(
+            name='Bulk', cnic='35202-9999999-1', phone='0300', address='Camp', labour_type=self.mason,
+            daily_wage=Decimal('1800.00'), joining_date=date(2024, 1, 1),
+        )])
+        labourer = Labourer.objects.get(pk=labourer.pk)
+        labourer.daily_wage = Decimal('1900.00')
+        labourer.wage_effective_from = date(2024, 6, 1)
+        labourer.save()
+        self.assertEqual(labourer.wage_on(date(2024, 5, 31)), Decimal('1800.00'))
+        self.assertEqual(labourer.wage_on(date(2024, 6, 1)), Decimal('1900.00'))
+
+    def test_a_year_of_payroll_matches_the_range_join(self):
+        crew = [self.labourer] + self.make_labourers(4, start=1)
+        set_on = [date(2024, 1, 1) + timedelta(days=30 * month) for month in range(1, 12)]
+        for month, effective_from in enumerate(set_on, start=1):
+            WageRate.objects.create(labourer=crew[month % 5], effective_from=effective_from,
+                                    daily_wage=Decimal('1600.00') + 25 * month)
+        WorkLog.objects.bulk_create([
+            WorkLog(labourer=labourer, work_date=date(2023, 12, 1) + timedelta(days=day),
+                    hours_worked=Decimal(['8.00', '4.00', '10.00'][day % 3]))
+            for labourer in crew for day in range(396)
+        ])
+
+        with self.assertNumQueries(3):
+            summary = payroll_summary(date(2023, 12, 1), date(2024, 12, 31))
+        totals = {}
+        for log in with_wage_rates(WorkLog.objects.all()):
+            totals[log.labourer_id] = totals.get(log.labourer_id, Decimal('0.00')) + log.wage_amount
+        self.assertEqual({pk: entry['wages'] for pk, entry in summary.items()}, totals)
+        self.assertEqual(summary[self.labourer.id]['days'], 396)
+
+        schedule = WageSchedule([labourer.id for labourer in crew])
+        with self.assertNumQueries(0):
+            self.assertEqual(schedule.rate_on(crew[1].id, date(2024, 1, 30)), Decimal('1600.00'))
+            self.assertEqual(schedule.rate_on(crew[1].id, date(2024, 1, 31)), Decimal('1625.00'))
+            self.assertEqual(schedule.rate_on(crew[1].id, date(2023, 12, 31)), Decimal('1600.00'))
 
-# Create your tests here.
+        response = self.client.get(reverse('labour:labour_payroll_api'), {'from': '2024-01-01', 'to': '2024-01-31'})
+        payload = response.json()
+        self.assertEqual(len(payload['results']), 5)
+        self.assertEqual(payload['results'][0]['days'], 31)
+        self.assertEqual(self.client.get(reverse('labour:labour_payroll_api')).status_code, 400)
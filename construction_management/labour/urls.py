@@ -9,9 +9,14 @@ urlpatterns = [
     path('add/', views.labour_add, name='labour_add'),
     path('<int:pk>/edit/', views.labour_edit, name='labour_edit'),
     path('<int:pk>/delete/', views.labour_delete, name='labour_delete'),
+    path('<int:pk>/wages/', views.labourer_wage_rates, name='labourer_wage_rates'),
     path('types/', views.labour_types_api, name='labour_types_api'),
     # WorkLog URLs
     path('worklog/', views.worklog_list, name='worklog_list'),
     path('worklog/add/', views.worklog_add, name='worklog_add'),
+    path('worklog/crew/', views.crew_attendance_api, name='crew_attendance_api'),
     path('worklog/<int:pk>/edit/', views.worklog_edit, name='worklog_edit'),
+    # Payment URLs
+    path('payments/', views.labour_payment_api, name='labour_payment_api'),
+    path('payroll/', views.labour_payroll_api, name='labour_payroll_api'),
 ]
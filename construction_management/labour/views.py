@@ -1,22 +1,97 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
 from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from decimal import Decimal
+from datetime import date, timedelta
 from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST, require_http_methods
+import json
 from .models import Labourer, WorkLog, LabourPayment, LabourType, Skill
+from .facets import labourer_facets
+from .attendance import record_crew_attendance
+from .forms import LabourPaymentForm, WageRateForm
+from .wages import payroll_summary, set_wage_rate, sync_current_wage, with_current_wage, with_wage_rates
+from idempotency.keys import idempotent
+
+LABOURERS_PER_PAGE = 50
+
+# Work logs are browsed one date window at a time (a week by default)
+WORKLOG_WINDOW_DAYS = 7
+WORKLOG_MAX_WINDOW_DAYS = 31
+
+def _parse_date(value, default=None):
+    """Parse an ISO date from a query parameter, falling back to default"""
+    try:
+        return date.fromisoformat(value) if value else default
+    except ValueError:
+        return default
+
+def _parse_int(value, default=None):
+    """Parse an integer from a query parameter, falling back to default"""
+    try:
+        return int(value) if value else default
+    except (TypeError, ValueError):
+        return default
+
+def _parse_active(value):
+    """Map the active filter ('1'/'0'/'') to a boolean or None"""
+    return {'1': True, '0': False}.get(value)
 
 @login_required
 def labour_list(request):
-    """View to list all labourers"""
+    """View to list labourers with server-side filters and facet counts"""
+    filters = {
+        'labour_type': _parse_int(request.GET.get('labour_type')),
+        'skill': _parse_int(request.GET.get('skill')),
+        'active': _parse_active(request.GET.get('active')),
+        'joined_from': _parse_date(request.GET.get('joined_from')),
+        'joined_to': _parse_date(request.GET.get('joined_to')),
+        'q': request.GET.get('q', '').strip(),
+    }
     labourers = Labourer.objects.all()
-    return render(request, 'labour/list.html', {'labourers': labourers})
+    if filters['labour_type']:
+        labourers = labourers.filter(labour_type_id=filters['labour_type'])
+    if filters['skill']:
+        labourers = labourers.filter(skills__id=filters['skill'])
+    if filters['active'] is not None:
+        labourers = labourers.filter(is_active=filters['active'])
+    if filters['joined_from']:
+        labourers = labourers.filter(joining_date__gte=filters['joined_from'])
+    if filters['joined_to']:
+        labourers = labourers.filter(joining_date__lte=filters['joined_to'])
+    if filters['q']:
+        labourers = labourers.filter(
+            Q(name__icontains=filters['q']) |
+            Q(cnic__icontains=filters['q']) |
+            Q(phone__icontains=filters['q'])
+        )
+    labourers = with_current_wage(labourers).select_related('labour_type').prefetch_related('skills')
+    labourers = labourers.order_by('name', 'id')
+
+    page = Paginator(labourers, LABOURERS_PER_PAGE).get_page(request.GET.get('page'))
+    page_query = request.GET.copy()
+    page_query.pop('page', None)
+
+    facets = labourer_facets(filters['active'])
+    return render(request, 'labour/list.html', {
+        'labourers': page.object_list,
+        'page_obj': page,
+        'page_query': page_query.urlencode(),
+        'filters': filters,
+        'labour_types': facets['labour_type'],
+        'skills': facets['skill'],
+    })
 
 @login_required
-def labour_types_api(request):
+async def labour_types_api(request):
     """API view to return labour types as JSON"""
     labour_types = LabourType.objects.all().values('id', 'name', 'description', 'base_daily_wage')
-    return JsonResponse(list(labour_types), safe=False)
+    return JsonResponse([labour_type async for labour_type in labour_types], safe=False)
 
 @login_required
 def labour_add(request):
@@ -68,6 +143,7 @@ def labour_edit(request, pk):
             labourer.address = request.POST['address']
             labourer.labour_type_id = request.POST['labour_type']
             labourer.daily_wage = request.POST['daily_wage']
+            labourer.wage_effective_from = _parse_date(request.POST.get('wage_effective_from'))
             labourer.emergency_contact = request.POST['emergency_contact']
             labourer.emergency_phone = request.POST['emergency_phone']
             labourer.joining_date = request.POST['joining_date']
@@ -80,6 +156,9 @@ def labour_edit(request, pk):
             labourer.skills.set(skills)
             
             messages.success(request, 'Labourer updated successfully.')
+            if labourer.wage_effective_from and labourer.wage_effective_from > timezone.localdate():
+                messages.info(request, f'The daily wage of Rs. {labourer.daily_wage} applies from '
+                                       f'{labourer.wage_effective_from:%d %b %Y}.')
             return redirect('labour:labour_list')
         except Exception as e:
             messages.error(request, f'Error updating labourer: {str(e)}')
@@ -107,9 +186,78 @@ def labour_delete(request, pk):
 
 @login_required
 def worklog_list(request):
-    """View to list all work logs"""
-    work_logs = WorkLog.objects.all()
-    return render(request, 'labour/worklog_list.html', {'work_logs': work_logs})
+    """View to list work logs one date window at a time, optionally as JSON"""
+    days = _parse_int(request.GET.get('days'), WORKLOG_WINDOW_DAYS)
+    days = min(max(days, 1), WORKLOG_MAX_WINDOW_DAYS)
+    today = timezone.localdate()
+    start = _parse_date(request.GET.get('start'), today - timedelta(days=today.weekday()))
+    end = start + timedelta(days=days - 1)
+
+    filters = {
+        'labourer': _parse_int(request.GET.get('labourer')),
+        'labour_type': _parse_int(request.GET.get('labour_type')),
+        'skill': _parse_int(request.GET.get('skill')),
+    }
+    work_logs = WorkLog.objects.filter(work_date__range=(start, end))
+    if filters['labourer']:
+        work_logs = work_logs.filter(labourer_id=filters['labourer'])
+    if filters['labour_type']:
+        work_logs = work_logs.filter(labourer__labour_type_id=filters['labour_type'])
+    if filters['skill']:
+        work_logs = work_logs.filter(tasks_performed__id=filters['skill'])
+    # One query for the logs with their labourer and type, one for all tasks
+    # The wage rate in force on each date comes in the same query
+    work_logs = with_wage_rates(work_logs.select_related(
+        'labourer__labour_type'
+    ).prefetch_related(
+        'tasks_performed'
+    ).order_by('-work_date', 'labourer__name'))
+
+    # Window navigation keeps the active filters in the query string
+    previous_query = request.GET.copy()
+    previous_query['start'] = (start - timedelta(days=days)).isoformat()
+    next_query = request.GET.copy()
+    next_query['start'] = (start + timedelta(days=days)).isoformat()
+    previous_query.pop('format', None)
+    next_query.pop('format', None)
+
+    if request.GET.get('format') == 'json':
+        results = [{
+            'id': log.id,
+            'work_date': log.work_date.isoformat(),
+            'labourer': {
+                'id': log.labourer_id,
+                'name': log.labourer.name,
+                'labour_type': log.labourer.labour_type.name,
+            },
+            'hours_worked': str(log.hours_worked),
+            'tasks_performed': [
+                {'id': task.id, 'name': task.name} for task in log.tasks_performed.all()
+            ],
+            'description': log.description,
+            'daily_wage_amount': str(log.daily_wage_amount.quantize(Decimal('0.01'))),
+        } for log in work_logs]
+        return JsonResponse({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'days': days,
+            'previous': previous_query.urlencode(),
+            'next': next_query.urlencode(),
+            'results': results,
+        })
+
+    return render(request, 'labour/worklog_list.html', {
+        'work_logs': work_logs,
+        'start': start,
+        'end': end,
+        'days': days,
+        'filters': filters,
+        'previous_query': previous_query.urlencode(),
+        'next_query': next_query.urlencode(),
+        'labourers': Labourer.objects.only('id', 'name'),
+        'labour_types': LabourType.objects.only('id', 'name'),
+        'skills': Skill.objects.only('id', 'name'),
+    })
 
 @login_required
 def worklog_add(request):
@@ -171,3 +319,106 @@ def worklog_edit(request, pk):
         'skills': skills,
         'action': 'Edit'
     })
+
+@login_required
+@require_POST
+def crew_attendance_api(request):
+    """API view to record a whole crew's work logs for one date"""
+    try:
+        data = json.loads(request.body)
+        work_date = date.fromisoformat(data['work_date'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'A JSON body with a valid work_date is required'}, status=400)
+
+    try:
+        result = record_crew_attendance(
+            work_date,
+            data.get('entries'),
+            on_conflict=data.get('on_conflict', 'skip'),
+        )
+    except ValidationError as e:
+        return JsonResponse({'errors': e.messages}, status=400)
+
+    return JsonResponse({
+        'work_date': work_date.isoformat(),
+        'created': result['created'],
+        'updated': result['updated'],
+        'skipped': result['skipped'],
+        'work_logs': {str(labourer_id): log_id for labourer_id, log_id in result['work_logs'].items()},
+    })
+
+@login_required
+@require_POST
+@idempotent('labour:labour_payment_api')
+def labour_payment_api(request):
+    """API view to record a payment covering a labourer's work logs"""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'A JSON body is required'}, status=400)
+    form = LabourPaymentForm(data if isinstance(data, dict) else {})
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+
+    with transaction.atomic():
+        payment = form.save()
+    return JsonResponse({
+        'id': payment.id,
+        'labourer': payment.labourer_id,
+        'amount': str(payment.amount),
+        'work_logs': sorted(log.id for log in form.cleaned_data['work_logs']),
+    }, status=201)
+
+def _wage_rate_json(rate):
+    return {
+        'id': rate.id,
+        'effective_from': rate.effective_from.isoformat(),
+        'effective_to': rate.effective_to.isoformat() if rate.effective_to else None,
+        'daily_wage': str(rate.daily_wage),
+    }
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def labourer_wage_rates(request, pk):
+    """API view to list a labourer's wage rates or set the wage from a date"""
+    labourer = get_object_or_404(Labourer, pk=pk)
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'A JSON body is required'}, status=400)
+        form = WageRateForm(data if isinstance(data, dict) else {})
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+        with transaction.atomic():
+            rate = set_wage_rate(labourer, form.cleaned_data['daily_wage'], form.cleaned_data['effective_from'])
+            sync_current_wage(labourer)
+        rate.refresh_from_db(fields=['effective_to'])
+        return JsonResponse(_wage_rate_json(rate), status=201)
+
+    rates = [_wage_rate_json(rate) for rate in labourer.wage_rates.order_by('effective_from')]
+    return JsonResponse(rates, safe=False)
+
+@login_required
+@require_GET
+def labour_payroll_api(request):
+    """API view to total days, hours and wages per labourer for a period"""
+    start = _parse_date(request.GET.get('from'))
+    end = _parse_date(request.GET.get('to'))
+    if not start or not end or start > end:
+        return JsonResponse({'error': 'from and to dates are required, from not after to'}, status=400)
+    labourer_ids = [int(pk) for pk in request.GET.getlist('labourer') if pk.isdigit()] or None
+    summary = payroll_summary(start, end, labourer_ids)
+    names = dict(Labourer.objects.filter(id__in=summary).values_list('id', 'name'))
+    results = [{
+        'labourer': {'id': labourer_id, 'name': names[labourer_id]},
+        'days': entry['days'],
+        'hours': str(entry['hours']),
+        'wages': str(entry['wages']),
+    } for labourer_id, entry in sorted(summary.items(), key=lambda item: names[item[0]])]
+    return JsonResponse({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'total': str(sum((entry['wages'] for entry in summary.values()), Decimal('0.00'))),
+        'results': results,
+    })
@@ -0,0 +1,150 @@
+"""Effective-dated wage rates and payroll.
+
+Each WageRate covers [effective_from, effective_to); effective_to is the
+next rate's start, kept current by refresh_wage_intervals on every save, so the rate for
+a work log is a range join rather than a "latest rate before" subquery per
+row. Dates a labourer has no rate for (before their first one, or at all
+when the row was bulk inserted) fall back to their own daily_wage.
+
+with_wage_rates() does the join in the database, for listings and reports.
+WageSchedule loads the intervals once and resolves rates in memory, for
+payroll runs over many logs. Labourer.daily_wage holds the rate in force
+when it was last changed; with_current_wage() reads today's rate instead,
+so a rate set for a future date shows once that date arrives.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import DecimalField, ExpressionWrapper, F, FilteredRelation, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Labourer, WageRate, WorkLog
+
+FULL_DAY_HOURS = Decimal('8.0')
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+
+def refresh_wage_intervals(labourer_ids):
+    """Recompute effective_to for the given labourers' rates"""
+    rates = list(WageRate.objects.filter(
+        labourer_id__in=set(labourer_ids)
+    ).order_by('labourer_id', 'effective_from'))
+    changed = []
+    for rate, following in zip(rates, rates[1:] + [None]):
+        same_labourer = following is not None and following.labourer_id == rate.labourer_id
+        effective_to = following.effective_from if same_labourer else None
+        if rate.effective_to != effective_to:
+            rate.effective_to = effective_to
+            changed.append(rate)
+    if changed:
+        WageRate.objects.bulk_update(changed, ['effective_to'], batch_size=500)
+
+
+def set_wage_rate(labourer, daily_wage, effective_from):
+    """Record a labourer's wage from a date, replacing any rate starting that day.
+
+    The labourer's intervals are refreshed by the WageRate save signal.
+    """
+    rate, _ = WageRate.objects.update_or_create(
+        labourer=labourer, effective_from=effective_from, defaults={'daily_wage': daily_wage},
+    )
+    return rate
+
+
+def sync_current_wage(labourer):
+    """Set the labourer's daily_wage to the rate in force today, without another rate change"""
+    current = labourer.wage_on(timezone.localdate())
+    Labourer.objects.filter(pk=labourer.pk).exclude(daily_wage=current).update(
+        daily_wage=current, updated_at=timezone.now()
+    )
+    labourer.daily_wage = labourer._loaded_daily_wage = current
+    return current
+
+
+def with_current_wage(labourers):
+    """Annotate labourers with current_wage, the rate in force today"""
+    today = timezone.localdate()
+    return labourers.annotate(
+        current_rate=FilteredRelation('wage_rates', condition=(
+            Q(wage_rates__effective_from__lte=today)
+            & (Q(wage_rates__effective_to__isnull=True) | Q(wage_rates__effective_to__gt=today))
+        )),
+        current_wage=Coalesce(F('current_rate__daily_wage'), F('daily_wage')),
+    )
+
+
+def with_wage_rates(work_logs):
+    """Annotate work logs with daily_rate and wage_amount in the same query"""
+    return work_logs.annotate(
+        rate=FilteredRelation('labourer__wage_rates', condition=(
+            Q(labourer__wage_rates__effective_from__lte=F('work_date'))
+            & (Q(labourer__wage_rates__effective_to__isnull=True)
+               | Q(labourer__wage_rates__effective_to__gt=F('work_date')))
+        )),
+        daily_rate=Coalesce(F('rate__daily_wage'), F('labourer__daily_wage')),
+        # A multiplier rather than a divisor: SQLite divides NUMERIC whole numbers as integers
+        wage_amount=ExpressionWrapper(
+            F('daily_rate') * F('hours_worked') * Value(1 / FULL_DAY_HOURS),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+class WageSchedule:
+    """Wage rate intervals held in memory, loaded once per labourer.
+
+    Lookups are a bisect over the labourer's rate start dates, so pricing
+    a year of work logs costs one query for the rates rather than one per log.
+    """
+
+    def __init__(self, labourer_ids=None):
+        self._starts = {}
+        self._rates = {}
+        self._fallback = {}
+        if labourer_ids is not None:
+            self.load(labourer_ids)
+
+    def load(self, labourer_ids):
+        """Fetch the intervals of any labourers not loaded yet"""
+        missing = set(labourer_ids) - self._fallback.keys()
+        if not missing:
+            return
+        starts, rates = defaultdict(list), defaultdict(list)
+        for labourer_id, effective_from, daily_wage in WageRate.objects.filter(
+            labourer_id__in=missing
+        ).order_by('labourer_id', 'effective_from').values_list('labourer_id', 'effective_from', 'daily_wage'):
+            starts[labourer_id].append(effective_from)
+            rates[labourer_id].append(daily_wage)
+        for labourer_id, wage in Labourer.objects.filter(id__in=missing).values_list('id', 'daily_wage'):
+            self._fallback[labourer_id] = wage
+            self._starts[labourer_id] = starts[labourer_id]
+            self._rates[labourer_id] = rates[labourer_id]
+
+    def rate_on(self, labourer_id, day):
+        self.load([labourer_id])
+        index = bisect_right(self._starts[labourer_id], day)
+        return self._rates[labourer_id][index - 1] if index else self._fallback[labourer_id]
+
+    def wage_for(self, labourer_id, day, hours_worked):
+        return self.rate_on(labourer_id, day) * hours_worked / FULL_DAY_HOURS
+
+
+def payroll_summary(start, end, labourer_ids=None):
+    """Return days, hours and wages per labourer for work between two dates (inclusive).
+
+    Each day's wage is rounded to the paisa before it is added up.
+    """
+    work_logs = WorkLog.objects.filter(work_date__range=(start, end)).order_by()
+    if labourer_ids is not None:
+        work_logs = work_logs.filter(labourer_id__in=labourer_ids)
+    rows = list(work_logs.values_list('labourer_id', 'work_date', 'hours_worked'))
+    schedule = WageSchedule({labourer_id for labourer_id, _, _ in rows})
+
+    summary = {}
+    for labourer_id, work_date, hours_worked in rows:
+        entry = summary.setdefault(labourer_id, {'days': 0, 'hours': ZERO, 'wages': ZERO})
+        entry['days'] += 1
+        entry['hours'] += hours_worked
+        entry['wages'] += schedule.wage_for(labourer_id, work_date, hours_worked).quantize(CENT)
+    return summary
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:09
+
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_file_sizes(apps, schema_editor):
+    """Stat existing report files once so the list never has to"""
+    Report = apps.get_model('reports', 'Report')
+    updated = []
+    for report in Report.objects.only('id', 'file').iterator():
+        path = os.path.join(settings.MEDIA_ROOT, report.file.name)
+        if report.file.name and os.path.exists(path):
+            report.file_size = os.path.getsize(path)
+            updated.append(report)
+    Report.objects.bulk_update(updated, ['file_size'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='file_size',
+            field=models.PositiveBigIntegerField(default=0, help_text='Size of the file in bytes'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['generated_by', '-date_generated', '-id'], name='report_owner_recent_idx'),
+        ),
+        migrations.RunPython(backfill_file_sizes, migrations.RunPython.noop),
+    ]
@@ -8,6 +8,13 @@ class Report(models.Model):
     generated_by = models.ForeignKey(User, on_delete=models.CASCADE)
     date_generated = models.DateTimeField(auto_now_add=True)
     file = models.FileField(upload_to='reports/')
+    file_size = models.PositiveBigIntegerField(default=0, help_text='Size of the file in bytes')
+    page_count = models.PositiveIntegerField(null=True, blank=True)
     
     def __str__(self):
         return self.name
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['generated_by', '-date_generated', '-id'], name='report_owner_recent_idx'),
+        ]
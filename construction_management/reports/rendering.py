@@ -0,0 +1,233 @@
+"""Tabular PDF rendering on ReportLab platypus.
+
+Rows are pulled from an iterator one page-sized table at a time, so a
+report's memory use depends on the page size rather than the row count.
+The layout is the JSON shape stored in ReportTemplate.template_config:
+
+    {
+        "title": "Ledger",
+        "page_size": "A4",              # A4, letter or legal
+        "orientation": "landscape",     # or portrait
+        "margins": {"top": 54, "bottom": 42, "left": 36, "right": 36},
+        "font": {"name": "Helvetica", "bold": "Helvetica-Bold", "size": 8},
+        "columns": [
+            {"field": "date", "label": "Date", "width": 1, "format": "date"},
+            {"field": "amount", "label": "Amount", "width": 1, "align": "right", "format": "money"}
+        ],
+        "footer": "Construction Management System",
+        "zebra": true
+    }
+
+Column widths are relative. Fonts may also name a TTF file with "path" and
+"bold_path"; they are registered once per process.
+"""
+import copy
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from itertools import islice
+
+from reportlab.lib import colors, pagesizes
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import BaseDocTemplate, Frame, PageBreak, PageTemplate, Table, TableStyle
+
+DEFAULT_LAYOUT = {
+    'title': 'Report',
+    'page_size': 'A4',
+    'orientation': 'portrait',
+    'margins': {'top': 54, 'bottom': 42, 'left': 36, 'right': 36},
+    'font': {'name': 'Helvetica', 'bold': 'Helvetica-Bold', 'size': 8},
+    'columns': [],
+    'footer': 'Construction Management System',
+    'zebra': True,
+}
+PAGE_SIZES = {'a4': pagesizes.A4, 'letter': pagesizes.letter, 'legal': pagesizes.legal}
+CELL_PADDING = 2
+HEADER_BACKGROUND = colors.HexColor('#e5e7eb')
+ZEBRA_BACKGROUND = colors.HexColor('#f9fafb')
+GRID_COLOUR = colors.HexColor('#d1d5db')
+
+
+class LayoutError(ValueError):
+    """Raised for a template_config the renderer can't lay out"""
+
+
+def load_layout(config):
+    """Merge a template_config over the defaults and validate it"""
+    layout = copy.deepcopy(DEFAULT_LAYOUT)
+    for key, value in (config or {}).items():
+        if isinstance(value, dict) and isinstance(layout.get(key), dict):
+            layout[key].update(value)
+        else:
+            layout[key] = value
+    if layout['page_size'].lower() not in PAGE_SIZES:
+        raise LayoutError(f"Unknown page size {layout['page_size']!r}")
+    if layout['orientation'] not in ('portrait', 'landscape'):
+        raise LayoutError(f"Unknown orientation {layout['orientation']!r}")
+    if not layout['columns']:
+        raise LayoutError('A layout needs at least one column')
+    for column in layout['columns']:
+        if 'field' not in column:
+            raise LayoutError(f'Column {column!r} has no field')
+        column.setdefault('label', column['field'].replace('_', ' ').title())
+        column.setdefault('width', 1)
+        column.setdefault('align', 'right' if column.get('format') == 'money' else 'left')
+        column.setdefault('format', 'text')
+    return layout
+
+
+@lru_cache(maxsize=None)
+def register_font(name, path):
+    """Register a TTF font once per process; built-in fonts need no path"""
+    if path:
+        pdfmetrics.registerFont(TTFont(name, path))
+    return name
+
+
+@lru_cache(maxsize=32)
+def table_style(font, bold, size, aligns, zebra):
+    """Build (and cache) the TableStyle shared by every page of a layout"""
+    commands = [
+        ('FONT', (0, 0), (-1, -1), font, size, size * 1.2),
+        ('FONT', (0, 0), (-1, 0), bold, size, size * 1.2),
+        ('BACKGROUND', (0, 0), (-1, 0), HEADER_BACKGROUND),
+        ('LINEBELOW', (0, 0), (-1, 0), 0.75, colors.black),
+        ('LINEBELOW', (0, 1), (-1, -1), 0.25, GRID_COLOUR),
+        ('TOPPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]
+    for index, align in enumerate(aligns):
+        commands.append(('ALIGN', (index, 0), (index, -1), align.upper()))
+    if zebra:
+        commands.append(('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, ZEBRA_BACKGROUND]))
+    return TableStyle(commands)
+
+
+def format_value(value, fmt):
+    if value is None:
+        return ''
+    if fmt == 'money' and isinstance(value, (int, float, Decimal)):
+        return f'{value:,.2f}'
+    if fmt == 'date' and isinstance(value, (date, datetime)):
+        return value.strftime('%d %b %Y')
+    return str(value)
+
+
+def _clip(text, max_chars):
+    return text if len(text) <= max_chars else text[:max(max_chars - 1, 1)] + '…'
+
+
+class _FlowableStream(list):
+    """A story list that refills itself from a generator as it is consumed.
+
+    BaseDocTemplate.build() works through the list from the front, so only
+    a few pages of tables are ever held at once.
+    """
+
+    def __init__(self, flowables, low_water=4):
+        super().__init__()
+        self._source = iter(flowables)
+        self._low_water = low_water
+        self._refill()
+
+    def _refill(self):
+        if self._source is not None and super().__len__() < self._low_water:
+            self.extend(islice(self._source, self._low_water * 2))
+            if super().__len__() < self._low_water:
+                self._source = None
+
+    def __len__(self):
+        self._refill()
+        return super().__len__()
+
+    def __getitem__(self, index):
+        self._refill()
+        return super().__getitem__(index)
+
+
+class TableReport:
+    """Render rows into a paginated PDF according to a layout"""
+
+    def __init__(self, config, subtitle=''):
+        self.layout = load_layout(config)
+        self.subtitle = subtitle
+        font = self.layout['font']
+        self.font = register_font(font['name'], font.get('path'))
+        self.bold = register_font(font.get('bold') or font['name'], font.get('bold_path'))
+        self.font_size = font['size']
+
+        size = PAGE_SIZES[self.layout['page_size'].lower()]
+        self.page_size = pagesizes.landscape(size) if self.layout['orientation'] == 'landscape' else size
+        margins = self.layout['margins']
+        self.frame_width = self.page_size[0] - margins['left'] - margins['right']
+        self.frame_height = self.page_size[1] - margins['top'] - margins['bottom']
+
+        columns = self.layout['columns']
+        total = sum(column['width'] for column in columns)
+        self.col_widths = [self.frame_width * column['width'] / total for column in columns]
+        # Helvetica digits and letters average about half an em
+        self.max_chars = [max(int(width / (self.font_size * 0.5)), 4) for width in self.col_widths]
+        row_height = self.font_size * 1.2 + 2 * CELL_PADDING
+        # One row is held back for the repeated header and one for rounding
+        self.rows_per_page = max(int(self.frame_height // row_height) - 2, 1)
+        self.style = table_style(
+            self.font, self.bold, self.font_size,
+            tuple(column['align'] for column in columns), bool(self.layout['zebra']),
+        )
+
+    def _cells(self, row):
+        columns = self.layout['columns']
+        if isinstance(row, dict):
+            values = [row.get(column['field']) for column in columns]
+        else:
+            values = row
+        return [
+            _clip(format_value(value, column['format']), limit)
+            for value, column, limit in zip(values, columns, self.max_chars)
+        ]
+
+    def _tables(self, rows):
+        header = [column['label'] for column in self.layout['columns']]
+        rows = iter(rows)
+        page = [self._cells(row) for row in islice(rows, self.rows_per_page)]
+        if not page:
+            yield Table([header], colWidths=self.col_widths, style=self.style)
+            return
+        while page:
+            following = [self._cells(row) for row in islice(rows, self.rows_per_page)]
+            yield Table([header] + page, colWidths=self.col_widths, style=self.style, repeatRows=1)
+            if following:
+                yield PageBreak()
+            page = following
+
+    def _decorate_page(self, canvas, doc):
+        margins = self.layout['margins']
+        width, height = self.page_size
+        canvas.saveState()
+        canvas.setFont(self.bold, self.font_size + 4)
+        canvas.drawString(margins['left'], height - margins['top'] + 22, self.layout['title'])
+        if self.subtitle:
+            canvas.setFont(self.font, self.font_size)
+            canvas.drawString(margins['left'], height - margins['top'] + 10, self.subtitle)
+        canvas.setFont(self.font, self.font_size - 1)
+        canvas.drawString(margins['left'], margins['bottom'] - 20, self.layout.get('footer') or '')
+        canvas.drawRightString(width - margins['right'], margins['bottom'] - 20, f'Page {doc.page}')
+        canvas.restoreState()
+
+    def render(self, output, rows):
+        """Write the PDF to a path or binary file object and return its page count"""
+        margins = self.layout['margins']
+        doc = BaseDocTemplate(
+            output, pagesize=self.page_size, title=self.layout['title'],
+            leftMargin=margins['left'], rightMargin=margins['right'],
+            topMargin=margins['top'], bottomMargin=margins['bottom'],
+        )
+        frame = Frame(
+            margins['left'], margins['bottom'], self.frame_width, self.frame_height,
+            leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0, id='body',
+        )
+        doc.addPageTemplates([PageTemplate(id='table', frames=[frame], onPage=self._decorate_page)])
+        doc.build(_FlowableStream(self._tables(rows)))
+        return doc.page
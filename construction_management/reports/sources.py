@@ -0,0 +1,59 @@
+"""Row sources and default layouts for the tabular reports"""
+from labour.models import WorkLog
+from labour.wages import with_wage_rates
+from transactions.models import FinancialTransaction
+from vendors.models import Purchase
+
+ITERATOR_CHUNK_SIZE = 2000
+
+REPORT_KINDS = {
+    'ledger': {
+        'title': 'Transaction Ledger',
+        'orientation': 'landscape',
+        'columns': [
+            {'field': 'date', 'label': 'Date', 'width': 1.2, 'format': 'date'},
+            {'field': 'reference_number', 'label': 'Reference', 'width': 2.4},
+            {'field': 'transaction_type', 'label': 'Type', 'width': 1},
+            {'field': 'description', 'label': 'Description', 'width': 4},
+            {'field': 'payment_method', 'label': 'Method', 'width': 1},
+            {'field': 'amount', 'label': 'Amount', 'width': 1.3, 'format': 'money'},
+        ],
+    },
+    'payroll': {
+        'title': 'Labour Payroll',
+        'columns': [
+            {'field': 'work_date', 'label': 'Date', 'width': 1.2, 'format': 'date'},
+            {'field': 'labourer__name', 'label': 'Labourer', 'width': 2.5},
+            {'field': 'labourer__labour_type__name', 'label': 'Trade', 'width': 1.5},
+            {'field': 'hours_worked', 'label': 'Hours', 'width': 0.8, 'align': 'right'},
+            {'field': 'daily_rate', 'label': 'Daily Wage', 'width': 1.2, 'format': 'money'},
+            {'field': 'wage_amount', 'label': 'Wage', 'width': 1.2, 'format': 'money'},
+        ],
+    },
+    'vendor_statement': {
+        'title': 'Vendor Statement',
+        'orientation': 'landscape',
+        'columns': [
+            {'field': 'purchase_date', 'label': 'Date', 'width': 1.2, 'format': 'date'},
+            {'field': 'vendor__name', 'label': 'Vendor', 'width': 2.5},
+            {'field': 'product__name', 'label': 'Product', 'width': 2.5},
+            {'field': 'quantity', 'label': 'Quantity', 'width': 1, 'align': 'right'},
+            {'field': 'price_per_unit', 'label': 'Unit Price', 'width': 1.2, 'format': 'money'},
+            {'field': 'total_amount', 'label': 'Total', 'width': 1.3, 'format': 'money'},
+            {'field': 'payment_status', 'label': 'Status', 'width': 1},
+        ],
+    },
+}
+
+_QUERYSETS = {
+    'ledger': lambda: FinancialTransaction.objects.order_by('date', 'id'),
+    'payroll': lambda: with_wage_rates(WorkLog.objects.order_by('work_date', 'labourer__name', 'id')),
+    'vendor_statement': lambda: Purchase.objects.order_by('purchase_date', 'id'),
+}
+
+
+def report_rows(kind, layout=None):
+    """Stream rows for a report kind as tuples in layout column order"""
+    layout = layout or REPORT_KINDS[kind]
+    fields = [column['field'] for column in layout['columns']]
+    return _QUERYSETS[kind]().values_list(*fields).iterator(chunk_size=ITERATOR_CHUNK_SIZE)
@@ -1,3 +1,237 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from reportlab.platypus import Table
+
+from construction_management.delivery import serve_file
+from transactions.models import FinancialTransaction
+from .models import Report
+from .rendering import LayoutError, TableReport, load_layout
+
+PDF = b'%PDF-1.4\n' + b'0123456789' * 100 + b'\n%%EOF\n'
+
+
+class ReportDeliveryTests(TestCase):
+    """Tests for report downloads through each file delivery backend"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        self.user = get_user_model().objects.create_user(email='pm@example.com', password='test-pass-123')
+        self.client.force_login(self.user)
+        self.report = Report(name='March', generated_by=self.user)
+        self.report.file.save('march_report.pdf', ContentFile(PDF))
+        self.url = reverse('reports:report_view', args=[self.report.id])
+
+    def test_python_backend_streams_ranges(self):
+        response = self.client.get(self.url, headers={'Range': 'bytes=0-7'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), PDF[:8])
+        self.assertEqual(response['Content-Range'], f'bytes 0-7/{len(PDF)}')
+        self.assertIn('inline; filename=', response['Content-Disposition'])
+
+    def test_if_modified_since_returns_304(self):
+        mtime = os.path.getmtime(self.report.file.path)
+        response = self.client.get(self.url, headers={'If-Modified-Since': http_date(mtime)})
+        self.assertEqual(response.status_code, 304)
+        stale = self.client.get(self.url, headers={'If-Modified-Since': http_date(mtime - 3600)})
+        self.assertEqual(stale.status_code, 200)
+
+    @override_settings(FILE_DELIVERY_BACKEND='sendfile')
+    def test_sendfile_backend_exposes_file_descriptor(self):
+        request = RequestFactory().get(self.url, headers={'Range': 'bytes=10-19'})
+        response = serve_file(request, self.report.file.path, 'application/pdf')
+        # wsgi.file_wrapper needs fileno() to use os.sendfile
+        self.assertTrue(hasattr(response.file_to_stream, 'fileno'))
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), PDF[10:20])
+        response.close()
+
+    @override_settings(FILE_DELIVERY_BACKEND='x-accel', FILE_DELIVERY_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_backend_hands_off_to_nginx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/reports/march_report.pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    @override_settings(FILE_DELIVERY_BACKEND='x-sendfile')
+    def test_x_sendfile_backend_hands_off_to_apache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.report.file.path)
+
+    @override_settings(FILE_DELIVERY_BACKEND='x-accel', FILE_DELIVERY_EMULATE_PROXY=True)
+    def test_emulated_proxy_serves_redirect_target(self):
+        response = self.client.get(self.url, headers={'Range': 'bytes=-6'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), PDF[-6:])
+        self.assertEqual(response['X-File-Delivery-Emulated'], 'X-Accel-Redirect: /protected-media/reports/march_report.pdf')
+        self.assertIn('filename=', response['Content-Disposition'])
+
+    @override_settings(FILE_DELIVERY_BACKEND='x-accel')
+    def test_permission_check_runs_before_hand_off(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='test-pass-123')
+        self.client.force_login(other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('X-Accel-Redirect'))
+
+    def test_missing_file_redirects_with_message(self):
+        os.remove(self.report.file.path)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('reports:report_list'), fetch_redirect_response=False)
+
+
+class ReportRenderingTests(TestCase):
+    """Tests for the paginated table renderer and report generation"""
+
+    layout = {
+        'title': 'Ledger',
+        'columns': [
+            {'field': 'date', 'format': 'date'},
+            {'field': 'description', 'width': 4},
+            {'field': 'amount', 'format': 'money'},
+        ],
+    }
+
+    def rows(self, count, pulled):
+        for i in range(count):
+            pulled.append(i)
+            yield {'date': date(2024, 1, 1), 'description': f'Line {i} ' + 'x' * 300, 'amount': Decimal(i)}
+
+    def test_long_tables_split_into_pages_with_headers(self):
+        renderer = TableReport(self.layout)
+        pulled = []
+        tables = [f for f in renderer._tables(self.rows(renderer.rows_per_page * 2 + 5, pulled)) if isinstance(f, Table)]
+        self.assertEqual(len(tables), 3)
+        for table in tables:
+            self.assertEqual(table._cellvalues[0], ['Date', 'Description', 'Amount'])
+            self.assertEqual(table.repeatRows, 1)
+        # Long text is clipped to the column rather than wrapped
+        self.assertTrue(tables[0]._cellvalues[1][1].endswith('…'))
+        self.assertEqual(tables[0]._cellvalues[2][2], '1.00')
+
+    def test_rows_are_pulled_lazily_while_rendering(self):
+        renderer = TableReport(self.layout)
+        pulled = []
+        pages_seen = []
+
+        def on_page(canvas, doc):
+            pages_seen.append(len(pulled))
+        renderer._decorate_page = on_page
+        pages = renderer.render(io.BytesIO(), self.rows(renderer.rows_per_page * 20, pulled))
+        self.assertEqual(pages, 20)
+        # The first page is drawn long before the last row is read
+        self.assertLess(pages_seen[0], renderer.rows_per_page * 10)
+
+    def test_layout_merges_template_config_and_validates(self):
+        layout = load_layout({'orientation': 'landscape', 'margins': {'left': 10}, 'columns': [{'field': 'total_amount'}]})
+        self.assertEqual(layout['margins']['left'], 10)
+        self.assertEqual(layout['margins']['top'], 54)
+        self.assertEqual(layout['columns'][0]['label'], 'Total Amount')
+        with self.assertRaises(LayoutError):
+            load_layout({'page_size': 'A9', 'columns': [{'field': 'x'}]})
+        with self.assertRaises(LayoutError):
+            load_layout({})
+
+    def test_generate_view_renders_ledger(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        user = get_user_model().objects.create_user(email='pm@example.com', password='test-pass-123')
+        self.client.force_login(user)
+        FinancialTransaction.objects.bulk_create([
+            FinancialTransaction(transaction_type='expense', amount=Decimal('10.00'), date=date(2024, 1, 1),
+                                 description=f'Entry {i}', payment_method='cash')
+            for i in range(200)
+        ])
+        with override_settings(MEDIA_ROOT=media_root):
+            response = self.client.get(reverse('reports:report_generate'), {'kind': 'ledger'})
+            self.assertRedirects(response, reverse('reports:report_list'), fetch_redirect_response=False)
+            report = Report.objects.get()
+            with report.file.open('rb') as f:
+                self.assertEqual(f.read(5), b'%PDF-')
+            self.assertEqual(report.file_size, os.path.getsize(report.file.path))
+            self.assertEqual(report.page_count, 6)
+
+
+class ReportLibraryTests(TestCase):
+    """Tests for report list paging, search and bulk delete"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        self.user = get_user_model().objects.create_user(email='pm@example.com', password='test-pass-123')
+        self.client.force_login(self.user)
+        Report.objects.bulk_create([
+            Report(name=f'{"Payroll" if i % 2 else "Ledger"} {i:02d}', generated_by=self.user,
+                   file=f'reports/report_{i}.pdf', file_size=1000 + i)
+            for i in range(60)
+        ])
+        # One report a day, so report 59 is the newest
+        start = timezone.make_aware(datetime(2024, 1, 1, 12))
+        for report in Report.objects.all():
+            Report.objects.filter(pk=report.pk).update(date_generated=start + timedelta(days=int(report.name[-2:])))
+
+    def names(self, response):
+        return [report.name[-2:] for report in response.context['reports']]
+
+    def test_pages_walk_forwards_and_back_in_constant_queries(self):
+        url = reverse('reports:report_list')
+        # session, user and one page of reports
+        with self.assertNumQueries(3):
+            first = self.client.get(url)
+        self.assertEqual(self.names(first)[:2], ['59', '58'])
+        self.assertEqual(len(first.context['reports']), 25)
+        self.assertIsNone(first.context['newer_query'])
+
+        second = self.client.get(f"{url}?{first.context['older_query']}")
+        self.assertEqual(self.names(second)[0], '34')
+        third = self.client.get(f"{url}?{second.context['older_query']}")
+        self.assertEqual(len(third.context['reports']), 10)
+        self.assertIsNone(third.context['older_query'])
+
+        back = self.client.get(f"{url}?{third.context['newer_query']}")
+        self.assertEqual(self.names(back), self.names(second))
+
+    def test_search_by_name_and_date(self):
+        response = self.client.get(reverse('reports:report_list'), {'q': 'payroll', 'from': '2024-01-11', 'to': '2024-01-20'})
+        self.assertEqual(self.names(response), ['19', '17', '15', '13', '11'])
+        self.assertContains(response, '1019\xa0bytes')
+        # Impossible dates are ignored like malformed ones
+        response = self.client.get(reverse('reports:report_list'), {'q': 'payroll', 'from': '2024-02-30', 'to': '2024-01-20'})
+        self.assertEqual(self.names(response), ['19', '17', '15', '13', '11', '09', '07', '05', '03', '01'])
+
+    def test_bulk_delete_removes_rows_then_files(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='test-pass-123')
+        foreign = Report.objects.create(name='Theirs', generated_by=other, file='reports/theirs.pdf')
+        mine = list(Report.objects.filter(generated_by=self.user).order_by('id')[:2])
+        for report in mine:
+            report.file.storage.save(report.file.name, ContentFile(PDF))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('reports:report_bulk_delete'), {
+                'report_ids': [mine[0].id, mine[1].id, foreign.id, 'x'],
+            })
+        for thread in threading.enumerate():
+            if thread.name == 'report-file-cleanup':
+                thread.join()
+        self.assertFalse(Report.objects.filter(id__in=[r.id for r in mine]).exists())
+        self.assertTrue(Report.objects.filter(id=foreign.id).exists())
+        self.assertFalse(any(os.path.exists(r.file.path) for r in mine))
@@ -8,4 +8,5 @@ urlpatterns = [
     path('generate/', views.report_generate, name='report_generate'),
     path('view/<int:report_id>/', views.report_view, name='report_view'),
     path('delete/<int:report_id>/', views.report_delete, name='report_delete'),
+    path('delete/', views.report_bulk_delete, name='report_bulk_delete'),
 ]
@@ -3,82 +3,165 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Report
 import os
-from django.conf import settings
-from django.http import FileResponse
+from construction_management.delivery import serve_file
 import tempfile
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import require_POST
+from .rendering import TableReport
+from .sources import REPORT_KINDS, report_rows
 import logging
 
 logger = logging.getLogger(__name__)
 
+REPORT_PAGE_SIZE = 25
+
+
+def _parse_cursor(value):
+    """Decode a "<iso datetime>|<id>" page cursor, or None"""
+    try:
+        stamp, pk = (value or '').split('|')
+        stamp, pk = parse_datetime(stamp), int(pk)
+    except (ValueError, TypeError):
+        return None
+    return (stamp, pk) if stamp else None
+
+
+def _parse_date(value):
+    """Parse an ISO date from a query parameter, or None"""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _cursor(report):
+    return f'{report.date_generated.isoformat()}|{report.id}'
+
+
+def remove_report_files(names):
+    """Delete report files from storage on a background thread"""
+    def remove():
+        for name in names:
+            try:
+                default_storage.delete(name)
+            except OSError:
+                logger.warning("Could not delete report file %s", name, exc_info=True)
+    thread = threading.Thread(target=remove, name='report-file-cleanup', daemon=True)
+    thread.start()
+    return thread
+
+
 @login_required
 def report_list(request):
-    reports = Report.objects.filter(generated_by=request.user).order_by('-date_generated')
-    logger.info(f"User: {request.user.email}, Reports count: {reports.count()}")
-    
+    """View to list the user's reports newest first, with search and paging.
+
+    Pages are addressed by the last report shown rather than an offset and
+    no total is counted, so each page is one indexed query however many
+    reports the user has.
+    """
+    reports = Report.objects.filter(generated_by=request.user).select_related('generated_by')
+    query = request.GET.get('q', '').strip()
+    if query:
+        reports = reports.filter(name__icontains=query)
+    date_from = _parse_date(request.GET.get('from'))
+    date_to = _parse_date(request.GET.get('to'))
+    # Whole local days, as bounds on the indexed column rather than __date
+    if date_from:
+        start = timezone.make_aware(datetime.combine(date_from, datetime.min.time()))
+        reports = reports.filter(date_generated__gte=start)
+    if date_to:
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+        reports = reports.filter(date_generated__lt=end)
+
+    after = _parse_cursor(request.GET.get('after'))
+    before = _parse_cursor(request.GET.get('before'))
+    if after:
+        stamp, pk = after
+        page = list(reports.filter(
+            Q(date_generated__gt=stamp) | Q(date_generated=stamp, id__gt=pk)
+        ).order_by('date_generated', 'id')[:REPORT_PAGE_SIZE + 1])
+        has_newer, has_older = len(page) > REPORT_PAGE_SIZE, True
+        page = page[:REPORT_PAGE_SIZE][::-1]
+    else:
+        if before:
+            stamp, pk = before
+            reports = reports.filter(Q(date_generated__lt=stamp) | Q(date_generated=stamp, id__lt=pk))
+        page = list(reports.order_by('-date_generated', '-id')[:REPORT_PAGE_SIZE + 1])
+        has_newer, has_older = before is not None, len(page) > REPORT_PAGE_SIZE
+        page = page[:REPORT_PAGE_SIZE]
+
+    filters = {key: value for key, value in (('q', query), ('from', date_from), ('to', date_to)) if value}
     context = {
-        'reports': reports,
-        'user_email': request.user.email,
-        'reports_count': reports.count(),
-        'reports_list': [{'id': r.id, 'name': r.name, 'date': r.date_generated} for r in reports],
-        'debug': True
+        'reports': page,
+        'q': query,
+        'date_from': date_from,
+        'date_to': date_to,
+        'newer_query': urlencode({**filters, 'after': _cursor(page[0])}) if page and has_newer else None,
+        'older_query': urlencode({**filters, 'before': _cursor(page[-1])}) if page and has_older else None,
     }
     return render(request, 'reports/list.html', context)
 
+@login_required
+@require_POST
+def report_bulk_delete(request):
+    """View to delete several of the user's reports at once"""
+    ids = [pk for pk in request.POST.getlist('report_ids') if pk.isdigit()]
+    reports = Report.objects.filter(generated_by=request.user, id__in=ids)
+    names = [name for name in reports.values_list('file', flat=True) if name]
+    with transaction.atomic():
+        reports.delete()
+        # Rows go now; files are unlinked off the request thread once committed
+        transaction.on_commit(lambda: remove_report_files(names))
+    messages.success(request, f'Deleted {len(names)} report(s)')
+    return redirect('reports:report_list')
+
 @login_required
 def report_generate(request):
+    """View to render a tabular report (ledger, payroll or vendor statement) to PDF"""
+    kind = request.POST.get('kind') or request.GET.get('kind') or 'ledger'
+    if kind not in REPORT_KINDS:
+        messages.error(request, f'Unknown report type: {kind}')
+        return redirect('reports:report_list')
     try:
-        logger.info(f"Starting report generation for user: {request.user.email}")
-        
-        # Create reports directory if it doesn't exist
-        reports_dir = os.path.join(settings.MEDIA_ROOT, 'reports')
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        # Create a temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        temp_path = temp_file.name
-        logger.info(f"Created temporary file: {temp_path}")
-        
-        try:
-            # Create the PDF
-            c = canvas.Canvas(temp_path, pagesize=letter)
-            c.drawString(100, 750, f"Report Generated by {request.user.email}")
-            c.drawString(100, 700, "Construction Management System Report")
-            c.save()
-            logger.info("PDF content written successfully")
-            
-            # Create the report record
-            filename = f"Report_{request.user.email}_{os.path.basename(temp_path)}"
-            with open(temp_path, 'rb') as f:
-                from django.core.files import File
-                report = Report.objects.create(
-                    name=filename,
-                    generated_by=request.user,
-                    file=File(f, name=filename)
-                )
-                logger.info(f"Report record created with ID: {report.id}")
-            
-            messages.success(request, 'Report generated successfully')
-            
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-                logger.info("Temporary file cleaned up")
-        
+        layout = REPORT_KINDS[kind]
+        started = time.perf_counter()
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as temp_file:
+            renderer = TableReport(layout, subtitle=f"Generated by {request.user.email} on {timezone.now():%d %b %Y %H:%M}")
+            pages = renderer.render(temp_file, report_rows(kind, layout))
+            temp_file.flush()
+            file_size = os.fstat(temp_file.fileno()).st_size
+            temp_file.seek(0)
+            filename = f"{kind}_{timezone.now():%Y%m%d_%H%M%S}.pdf"
+            report = Report.objects.create(
+                name=f"{layout['title']} {timezone.now():%Y-%m-%d %H:%M}",
+                generated_by=request.user,
+                file=File(temp_file, name=filename),
+                file_size=file_size,
+                page_count=pages,
+            )
+        logger.debug("Rendered report %s (%s pages) in %.2fs", report.id, pages, time.perf_counter() - started)
+        messages.success(request, 'Report generated successfully')
     except Exception as e:
-        logger.error(f"Error generating report: {str(e)}", exc_info=True)
+        logger.error("Error generating report: %s", e, exc_info=True)
         messages.error(request, f'Error generating report: {str(e)}')
-    
+
     return redirect('reports:report_list')
 
 @login_required
 def report_view(request, report_id):
     report = get_object_or_404(Report, id=report_id, generated_by=request.user)
     try:
-        logger.info(f"Attempting to open report file: {report.file.path}")
-        return FileResponse(open(report.file.path, 'rb'), content_type='application/pdf')
+        # Permission is checked above; the transfer itself goes to the configured delivery backend
+        return serve_file(request, report.file.path, 'application/pdf', filename=os.path.basename(report.file.name))
     except FileNotFoundError:
         logger.error(f"Report file not found: {report.file.path}")
         messages.error(request, 'Report file not found')
@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import DeletionLog
+
+@admin.register(DeletionLog)
+class DeletionLogAdmin(admin.ModelAdmin):
+    list_display = ('model', 'object_id', 'deleted_at')
+    list_filter = ('model',)
+    date_hierarchy = 'deleted_at'
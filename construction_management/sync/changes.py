@@ -0,0 +1,79 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from .models import DeletionLog
+from .registry import get_sync_model
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 2000
+
+
+def parse_watermark(token):
+    """Split a watermark token into (updated_at, pk, tombstone_id).
+
+    Tokens look like '<updated_at ISO>|<pk>|<tombstone id>'; an empty token
+    means the client has nothing yet.
+    """
+    if not token:
+        return None, 0, 0
+    try:
+        updated_at, pk, tombstone = token.split('|')
+        stamp = parse_datetime(updated_at) if updated_at else None
+        if updated_at and stamp is None:
+            raise ValueError(updated_at)
+        return stamp, int(pk), int(tombstone)
+    except ValueError:
+        raise ValueError(f'Invalid watermark: {token!r}')
+
+
+def format_watermark(updated_at, pk, tombstone):
+    return f"{updated_at.isoformat() if updated_at else ''}|{pk}|{tombstone}"
+
+
+def _attach_many_to_many(model, rows):
+    """Add id lists for each M2M field with one through-table query per field"""
+    if not rows:
+        return
+    ids = [row['id'] for row in rows]
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        links = {}
+        for source_id, target_id in through.objects.filter(
+            **{f'{source}_id__in': ids}
+        ).values_list(f'{source}_id', f'{target}_id'):
+            links.setdefault(source_id, []).append(target_id)
+        for row in rows:
+            row[field.name] = links.get(row['id'], [])
+
+
+def collect_changes(name, token, limit=DEFAULT_BATCH_SIZE):
+    """Return rows changed and ids deleted since a watermark for one model"""
+    model = get_sync_model(name)
+    updated_at, last_pk, last_tombstone = parse_watermark(token)
+
+    changed = model._default_manager.order_by('updated_at', 'pk')
+    if updated_at is not None:
+        changed = changed.filter(
+            Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=last_pk)
+        )
+    fields = [field.attname for field in model._meta.concrete_fields]
+    rows = list(changed.values(*fields)[:limit + 1])
+    tombstones = list(DeletionLog.objects.filter(
+        model=name, id__gt=last_tombstone
+    ).order_by('id').values_list('id', 'object_id')[:limit + 1])
+
+    has_more = len(rows) > limit or len(tombstones) > limit
+    rows, tombstones = rows[:limit], tombstones[:limit]
+    _attach_many_to_many(model, rows)
+
+    if rows:
+        updated_at, last_pk = rows[-1]['updated_at'], rows[-1]['id']
+    if tombstones:
+        last_tombstone = tombstones[-1][0]
+    return {
+        'changed': rows,
+        'deleted': [object_id for _, object_id in tombstones],
+        'watermark': format_watermark(updated_at, last_pk, last_tombstone),
+        'has_more': has_more,
+    }
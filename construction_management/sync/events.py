@@ -0,0 +1,308 @@
+"""Live change events for server-sent event streams.
+
+Saves and deletes of the streamed models are published after commit as
+compact events:
+
+    {"action": "created", "model": "transaction", "id": 42,
+     "fields": {"amount": "1500.00", ...}, "ts": "2024-03-01T09:30:00+00:00"}
+
+A process-wide EventHub fans events out to the open streams, keeping a
+short replay buffer so reconnecting clients (Last-Event-ID) miss nothing.
+How events reach the hubs is up to EVENT_STREAM_BACKEND:
+
+- ``sync.events.LocalBackend``: this process only (the default).
+- ``sync.events.SocketBackend``: every process on the host, through Unix
+  datagram sockets in EVENT_STREAM_SOCKET_DIR, for multi-worker servers.
+
+Each hub numbers the events it receives, so ids are only meaningful to the
+process that sent them; they are prefixed with a token drawn when the hub
+starts ("<boot>-<n>"). A client whose Last-Event-ID came from another
+process or an earlier run, is not in the buffer, or whose stream fell
+behind, gets a ``reset`` event and should resync through the delta sync
+endpoint.
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+import secrets
+import socket
+import tempfile
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Stream name -> (model label, fields sent with each event)
+STREAM_MODELS = {
+    'transaction': ('transactions.FinancialTransaction', [
+        'transaction_type', 'amount', 'date', 'payment_method', 'project_id',
+    ]),
+    'worklog': ('labour.WorkLog', ['labourer_id', 'work_date', 'hours_worked']),
+    'purchase': ('vendors.Purchase', [
+        'vendor_id', 'product_id', 'quantity', 'price_per_unit', 'purchase_date', 'payment_status',
+    ]),
+    'contractorpayment': ('contractors.ContractorPayment', [
+        'contractor_id', 'project_id', 'amount', 'payment_date', 'payment_method',
+    ]),
+}
+
+_NAMES_BY_LABEL = {label: name for name, (label, _) in STREAM_MODELS.items()}
+
+
+def stream_name_for(model):
+    """Return the stream name for a model class, or None if it is not streamed"""
+    return _NAMES_BY_LABEL.get(model._meta.label)
+
+
+def build_event(action, instance):
+    name = stream_name_for(type(instance))
+    fields = {} if action == 'deleted' else {
+        field: getattr(instance, field) for field in STREAM_MODELS[name][1]
+    }
+    # Round-trip through JSON so dates and decimals arrive as they will be sent
+    return json.loads(json.dumps({
+        'action': action,
+        'model': name,
+        'id': instance.pk,
+        'fields': fields,
+        'ts': timezone.now(),
+    }, cls=DjangoJSONEncoder))
+
+
+def publish_changes(action, instances):
+    """Publish events for saved or deleted instances once the transaction commits.
+
+    A batch larger than EVENT_STREAM_BULK_LIMIT becomes a single ``reset``
+    for its model, telling clients to resync rather than flooding them.
+    """
+    instances = list(instances)
+    if len(instances) > getattr(settings, 'EVENT_STREAM_BULK_LIMIT', 200):
+        events = [{'action': 'reset', 'model': stream_name_for(type(instances[0])), 'count': len(instances)}]
+    else:
+        events = [build_event(action, instance) for instance in instances]
+    if events:
+        backend = get_backend()
+        transaction.on_commit(lambda: [backend.publish(event) for event in events])
+
+
+class Subscription:
+    """One open stream's queue, owned by the event loop that created it"""
+
+    def __init__(self, hub, models, queue_size):
+        self.hub = hub
+        self.models = set(models) if models else None
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, event):
+        return self.models is None or event.get('model') in self.models
+
+    def offer(self, entry):
+        # Runs on the subscriber's loop; a stream that fell behind is reset
+        # rather than allowed to grow without bound
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            entry = (None, {'action': 'reset'})
+        self.queue.put_nowait(entry)
+
+    async def get(self, timeout):
+        """The next (id, event), or None if nothing arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    """In-process broadcast of events to every open stream"""
+
+    def __init__(self, buffer_size=500, queue_size=256):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._buffer = deque(maxlen=buffer_size)
+        self._last_id = 0
+        self.queue_size = queue_size
+        self.boot = secrets.token_hex(4)
+
+    def subscribe(self, models=None):
+        subscription = Subscription(self, models, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def event_id(self, number):
+        """The id sent to clients for an event number"""
+        return f'{self.boot}-{number}'
+
+    def parse_event_id(self, value):
+        """The event number in an id this hub sent, or None for anyone else's"""
+        boot, _, number = (value or '').rpartition('-')
+        return int(number) if boot == self.boot and number.isdigit() else None
+
+    def dispatch(self, event):
+        """Number an event and hand it to every matching stream; safe from any thread"""
+        with self._lock:
+            self._last_id += 1
+            entry = (self._last_id, event)
+            self._buffer.append(entry)
+            subscribers = [subscription for subscription in self._subscribers if subscription.wants(event)]
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, entry)
+            except RuntimeError:
+                # The stream's loop has closed under it
+                self.unsubscribe(subscription)
+        return entry[0]
+
+    def replay(self, after_id, models=None):
+        """Buffered events after an id, or None if some have already been dropped"""
+        with self._lock:
+            entries = list(self._buffer)
+            last_id = self._last_id
+        if after_id > last_id:
+            return None
+        if after_id < last_id and (not entries or entries[0][0] > after_id + 1):
+            return None
+        return [
+            (event_id, event) for event_id, event in entries
+            if event_id > after_id and (models is None or event['model'] in models)
+        ]
+
+
+class LocalBackend:
+    """Deliver events to this process's streams only"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def listen(self):
+        """Start receiving events from other processes; nothing to do locally"""
+
+    def publish(self, event):
+        self.hub.dispatch(event)
+
+
+class SocketBackend:
+    """Fan events out to every process on this host over Unix datagram sockets.
+
+    Each process that serves streams binds ``<pid>.sock`` in the socket
+    directory; publishers send each event to every socket found there and
+    remove those whose process has gone. A receiver that can't keep up
+    loses datagrams rather than blocking the publisher.
+    """
+
+    MAX_DATAGRAM = 64 * 1024
+
+    def __init__(self, hub, directory=None, name=None):
+        self.hub = hub
+        self.directory = os.fspath(directory or getattr(settings, 'EVENT_STREAM_SOCKET_DIR', None)
+                                   or os.path.join(tempfile.gettempdir(), 'construction-management-events'))
+        self.path = os.path.join(self.directory, f'{name or os.getpid()}.sock')
+        self._receiver = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._lock = threading.Lock()
+
+    def listen(self):
+        with self._lock:
+            if self._receiver is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._receiver.bind(self.path)
+        threading.Thread(
+            target=self._receive, args=(self._receiver,), name='event-stream-receiver', daemon=True
+        ).start()
+
+    def _receive(self, receiver):
+        while True:
+            try:
+                data = receiver.recv(self.MAX_DATAGRAM)
+            except OSError:
+                return
+            try:
+                self.hub.dispatch(json.loads(data))
+            except ValueError:
+                logger.warning('Dropped malformed event datagram')
+
+    def close(self):
+        with self._lock:
+            receiver, self._receiver = self._receiver, None
+        if receiver is not None:
+            receiver.close()
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def publish(self, event):
+        data = json.dumps(event, cls=DjangoJSONEncoder).encode()
+        if len(data) > self.MAX_DATAGRAM:
+            logger.warning('Event for %s #%s is too large to broadcast', event.get('model'), event.get('id'))
+            return
+        if self._receiver is None:
+            # Not listening, so this process's own streams (if any) are served directly
+            self.hub.dispatch(event)
+        for path in glob.glob(os.path.join(self.directory, '*.sock')):
+            try:
+                self._sender.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The process that bound it has exited
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                logger.warning('Event stream receiver %s is full; event dropped', path)
+
+
+hub = EventHub(
+    buffer_size=getattr(settings, 'EVENT_STREAM_BUFFER', 500),
+    queue_size=getattr(settings, 'EVENT_STREAM_QUEUE_SIZE', 256),
+)
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured backend, built on first use"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend_class = import_string(getattr(settings, 'EVENT_STREAM_BACKEND', 'sync.events.LocalBackend'))
+            _backend = backend_class(hub)
+        return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting.startswith('EVENT_STREAM_'):
+        with _backend_lock:
+            if hasattr(_backend, 'close'):
+                _backend.close()
+            _backend = None
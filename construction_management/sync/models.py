@@ -0,0 +1,16 @@
+from django.db import models
+
+class DeletionLog(models.Model):
+    """Tombstones for deleted rows so offline clients can sync deletions"""
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted {self.deleted_at}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['model', 'id'], name='deletion_log_model_idx'),
+        ]
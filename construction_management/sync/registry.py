@@ -0,0 +1,25 @@
+from django.apps import apps
+
+# Sync name -> model label for every model offline site clients mirror
+SYNC_MODELS = {
+    'labourer': 'labour.Labourer',
+    'worklog': 'labour.WorkLog',
+    'vendor': 'vendors.Vendor',
+    'purchase': 'vendors.Purchase',
+    'transaction': 'transactions.FinancialTransaction',
+    'contractor': 'contractors.Contractor',
+    'project': 'transactions.Project',
+}
+
+
+def get_sync_model(name):
+    """Return the model class registered under a sync name"""
+    return apps.get_model(SYNC_MODELS[name])
+
+
+_NAMES_BY_LABEL = {label: name for name, label in SYNC_MODELS.items()}
+
+
+def sync_name_for(model):
+    """Return the sync name for a model class, or None if it is not synced"""
+    return _NAMES_BY_LABEL.get(model._meta.label)
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .events import publish_changes, stream_name_for
+from .models import DeletionLog
+from .registry import sync_name_for
+
+
+@receiver(post_delete)
+def record_deletion(sender, instance, **kwargs):
+    """Write a tombstone whenever a synced row is deleted"""
+    name = sync_name_for(sender)
+    if name is not None:
+        DeletionLog.objects.create(model=name, object_id=instance.pk)
+
+
+@receiver(post_save)
+def publish_saved(sender, instance, created, raw=False, **kwargs):
+    """Stream a change event for saved ledger and attendance rows"""
+    if not raw and stream_name_for(sender) is not None:
+        publish_changes('created' if created else 'updated', [instance])
+
+
+@receiver(post_delete)
+def publish_deleted(sender, instance, **kwargs):
+    """Stream a change event for deleted ledger and attendance rows"""
+    if stream_name_for(sender) is not None:
+        publish_changes('deleted', [instance])
@@ -0,0 +1,258 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from contractors.models import Contractor, ContractorPayment
+from labour.attendance import record_crew_attendance
+from labour.models import LabourType, Labourer
+from transactions.models import FinancialTransaction, Project
+from .events import EventHub, SocketBackend, hub
+from .models import DeletionLog
+
+
+class SyncChangesTests(TestCase):
+    """Delta sync by updated_at watermark with deletion tombstones"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(email='tablet@example.com', password='test-pass-123')
+        self.client.force_login(user)
+        self.mason = LabourType.objects.create(name='Mason', base_daily_wage=Decimal('1500.00'))
+        self.labourers = [self.make_labourer(i) for i in range(5)]
+
+    def make_labourer(self, i):
+        return Labourer.objects.create(
+            name=f'Labourer {i}', cnic=f'35202-{i:07d}-1', phone='0300', address='Camp',
+            labour_type=self.mason, daily_wage=Decimal('1600.00'), joining_date=date(2024, 1, 1),
+        )
+
+    def sync(self, **params):
+        params.setdefault('models', 'labourer')
+        return self.client.get(reverse('sync:sync_changes'), params).json()
+
+    def test_initial_then_delta_sync(self):
+        first = self.sync()['models']['labourer']
+        self.assertEqual(len(first['changed']), 5)
+        self.assertEqual(first['changed'][0]['skills'], [])
+        watermark = first['watermark']
+
+        self.assertEqual(self.sync(labourer=watermark)['models']['labourer']['changed'], [])
+
+        self.labourers[2].phone = '0311'
+        self.labourers[2].save()
+        deleted_id = self.labourers[4].id
+        self.labourers[4].delete()
+        delta = self.sync(labourer=watermark)['models']['labourer']
+        self.assertEqual([row['phone'] for row in delta['changed']], ['0311'])
+        self.assertEqual(delta['deleted'], [deleted_id])
+
+        caught_up = self.sync(labourer=delta['watermark'])['models']['labourer']
+        self.assertEqual((caught_up['changed'], caught_up['deleted']), ([], []))
+
+    def test_batches_resume_from_watermark(self):
+        seen = []
+        watermark = ''
+        while True:
+            payload = self.sync(labourer=watermark, limit=2)
+            batch = payload['models']['labourer']
+            seen.extend(row['id'] for row in batch['changed'])
+            watermark = batch['watermark']
+            if not payload['has_more']:
+                break
+        self.assertEqual(seen, [labourer.id for labourer in self.labourers])
+
+    def test_tombstones_for_queryset_delete(self):
+        Labourer.objects.filter(pk__in=[l.pk for l in self.labourers[:2]]).delete()
+        self.assertEqual(DeletionLog.objects.filter(model='labourer').count(), 2)
+
+    def test_response_is_gzipped(self):
+        response = self.client.get(
+            reverse('sync:sync_changes'), {'models': 'labourer'}, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        payload = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(payload['models']['labourer']['changed']), 5)
+
+    def test_rejects_unknown_model_and_bad_watermark(self):
+        response = self.client.get(reverse('sync:sync_changes'), {'models': 'secret'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('sync:sync_changes'), {'models': 'labourer', 'labourer': 'junk'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('sync:sync_changes'), {'models': 'labourer', 'labourer': 'garbage|5|3'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChangeEventTests(TestCase):
+    """Tests for change events, the broadcast hub and the SSE endpoint"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='supervisor@example.com', password='test-pass-123')
+        self.async_client.force_login(self.user)
+        self.mason = LabourType.objects.create(name='Mason', base_daily_wage=Decimal('1500.00'))
+        self.project = Project.objects.create(
+            name='Tower A', description='', start_date='2024-01-01', budget=Decimal('1000000.00')
+        )
+
+    def make_transaction(self, amount='1500.00'):
+        return FinancialTransaction.objects.create(
+            transaction_type='expense', amount=Decimal(amount), date=date(2024, 3, 1),
+            description='Cement', payment_method='cash', project=self.project,
+        )
+
+    def buffered(self, after_id):
+        return [event for _, event in hub.replay(after_id)]
+
+    def test_saves_and_deletes_publish_compact_events_after_commit(self):
+        start = hub.last_id
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction = self.make_transaction()
+            self.assertEqual(hub.last_id, start)
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction.amount = Decimal('1750.00')
+            transaction.save()
+            transaction_id = transaction.id
+            transaction.delete()
+            # Rows outside the streamed models publish nothing
+            LabourType.objects.create(name='Helper', base_daily_wage=Decimal('1000.00'))
+
+        created, updated, deleted = self.buffered(start)
+        self.assertEqual((created['action'], created['model'], created['id']), ('created', 'transaction', transaction_id))
+        self.assertEqual(created['fields'], {
+            'transaction_type': 'expense', 'amount': '1500.00', 'date': '2024-03-01',
+            'payment_method': 'cash', 'project_id': self.project.id,
+        })
+        self.assertEqual(updated['fields']['amount'], '1750.00')
+        self.assertEqual((deleted['action'], deleted['fields']), ('deleted', {}))
+
+    def test_bulk_writes_publish_events(self):
+        labourers = [
+            Labourer.objects.create(
+                name=f'Labourer {i}', cnic=f'35202-{i:07d}-1', phone='0300', address='Camp',
+                labour_type=self.mason, daily_wage=Decimal('1600.00'), joining_date=date(2024, 1, 1),
+            )
+            for i in range(3)
+        ]
+        start = hub.last_id
+        with self.captureOnCommitCallbacks(execute=True):
+            record_crew_attendance(date(2024, 3, 4), [{'labourer': labourer.id} for labourer in labourers])
+        events = self.buffered(start)
+        self.assertEqual({event['model'] for event in events}, {'worklog'})
+        self.assertEqual(sorted(event['fields']['labourer_id'] for event in events), [l.id for l in labourers])
+
+        start = hub.last_id
+        with override_settings(EVENT_STREAM_BULK_LIMIT=2), self.captureOnCommitCallbacks(execute=True):
+            record_crew_attendance(
+                date(2024, 3, 4), [{'labourer': labourer.id, 'hours_worked': '4'} for labourer in labourers],
+                on_conflict='update',
+            )
+        self.assertEqual(self.buffered(start), [{'action': 'reset', 'model': 'worklog', 'count': 3}])
+
+    def test_hub_replays_and_resets_slow_streams(self):
+        async def scenario():
+            local = EventHub(buffer_size=3, queue_size=2)
+            subscription = local.subscribe(['transaction'])
+            for i in range(1, 5):
+                local.dispatch({'action': 'created', 'model': 'transaction', 'id': i})
+            local.dispatch({'action': 'created', 'model': 'worklog', 'id': 1})
+            await asyncio.sleep(0)
+            queued = [await subscription.get(0.1) for _ in range(2)]
+            subscription.close()
+            return local, queued
+
+        local, queued = asyncio.run(scenario())
+        # The stream lagged past its queue, so it was told to resync
+        self.assertEqual(queued[0], (None, {'action': 'reset'}))
+        self.assertEqual(queued[1], (4, {'action': 'created', 'model': 'transaction', 'id': 4}))
+        self.assertEqual([event_id for event_id, _ in local.replay(3)], [4, 5])
+        self.assertEqual([event['id'] for _, event in local.replay(3, models={'transaction'})], [4])
+        self.assertIsNone(local.replay(1))
+        self.assertIsNone(local.replay(99))
+        self.assertEqual(local.parse_event_id(local.event_id(4)), 4)
+        self.assertIsNone(local.parse_event_id(EventHub().event_id(4)))
+        self.assertIsNone(local.parse_event_id('4'))
+
+    def test_socket_backend_fans_out_across_processes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        hubs = [EventHub(), EventHub()]
+        backends = [SocketBackend(local, directory=directory, name=f'worker-{i}') for i, local in enumerate(hubs)]
+        for backend in backends:
+            backend.listen()
+            self.addCleanup(backend.close)
+        # A socket left behind by a dead process is pruned on publish
+        open(f'{directory}/gone.sock', 'w').close()
+
+        async def scenario():
+            subscriptions = [local.subscribe() for local in hubs]
+            backends[0].publish({'action': 'created', 'model': 'purchase', 'id': 7})
+            return [await subscription.get(2) for subscription in subscriptions]
+
+        received = asyncio.run(scenario())
+        self.assertEqual([event['id'] for _, event in received], [7, 7])
+        self.assertEqual(sorted(os.listdir(directory)), ['worker-0.sock', 'worker-1.sock'])
+
+    async def test_stream_pushes_events_and_replays_after_reconnect(self):
+        url = reverse('sync:event_stream')
+        response = await self.async_client.get(url, {'models': 'contractorpayment'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+
+        # The ORM runs on the main thread, so commit callbacks are captured there
+        def record_payment():
+            contractor = Contractor.objects.create(
+                name='Electrician', contact_person='Site office', phone='0300-0000000',
+                address='Lahore', specialization='Electrical', rate_per_day=Decimal('2500.00'),
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                self.make_transaction()
+                return ContractorPayment.objects.create(
+                    contractor=contractor, project=self.project, amount=Decimal('5000.00'),
+                    payment_date=date(2024, 3, 1), payment_method='cash',
+                )
+        payment = await sync_to_async(record_payment)()
+        frame = (await asyncio.wait_for(anext(stream), 2)).decode()
+        await stream.aclose()
+        event_id = frame.split('\n')[0].removeprefix('id: ')
+        event = json.loads(frame.split('data: ')[1])
+        self.assertEqual((event['model'], event['id'], event['fields']['amount']),
+                         ('contractorpayment', payment.id, '5000.00'))
+
+        def delete_payment():
+            with self.captureOnCommitCallbacks(execute=True):
+                payment.delete()
+        await sync_to_async(delete_payment)()
+        resumed = await self.async_client.get(url, {'models': 'contractorpayment'}, headers={'Last-Event-ID': event_id})
+        stream = aiter(resumed.streaming_content)
+        await anext(stream)
+        replayed = (await anext(stream)).decode()
+        await stream.aclose()
+        self.assertIn('"action":"deleted"', replayed)
+
+        # Ids past the buffer, from another worker or from before a restart are reset
+        sequence = int(event_id.rpartition('-')[2])
+        for lost_id in (f'{hub.boot}-999999999', f'{EventHub().boot}-{sequence}', str(sequence)):
+            lost = await self.async_client.get(url, headers={'Last-Event-ID': lost_id})
+            stream = aiter(lost.streaming_content)
+            await anext(stream)
+            self.assertTrue((await anext(stream)).startswith(b'event: reset'), lost_id)
+            await stream.aclose()
+
+    def test_stream_is_refused_under_wsgi(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('sync:event_stream')).status_code, 501)
+
+    async def test_stream_rejects_unknown_models(self):
+        response = await self.async_client.get(reverse('sync:event_stream'), {'models': 'secret'})
+        self.assertEqual(response.status_code, 400)
+
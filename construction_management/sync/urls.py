@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'sync'
+
+urlpatterns = [
+    path('', views.sync_changes, name='sync_changes'),
+    path('events/', views.event_stream, name='event_stream'),
+]
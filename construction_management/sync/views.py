@@ -0,0 +1,116 @@
+import asyncio
+import json
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view
+from .changes import collect_changes, DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE
+from .events import STREAM_MODELS, get_backend, hub
+from .registry import SYNC_MODELS
+
+@gzip_page
+@api_view(['GET'])
+def sync_changes(request):
+    """Delta sync: rows changed and tombstones since each model's watermark.
+
+    Query parameters: ``models`` (comma-separated sync names, default all),
+    ``<model>=<watermark>`` per model and ``limit`` per model per batch.
+    """
+    names = request.query_params.get('models')
+    names = names.split(',') if names else list(SYNC_MODELS)
+    unknown = [name for name in names if name not in SYNC_MODELS]
+    if unknown:
+        return JsonResponse({'error': f'Unknown models: {", ".join(unknown)}'}, status=400)
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_BATCH_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    limit = min(max(limit, 1), MAX_BATCH_SIZE)
+
+    try:
+        changes = {
+            name: collect_changes(name, request.query_params.get(name), limit)
+            for name in names
+        }
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'server_time': timezone.now(),
+        'models': changes,
+        'has_more': any(change['has_more'] for change in changes.values()),
+    })
+
+
+def _sse(event_id, event):
+    lines = [] if event_id is None else [f'id: {hub.event_id(event_id)}']
+    if event['action'] == 'reset':
+        lines.append('event: reset')
+    lines.append('data: ' + json.dumps(event, cls=DjangoJSONEncoder, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+async def _event_source(names, last_event_id):
+    """Yield SSE frames: any replayed backlog, then live events and heartbeats"""
+    subscription = hub.subscribe(names)
+    heartbeat = getattr(settings, 'EVENT_STREAM_HEARTBEAT', 15)
+    loop = asyncio.get_running_loop()
+    # Streams are recycled now and then so proxies and load balancers see them end
+    deadline = loop.time() + getattr(settings, 'EVENT_STREAM_MAX_AGE', 600)
+    try:
+        yield f"retry: {getattr(settings, 'EVENT_STREAM_RETRY_MS', 3000)}\n\n"
+        seen = 0
+        if last_event_id is not None:
+            after = hub.parse_event_id(last_event_id)
+            # An id from another process or an earlier run can't be replayed here
+            backlog = hub.replay(after, names) if after is not None else None
+            if backlog is None:
+                yield _sse(None, {'action': 'reset'})
+            for event_id, event in backlog or []:
+                yield _sse(event_id, event)
+                seen = event_id
+        while (remaining := deadline - loop.time()) > 0:
+            entry = await subscription.get(min(heartbeat, remaining))
+            if entry is None:
+                yield ': keepalive\n\n'
+                continue
+            event_id, event = entry
+            # Already sent from the replay buffer
+            if event_id is not None and event_id <= seen:
+                continue
+            yield _sse(event_id, event)
+    finally:
+        subscription.close()
+
+
+@login_required
+@require_GET
+async def event_stream(request):
+    """Server-sent events for ledger and attendance changes.
+
+    Query parameter ``models`` limits the stream to some of
+    transaction, worklog, purchase and contractorpayment. Reconnecting
+    clients send Last-Event-ID and are replayed what they missed, or sent
+    a ``reset`` event when that is no longer possible.
+    """
+    if 'wsgi.version' in request.META:
+        # A WSGI worker would buffer the endless body and never answer
+        return JsonResponse({'error': 'Event streams are only served by the ASGI application'}, status=501)
+    names = request.GET.get('models')
+    names = names.split(',') if names else list(STREAM_MODELS)
+    unknown = [name for name in names if name not in STREAM_MODELS]
+    if unknown:
+        return JsonResponse({'error': f'Unknown models: {", ".join(unknown)}'}, status=400)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+
+    get_backend().listen()
+    response = StreamingHttpResponse(_event_source(names, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
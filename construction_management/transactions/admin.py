@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Project, ExpenseCategory, Department, FinancialTransaction,
-    RecurringTransaction, TransactionAttachment
+    RecurringTransaction, TransactionAttachment, StatementImport, StatementLine
 )
 
 @admin.register(Project)
@@ -87,3 +87,17 @@ class TransactionAttachmentAdmin(admin.ModelAdmin):
     list_filter = ('uploaded_at',)
     search_fields = ('description', 'transaction__reference_number')
     date_hierarchy = 'uploaded_at'
+
+@admin.register(StatementImport)
+class StatementImportAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'source', 'line_count', 'matched_count', 'error_count', 'created_at')
+    list_filter = ('source', 'created_at')
+    search_fields = ('file_name',)
+    date_hierarchy = 'created_at'
+
+@admin.register(StatementLine)
+class StatementLineAdmin(admin.ModelAdmin):
+    list_display = ('statement', 'line_number', 'transaction_id', 'amount', 'date', 'match_status')
+    list_filter = ('match_status', 'matched_model')
+    search_fields = ('transaction_id', 'description')
+    list_select_related = ('statement',)
@@ -0,0 +1,54 @@
+from django import forms
+from django.core.cache import cache
+from .models import FinancialTransaction, Project
+
+PROJECT_CHOICES_VERSION_KEY = 'transactions:project_choices:version'
+
+
+def invalidate_project_choices():
+    """Bump the cache version so the next form sees the current projects"""
+    try:
+        cache.incr(PROJECT_CHOICES_VERSION_KEY)
+    except ValueError:
+        cache.set(PROJECT_CHOICES_VERSION_KEY, 1, None)
+
+
+def project_choices():
+    """Return cached (id, name) pairs for active projects"""
+    version = cache.get_or_set(PROJECT_CHOICES_VERSION_KEY, 1, None)
+    key = f'transactions:project_choices:v{version}'
+    return cache.get_or_set(
+        key, lambda: list(Project.objects.filter(is_active=True).order_by('name').values_list('id', 'name'))
+    )
+
+
+class FinancialTransactionForm(forms.ModelForm):
+    """Form for creating and editing financial transactions.
+
+    The project is validated against the cached choice list and assigned
+    by id, so saving costs a single INSERT or UPDATE. A transaction being
+    edited keeps its own project as a choice even once that project closes.
+    """
+    project = forms.TypedChoiceField(coerce=int, required=False, empty_value=None)
+
+    class Meta:
+        model = FinancialTransaction
+        fields = ['transaction_type', 'amount', 'date', 'description', 'payment_method', 'transaction_id']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        choices = project_choices()
+        project_id = self.instance.project_id
+        if project_id and project_id not in dict(choices):
+            choices = choices + [(project_id, self.instance.project.name)]
+        self.fields['project'].choices = [('', '---------')] + choices
+        if project_id and not self.is_bound:
+            self.initial['project'] = project_id
+
+    def clean_transaction_id(self):
+        return self.cleaned_data['transaction_id'] or None
+
+    def _post_clean(self):
+        super()._post_clean()
+        if 'project' in self.cleaned_data:
+            self.instance.project_id = self.cleaned_data['project']
@@ -0,0 +1,42 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.models import StatementImport
+from transactions.reconciliation import StatementError, match_summary, reconcile_statement
+
+
+def _decimal(value):
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(value)
+
+
+class Command(BaseCommand):
+    help = 'Match a bank or wallet statement CSV against recorded payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Statement CSV file')
+        parser.add_argument('--source', required=True, choices=[s for s, _ in StatementImport.SOURCE_CHOICES])
+        parser.add_argument('--date-window', type=int, default=3,
+                            help='Days either side of the statement date searched for fuzzy matches')
+        parser.add_argument('--amount-tolerance', type=_decimal, default=Decimal('0.00'),
+                            help='Largest amount difference accepted for fuzzy matches')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as f:
+                statement, errors = reconcile_statement(
+                    f, options['source'], file_name=options['path'],
+                    date_window=options['date_window'], amount_tolerance=options['amount_tolerance'],
+                )
+        except (OSError, StatementError) as e:
+            raise CommandError(str(e))
+
+        for error in errors[:20]:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled {statement.line_count} lines ({statement.error_count} unreadable): '
+            + ', '.join(f'{status} {count}' for status, count in match_summary(statement).items())
+        ))
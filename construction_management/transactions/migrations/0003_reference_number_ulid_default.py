@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:51
+
+import transactions.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_financialtransaction_transaction_updated_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='financialtransaction',
+            name='reference_number',
+            field=models.CharField(default=transactions.models.new_reference_number, help_text='Unique reference number for this transaction', max_length=50, unique=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:58
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_reference_number_ulid_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatementImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('easypaisa', 'Easypaisa'), ('jazzcash', 'JazzCash'), ('bank', 'Bank Transfer')], max_length=10)),
+                ('file_name', models.CharField(max_length=255)),
+                ('date_window', models.PositiveSmallIntegerField(default=3, help_text='Days either side of the statement date searched for fuzzy matches')),
+                ('amount_tolerance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Largest amount difference accepted for fuzzy matches', max_digits=10)),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('matched_count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('imported_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='statement_imports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatementLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line_number', models.PositiveIntegerField()),
+                ('transaction_id', models.CharField(blank=True, max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date', models.DateField()),
+                ('description', models.TextField(blank=True)),
+                ('match_status', models.CharField(choices=[('exact', 'Exact'), ('fuzzy', 'Fuzzy'), ('mismatch', 'Amount Mismatch'), ('ambiguous', 'Ambiguous'), ('unmatched', 'Unmatched')], max_length=10)),
+                ('matched_model', models.CharField(blank=True, choices=[('transaction', 'Financial Transaction'), ('vendor_payment', 'Vendor Payment'), ('labour_payment', 'Labour Payment'), ('contractor_payment', 'Contractor Payment')], max_length=20)),
+                ('matched_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='transactions.statementimport')),
+            ],
+            options={
+                'ordering': ['statement', 'line_number'],
+                'indexes': [models.Index(fields=['statement', 'match_status'], name='statement_line_status_idx'), models.Index(fields=['matched_model', 'matched_id'], name='statement_line_match_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachments', '0001_initial'),
+        ('transactions', '0004_statement_reconciliation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactionattachment',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='transaction_attachments', to='attachments.blob'),
+        ),
+        migrations.AlterField(
+            model_name='transactionattachment',
+            name='file',
+            field=models.FileField(max_length=200, upload_to='transaction_attachments/'),
+        ),
+    ]
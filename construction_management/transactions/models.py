@@ -1,9 +1,29 @@
+import os
+import time
+from django.conf import settings
 from django.db import models
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from vendors.models import Vendor, Purchase
 from labour.models import Labourer, LabourPayment
 
+CROCKFORD_BASE32 = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+def new_reference_number():
+    """Return a ULID-based reference such as TRX-01HV3K8Z9Q4M7T2W5X6Y8Z0ABC.
+
+    48 bits of millisecond time followed by 80 random bits: unique without a
+    database round trip or unique-violation retries, and sortable by time.
+    """
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), 'big')
+    chars = []
+    for _ in range(26):
+        value, index = divmod(value, 32)
+        chars.append(CROCKFORD_BASE32[index])
+    return 'TRX-' + ''.join(reversed(chars))
+
+
 class Project(models.Model):
     """Model for tracking different construction projects"""
     name = models.CharField(max_length=200)
@@ -25,6 +45,9 @@ class Project(models.Model):
 
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='project_updated_idx'),
+        ]
 
 class ExpenseCategory(models.Model):
     """Model for categorizing expenses"""
@@ -99,6 +122,7 @@ class FinancialTransaction(models.Model):
     reference_number = models.CharField(
         max_length=50,
         unique=True,
+        default=new_reference_number,
         help_text='Unique reference number for this transaction'
     )
     project = models.ForeignKey(
@@ -144,6 +168,9 @@ class FinancialTransaction(models.Model):
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='transaction_updated_idx'),
+        ]
 
 class RecurringTransaction(models.Model):
     """Model for setting up recurring transactions"""
@@ -202,7 +229,14 @@ class TransactionAttachment(models.Model):
         on_delete=models.CASCADE,
         related_name='attachments'
     )
-    file = models.FileField(upload_to='transaction_attachments/')
+    file = models.FileField(upload_to='transaction_attachments/', max_length=200)
+    blob = models.ForeignKey(
+        'attachments.Blob',
+        on_delete=models.PROTECT,
+        related_name='transaction_attachments',
+        null=True,
+        blank=True
+    )
     description = models.CharField(max_length=200, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
@@ -211,3 +245,83 @@ class TransactionAttachment(models.Model):
 
     class Meta:
         ordering = ['-uploaded_at']
+
+class StatementImport(models.Model):
+    """Model for a bank or wallet statement uploaded for reconciliation"""
+    SOURCE_CHOICES = [
+        ('easypaisa', 'Easypaisa'),
+        ('jazzcash', 'JazzCash'),
+        ('bank', 'Bank Transfer'),
+    ]
+
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    file_name = models.CharField(max_length=255)
+    date_window = models.PositiveSmallIntegerField(
+        default=3,
+        help_text='Days either side of the statement date searched for fuzzy matches'
+    )
+    amount_tolerance = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Largest amount difference accepted for fuzzy matches'
+    )
+    line_count = models.PositiveIntegerField(default=0)
+    matched_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    imported_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='statement_imports'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_source_display()} statement {self.file_name}"
+
+    class Meta:
+        ordering = ['-created_at']
+
+class StatementLine(models.Model):
+    """Model for one statement line and the payment it was matched to"""
+    MATCH_STATUS_CHOICES = [
+        ('exact', 'Exact'),
+        ('fuzzy', 'Fuzzy'),
+        ('mismatch', 'Amount Mismatch'),
+        ('ambiguous', 'Ambiguous'),
+        ('unmatched', 'Unmatched'),
+    ]
+    MATCHED_STATUSES = ('exact', 'fuzzy')
+
+    MATCHED_MODEL_CHOICES = [
+        ('transaction', 'Financial Transaction'),
+        ('vendor_payment', 'Vendor Payment'),
+        ('labour_payment', 'Labour Payment'),
+        ('contractor_payment', 'Contractor Payment'),
+    ]
+
+    statement = models.ForeignKey(
+        StatementImport,
+        on_delete=models.CASCADE,
+        related_name='lines'
+    )
+    line_number = models.PositiveIntegerField()
+    transaction_id = models.CharField(max_length=100, blank=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    date = models.DateField()
+    description = models.TextField(blank=True)
+    match_status = models.CharField(max_length=10, choices=MATCH_STATUS_CHOICES)
+    matched_model = models.CharField(max_length=20, choices=MATCHED_MODEL_CHOICES, blank=True)
+    matched_id = models.PositiveBigIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Line {self.line_number} of {self.statement}"
+
+    class Meta:
+        ordering = ['statement', 'line_number']
+        indexes = [
+            models.Index(fields=['statement', 'match_status'], name='statement_line_status_idx'),
+            models.Index(fields=['matched_model', 'matched_id'], name='statement_line_match_idx'),
+        ]
@@ -0,0 +1,251 @@
+"""Statement reconciliation against recorded payments.
+
+Statement CSVs are read as a stream and matched a chunk at a time. For
+each chunk the candidate payments are loaded with two queries per payment
+table (one by transaction id, one by date range) and indexed in memory,
+so matching a line is a dictionary lookup rather than a query.
+"""
+import csv
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Count
+
+from contractors.models import ContractorPayment
+from labour.models import LabourPayment
+from vendors.models import Payment
+from .models import FinancialTransaction, StatementImport, StatementLine
+
+CHUNK_SIZE = 5000
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d-%b-%Y', '%d %b %Y')
+
+# Header spellings seen in Easypaisa, JazzCash and bank exports
+COLUMN_ALIASES = {
+    'transaction_id': ('transaction_id', 'transaction id', 'txn id', 'tid', 'reference', 'reference no'),
+    'amount': ('amount', 'debit', 'withdrawal', 'credit', 'deposit'),
+    'date': ('date', 'transaction date', 'value date', 'posting date'),
+    'description': ('description', 'narration', 'details', 'remarks'),
+}
+
+# matched_model label -> (model, date field, filter). Ledger entries that
+# mirror a vendor or labour payment are left out so the payment is the match.
+PAYMENT_SOURCES = {
+    'vendor_payment': (Payment, 'payment_date', {}),
+    'labour_payment': (LabourPayment, 'payment_date', {}),
+    'contractor_payment': (ContractorPayment, 'payment_date', {}),
+    'transaction': (FinancialTransaction, 'date', {'vendor_purchase__isnull': True, 'labour_payment__isnull': True}),
+}
+
+StatementRow = namedtuple('StatementRow', 'line_number transaction_id amount date description')
+Candidate = namedtuple('Candidate', 'source id transaction_id amount date')
+
+
+class StatementError(ValueError):
+    """Raised when a statement file can't be read at all"""
+
+
+def normalize_transaction_id(value):
+    return (value or '').strip().upper()
+
+
+def _parse_amount(value):
+    value = (value or '').replace(',', '').replace('PKR', '').replace('Rs.', '').strip()
+    if not value:
+        return None
+    return abs(Decimal(value))
+
+
+def _parse_date(value):
+    value = (value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Unrecognised date {value!r}')
+
+
+def _column_map(fieldnames):
+    """Map each logical column to the header names present in the file"""
+    headers = {name.strip().lower(): name for name in fieldnames or [] if name}
+    columns = {
+        column: [headers[alias] for alias in aliases if alias in headers]
+        for column, aliases in COLUMN_ALIASES.items()
+    }
+    missing = [column for column in ('amount', 'date') if not columns[column]]
+    if missing:
+        raise StatementError(f'Statement is missing required columns: {", ".join(missing)}')
+    return columns
+
+
+def read_statement(lines):
+    """Yield (StatementRow, None) or (None, error) for each row of a CSV stream.
+
+    Debit and credit columns are both read as amounts; whichever is filled
+    in wins, since payments are matched on absolute value.
+    """
+    reader = csv.DictReader(lines)
+    columns = _column_map(reader.fieldnames)
+    for line_number, record in enumerate(reader, start=2):
+        def first(column):
+            return next((record[name] for name in columns[column] if (record.get(name) or '').strip()), '')
+        try:
+            amount = _parse_amount(first('amount'))
+            if amount is None:
+                raise ValueError('No amount')
+            row = StatementRow(
+                line_number=line_number,
+                transaction_id=normalize_transaction_id(first('transaction_id')),
+                amount=amount,
+                date=_parse_date(first('date')),
+                description=first('description').strip(),
+            )
+        except (ValueError, InvalidOperation) as e:
+            yield None, f'Line {line_number}: {e}'
+            continue
+        yield row, None
+
+
+class PaymentIndex:
+    """Hash indexes over candidate payments for one chunk of statement rows"""
+
+    def __init__(self, rows, payment_method, date_window, claimed=()):
+        self.by_transaction_id = defaultdict(list)
+        self.by_amount_date = defaultdict(list)
+        self.by_date = defaultdict(list)
+        self.claimed = set(claimed)
+        self.date_window = date_window
+
+        transaction_ids = {row.transaction_id for row in rows if row.transaction_id}
+        low = min(row.date for row in rows) - timedelta(days=date_window)
+        high = max(row.date for row in rows) + timedelta(days=date_window)
+        seen = set()
+        for source, (model, date_field, filters) in PAYMENT_SOURCES.items():
+            fields = ('id', 'transaction_id', 'amount', date_field)
+            payments = model.objects.filter(**filters)
+            by_id = payments.filter(transaction_id__in=transaction_ids) if transaction_ids else payments.none()
+            by_range = payments.filter(payment_method=payment_method, **{f'{date_field}__range': (low, high)})
+            for queryset in (by_id, by_range):
+                for pk, transaction_id, amount, day in queryset.values_list(*fields).iterator(chunk_size=2000):
+                    if (source, pk) in seen:
+                        continue
+                    seen.add((source, pk))
+                    self.add(Candidate(source, pk, normalize_transaction_id(transaction_id), amount, day))
+
+        # Payments matched by earlier statements can't be matched again
+        if seen:
+            self.claimed.update(StatementLine.objects.filter(
+                match_status__in=StatementLine.MATCHED_STATUSES,
+                matched_id__in={pk for _, pk in seen},
+            ).values_list('matched_model', 'matched_id'))
+
+    def add(self, candidate):
+        if candidate.transaction_id:
+            self.by_transaction_id[candidate.transaction_id].append(candidate)
+        self.by_amount_date[(candidate.amount, candidate.date)].append(candidate)
+        self.by_date[candidate.date].append(candidate)
+
+    def available(self, candidates):
+        return [c for c in candidates if (c.source, c.id) not in self.claimed]
+
+    def match(self, row, amount_tolerance):
+        """Return (status, candidate or None) for a statement row"""
+        if row.transaction_id and row.transaction_id in self.by_transaction_id:
+            candidates = self.available(self.by_transaction_id[row.transaction_id])
+            within = [c for c in candidates if abs(c.amount - row.amount) <= amount_tolerance]
+            if len(within) == 1:
+                return 'exact', within[0]
+            if len(within) > 1:
+                return 'ambiguous', None
+            if candidates:
+                return 'mismatch', None
+
+        # Same amount on the same day is the common case; only scan the
+        # date window when that misses
+        candidates = self.available(self.by_amount_date[(row.amount, row.date)])
+        if not candidates:
+            candidates = [
+                c for offset in range(-self.date_window, self.date_window + 1)
+                for c in self.available(self.by_date[row.date + timedelta(days=offset)])
+                if abs(c.amount - row.amount) <= amount_tolerance
+            ]
+        if not candidates:
+            return 'unmatched', None
+        # Prefer payments without a recorded id, then the nearest date and amount
+        def score(c):
+            return bool(c.transaction_id), abs((c.date - row.date).days), abs(c.amount - row.amount)
+        scored = sorted(candidates, key=score)
+        if len(scored) > 1 and score(scored[0]) == score(scored[1]):
+            return 'ambiguous', None
+        return 'fuzzy', scored[0]
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def reconcile_statement(lines, source, file_name='', date_window=3, amount_tolerance=Decimal('0.00'),
+                        user=None, chunk_size=CHUNK_SIZE):
+    """Import a statement CSV stream and match each line to a payment.
+
+    Returns the saved StatementImport together with the list of rows that
+    could not be parsed. Each payment is matched to at most one line.
+    """
+    if source not in dict(StatementImport.SOURCE_CHOICES):
+        raise StatementError(f'Unknown statement source {source!r}')
+    amount_tolerance = Decimal(amount_tolerance)
+    errors = []
+
+    def parsed_rows():
+        for row, error in read_statement(lines):
+            if error:
+                errors.append(error)
+            else:
+                yield row
+
+    with transaction.atomic():
+        statement = StatementImport.objects.create(
+            source=source, file_name=file_name, date_window=date_window,
+            amount_tolerance=amount_tolerance, imported_by=user,
+        )
+        claimed = set()
+        for chunk in _chunks(parsed_rows(), chunk_size):
+            index = PaymentIndex(chunk, source, date_window, claimed)
+            results = []
+            for row in chunk:
+                status, candidate = index.match(row, amount_tolerance)
+                if candidate:
+                    index.claimed.add((candidate.source, candidate.id))
+                    statement.matched_count += 1
+                results.append(StatementLine(
+                    statement=statement,
+                    line_number=row.line_number,
+                    transaction_id=row.transaction_id,
+                    amount=row.amount,
+                    date=row.date,
+                    description=row.description,
+                    match_status=status,
+                    matched_model=candidate.source if candidate else '',
+                    matched_id=candidate.id if candidate else None,
+                ))
+            StatementLine.objects.bulk_create(results, batch_size=1000)
+            claimed = index.claimed
+            statement.line_count += len(chunk)
+        statement.error_count = len(errors)
+        statement.save(update_fields=['line_count', 'matched_count', 'error_count'])
+    return statement, errors
+
+
+def match_summary(statement):
+    """Return {match_status: line count} for a statement, zeros included"""
+    counts = dict(statement.lines.values_list('match_status').annotate(n=Count('id')).order_by())
+    return {status: counts.get(status, 0) for status, _ in StatementLine.MATCH_STATUS_CHOICES}
@@ -1,3 +1,221 @@
+import io
+import json
+import random
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
+
+from construction_management import factories
+from vendors.models import Payment
+from .models import FinancialTransaction, Project, StatementImport, new_reference_number
+from .reconciliation import StatementError, reconcile_statement
+
+
+class TransactionWriteTests(TestCase):
+    """Tests for the transaction add, edit and batch endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='accounts@example.com', password='test-pass-123'
+        )
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name='Tower A', description='', location='Lahore',
+            start_date=date(2024, 1, 1), budget=Decimal('1000000.00'),
+        )
+
+    def payload(self, **overrides):
+        return {
+            'transaction_type': 'expense',
+            'amount': '2500.00',
+            'date': '2024-03-04',
+            'description': 'Cement delivery',
+            'payment_method': 'cash',
+            'project': str(self.project.id),
+            **overrides,
+        }
+
+    def test_add_with_project_is_a_single_insert(self):
+        self.client.get(reverse('transactions:transaction_add'))  # warm the project choices
+        # session, user and the insert itself
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('transactions:transaction_add'), self.payload())
+        self.assertRedirects(response, reverse('transactions:transaction_list'), fetch_redirect_response=False)
+        transaction = FinancialTransaction.objects.get()
+        self.assertEqual(transaction.project_id, self.project.id)
+        self.assertTrue(transaction.reference_number.startswith('TRX-'))
+
+    def test_invalid_input_redisplays_form_with_errors(self):
+        response = self.client.post(
+            reverse('transactions:transaction_add'), self.payload(amount='-5', project='999999')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('amount', response.context['form'].errors)
+        self.assertIn('project', response.context['form'].errors)
+        self.assertFalse(FinancialTransaction.objects.exists())
+
+    def test_edit_updates_in_place(self):
+        transaction = FinancialTransaction.objects.create(
+            transaction_type='income', amount=Decimal('10.00'), date=date(2024, 1, 1),
+            description='Initial', payment_method='bank',
+        )
+        reference = transaction.reference_number
+        page = self.client.get(reverse('transactions:transaction_edit', args=[transaction.id]))
+        self.assertContains(page, 'value="2024-01-01"')
+        response = self.client.post(
+            reverse('transactions:transaction_edit', args=[transaction.id]), self.payload(amount='99.50')
+        )
+        self.assertEqual(response.status_code, 302)
+        transaction.refresh_from_db()
+        self.assertEqual((transaction.amount, transaction.project_id), (Decimal('99.50'), self.project.id))
+        self.assertEqual(transaction.reference_number, reference)
+
+    def test_project_choices_follow_project_changes(self):
+        self.client.get(reverse('transactions:transaction_add'))
+        other = Project.objects.create(
+            name='Tower B', description='', location='Lahore',
+            start_date=date(2024, 1, 1), budget=Decimal('1000.00'),
+        )
+        response = self.client.post(reverse('transactions:transaction_add'), self.payload(project=str(other.id)))
+        self.assertEqual(response.status_code, 302)
+
+    def test_edit_keeps_a_closed_project(self):
+        transaction = FinancialTransaction.objects.create(
+            transaction_type='expense', amount=Decimal('10.00'), date=date(2024, 1, 1),
+            description='Initial', payment_method='cash', project=self.project,
+        )
+        Project.objects.filter(id=self.project.id).update(is_active=False)
+        url = reverse('transactions:transaction_edit', args=[transaction.id])
+        self.assertContains(self.client.get(url), 'Tower A')
+        response = self.client.post(url, self.payload(amount='20.00'))
+        self.assertEqual(response.status_code, 302)
+        transaction.refresh_from_db()
+        self.assertEqual((transaction.amount, transaction.project_id), (Decimal('20.00'), self.project.id))
+        # A closed project still can't be picked for a new transaction
+        response = self.client.post(reverse('transactions:transaction_add'), self.payload())
+        self.assertIn('project', response.context['form'].errors)
+
+    def test_batch_creates_all_or_nothing(self):
+        url = reverse('transactions:transaction_batch_api')
+        entries = [self.payload(amount=str(100 + i)) for i in range(50)]
+        entries[10]['payment_method'] = 'cheque'
+        response = self.client.post(url, json.dumps({'transactions': entries}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()['errors']), ['10'])
+        self.assertFalse(FinancialTransaction.objects.exists())
+
+        entries[10]['payment_method'] = 'bank'
+        response = self.client.post(url, json.dumps({'transactions': entries}), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 50)
+        self.assertEqual(FinancialTransaction.objects.filter(project=self.project).count(), 50)
+        self.assertEqual(len({t['reference_number'] for t in response.json()['transactions']}), 50)
+
+    def test_reference_numbers_are_unique_and_time_ordered(self):
+        references = [new_reference_number() for _ in range(1000)]
+        self.assertEqual(len(set(references)), 1000)
+        self.assertEqual(len(references[0]), 30)
+        self.assertLessEqual(references[0][:14], references[-1][:14])
+
+
+class ReconciliationTests(TestCase):
+    """Tests for matching statement CSVs against recorded payments"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='accounts@example.com', password='test-pass-123'
+        )
+        self.client.force_login(self.user)
+
+    def make_transaction(self, amount, day, transaction_id=None, payment_method='bank'):
+        return FinancialTransaction.objects.create(
+            transaction_type='expense', amount=Decimal(amount), date=day, description='Payment',
+            payment_method=payment_method, transaction_id=transaction_id,
+        )
+
+    def reconcile(self, csv_text, **kwargs):
+        return reconcile_statement(io.StringIO(csv_text), kwargs.pop('source', 'bank'), **kwargs)
+
+    def test_matches_by_transaction_id_then_amount_and_date(self):
+        by_id = self.make_transaction('5000.00', date(2024, 3, 1), transaction_id='abc123')
+        same_day = self.make_transaction('720.00', date(2024, 3, 2))
+        nearby = self.make_transaction('1499.50', date(2024, 3, 6))
+        statement, errors = self.reconcile(
+            'Date,Transaction ID,Debit,Credit,Narration\n'
+            '01/03/2024,ABC123,"5,000.00",,Cement\n'
+            '02/03/2024,,720.00,,Steel\n'
+            '04/03/2024,,1500.00,,Sand\n'
+            '05/03/2024,ZZZ999,,12.00,Refund\n'
+            'not a date,,1.00,,Broken\n',
+            amount_tolerance=Decimal('1.00'),
+        )
+        self.assertEqual(errors, ["Line 6: Unrecognised date 'not a date'"])
+        lines = {line.line_number: line for line in statement.lines.all()}
+        self.assertEqual((lines[2].match_status, lines[2].matched_id), ('exact', by_id.id))
+        self.assertEqual((lines[3].match_status, lines[3].matched_id), ('fuzzy', same_day.id))
+        self.assertEqual((lines[4].match_status, lines[4].matched_id), ('fuzzy', nearby.id))
+        self.assertEqual(lines[5].match_status, 'unmatched')
+        self.assertEqual((statement.line_count, statement.matched_count, statement.error_count), (4, 3, 1))
+
+    def test_vendor_payment_wins_over_its_ledger_entry(self):
+        _, products = factories.make_vendors(1, rng=random.Random(1))
+        purchase = factories.make_purchases(1, products, date(2024, 3, 1), days=1, paid_share=0, rng=random.Random(1))[0]
+        payment = Payment.objects.create(
+            purchase=purchase, amount=Decimal('800.00'), payment_date=date(2024, 3, 1),
+            payment_method='easypaisa', transaction_id='EP-77',
+        )
+        FinancialTransaction.objects.create(
+            transaction_type='expense', amount=Decimal('800.00'), date=date(2024, 3, 1), description='Vendor',
+            payment_method='easypaisa', transaction_id='EP-77', vendor_purchase=purchase,
+        )
+        statement, _ = self.reconcile('date,tid,amount\n2024-03-01,ep-77,800\n', source='easypaisa')
+        line = statement.lines.get()
+        self.assertEqual((line.match_status, line.matched_model, line.matched_id), ('exact', 'vendor_payment', payment.id))
+
+    def test_amount_mismatch_ambiguity_and_claimed_payments(self):
+        self.make_transaction('100.00', date(2024, 3, 1), transaction_id='T1')
+        self.make_transaction('250.00', date(2024, 3, 2))
+        self.make_transaction('250.00', date(2024, 3, 2))
+        statement, _ = self.reconcile('date,reference,amount\n2024-03-01,T1,150.00\n2024-03-02,,250.00\n')
+        self.assertEqual(list(statement.lines.values_list('match_status', flat=True)), ['mismatch', 'ambiguous'])
+
+        single = self.make_transaction('40.00', date(2024, 3, 9))
+        first, _ = self.reconcile('date,amount\n2024-03-09,40\n')
+        second, _ = self.reconcile('date,amount\n2024-03-09,40\n')
+        self.assertEqual(first.lines.get().matched_id, single.id)
+        self.assertEqual(second.lines.get().match_status, 'unmatched')
+
+    def test_chunks_share_claimed_payments(self):
+        self.make_transaction('60.00', date(2024, 3, 1))
+        statement, _ = self.reconcile('date,amount\n2024-03-01,60\n2024-03-01,60\n', chunk_size=1)
+        self.assertEqual(list(statement.lines.values_list('match_status', flat=True)), ['fuzzy', 'unmatched'])
+
+    def test_missing_columns_are_rejected(self):
+        with self.assertRaises(StatementError):
+            self.reconcile('reference,notes\nX,Y\n')
+
+    def test_upload_endpoint_streams_file(self):
+        self.make_transaction('300.00', date(2024, 3, 1), transaction_id='JC-1', payment_method='jazzcash')
+        upload = SimpleUploadedFile('march.csv', b'\xef\xbb\xbfDate,TID,Amount\n2024-03-01,JC-1,300\n', 'text/csv')
+        response = self.client.post(
+            reverse('transactions:statement_reconcile_api'), {'file': upload, 'source': 'jazzcash'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['summary']['exact'], 1)
+        self.assertEqual(StatementImport.objects.get().imported_by, self.user)
 
-# Create your tests here.
+    def test_upload_endpoint_rejects_out_of_range_options(self):
+        url = reverse('transactions:statement_reconcile_api')
+        for options in ({'amount_tolerance': 'NaN'}, {'amount_tolerance': 'Infinity'},
+                        {'amount_tolerance': '-1'}, {'date_window': '99999999999'},
+                        {'date_window': '-1'}, {'date_window': 'soon'}):
+            upload = SimpleUploadedFile('march.csv', b'Date,TID,Amount\n2024-03-01,JC-1,300\n', 'text/csv')
+            response = self.client.post(url, {'file': upload, 'source': 'jazzcash', **options})
+            self.assertEqual(response.status_code, 400, options)
+        self.assertFalse(StatementImport.objects.exists())
@@ -6,6 +6,9 @@ app_name = 'transactions'
 urlpatterns = [
     path('', views.transaction_list, name='transaction_list'),
     path('add/', views.transaction_add, name='transaction_add'),
+    path('batch/', views.transaction_batch_api, name='transaction_batch_api'),
+    path('reconcile/', views.statement_reconcile_api, name='statement_reconcile_api'),
     path('<int:pk>/edit/', views.transaction_edit, name='transaction_edit'),
     path('<int:pk>/delete/', views.transaction_delete, name='transaction_delete'),
+    path('<int:pk>/attachments/', views.transaction_attachment_api, name='transaction_attachment_api'),
 ]
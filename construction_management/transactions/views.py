@@ -1,157 +1,164 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import FinancialTransaction
-from django.utils.crypto import get_random_string
+from django.db import transaction as db_transaction
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+from attachments.views import blob_json, visible_blobs
+from idempotency.keys import idempotent
+from .forms import FinancialTransactionForm
+from sync.events import publish_changes
+from .models import FinancialTransaction, StatementImport, TransactionAttachment
+from .reconciliation import StatementError, match_summary, reconcile_statement
 from decimal import Decimal, InvalidOperation
+import io
+import json
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+TRANSACTION_BATCH_LIMIT = 1000
+MAX_DATE_WINDOW = 31  # days either side of a statement line to look for a payment
+
 @login_required
 def transaction_list(request):
     transactions = FinancialTransaction.objects.all().order_by('-date')
     return render(request, 'transactions/list.html', {'transactions': transactions})
 
 @login_required
+@idempotent('transactions:transaction_add')
 def transaction_add(request):
+    """View to record a new financial transaction"""
     if request.method == 'POST':
-        # Log the POST data for debugging
-        logger.info(f"POST data: {request.POST}")
-        
-        # Generate a unique reference number
-        reference_number = f"TRX-{get_random_string(8).upper()}"
-        
-        try:
-            # Get form data
-            transaction_type = request.POST.get('type')
-            amount_str = request.POST.get('amount')
-            date = request.POST.get('date')
-            description = request.POST.get('description')
-            payment_method = request.POST.get('payment_method')
-            transaction_id = request.POST.get('transaction_id')
-            project_id = request.POST.get('project')
-            
-            # Validate amount
-            try:
-                amount = Decimal(amount_str)
-                if amount <= 0:
-                    raise ValueError("Amount must be greater than 0")
-            except (InvalidOperation, ValueError) as e:
-                raise ValueError(f"Invalid amount: {str(e)}")
-            
-            # Validate transaction type
-            if transaction_type not in dict(FinancialTransaction.TRANSACTION_TYPES):
-                raise ValueError("Invalid transaction type")
-            
-            # Validate payment method
-            if payment_method not in dict(FinancialTransaction.PAYMENT_METHOD_CHOICES):
-                raise ValueError("Invalid payment method")
-            
-            logger.info(f"Creating transaction with: type={transaction_type}, amount={amount}, "
-                       f"date={date}, payment_method={payment_method}, transaction_id={transaction_id}, project_id={project_id}")
-            
-            project = None
-            if project_id:
-                from construction_management.projects.models import Project
-                try:
-                    project = Project.objects.get(pk=project_id)
-                except Project.DoesNotExist:
-                    raise ValueError("Invalid project selected")
-            
-            transaction = FinancialTransaction.objects.create(
-                transaction_type=transaction_type,
-                amount=amount,
-                date=date,
-                description=description,
-                payment_method=payment_method,
-                transaction_id=transaction_id,
-                project=project,
-                reference_number=reference_number
-            )
+        form = FinancialTransactionForm(request.POST)
+        if form.is_valid():
+            transaction = form.save()
+            logger.debug("Created transaction %s", transaction.reference_number)
             messages.success(request, 'Transaction added successfully.')
             return redirect('transactions:transaction_list')
-        except Exception as e:
-            logger.error(f"Error creating transaction: {str(e)}")
-            messages.error(request, f'Error creating transaction: {str(e)}')
-            # Return the form with the submitted data for correction
-            return render(request, 'transactions/form.html', {
-                'action': 'Add',
-                'error': str(e),
-                'transaction': {
-                    'transaction_type': transaction_type,
-                    'amount': amount_str,
-                    'date': date,
-                    'description': description,
-                    'payment_method': payment_method
-                }
-            })
-    
-    return render(request, 'transactions/form.html', {'action': 'Add'})
+        messages.error(request, 'Error creating transaction: please correct the errors below.')
+    else:
+        form = FinancialTransactionForm()
+    return render(request, 'transactions/form.html', {
+        'action': 'Add',
+        'form': form,
+        # Double-submits of this rendering carry the same key and post once
+        'idempotency_key': uuid.uuid4().hex,
+    })
 
 @login_required
 def transaction_edit(request, pk):
+    """View to update an existing financial transaction"""
     transaction = get_object_or_404(FinancialTransaction, pk=pk)
-    
     if request.method == 'POST':
-        try:
-            # Get form data
-            transaction_type = request.POST.get('type')
-            amount_str = request.POST.get('amount')
-            date = request.POST.get('date')
-            description = request.POST.get('description')
-            payment_method = request.POST.get('payment_method')
-            transaction_id = request.POST.get('transaction_id')
-            project_id = request.POST.get('project')
-            
-            # Validate amount
-            try:
-                amount = Decimal(amount_str)
-                if amount <= 0:
-                    raise ValueError("Amount must be greater than 0")
-            except (InvalidOperation, ValueError) as e:
-                raise ValueError(f"Invalid amount: {str(e)}")
-            
-            # Validate transaction type
-            if transaction_type not in dict(FinancialTransaction.TRANSACTION_TYPES):
-                raise ValueError("Invalid transaction type")
-            
-            # Validate payment method
-            if payment_method not in dict(FinancialTransaction.PAYMENT_METHOD_CHOICES):
-                raise ValueError("Invalid payment method")
-            
-            project = None
-            if project_id:
-                from construction_management.projects.models import Project
-                try:
-                    project = Project.objects.get(pk=project_id)
-                except Project.DoesNotExist:
-                    raise ValueError("Invalid project selected")
-            
-            transaction.transaction_type = transaction_type
-            transaction.amount = amount
-            transaction.date = date
-            transaction.description = description
-            transaction.payment_method = payment_method
-            transaction.transaction_id = transaction_id
-            transaction.project = project
-            transaction.save()
-            
+        form = FinancialTransactionForm(request.POST, instance=transaction)
+        if form.is_valid():
+            form.save()
             messages.success(request, 'Transaction updated successfully.')
             return redirect('transactions:transaction_list')
-        except Exception as e:
-            messages.error(request, f'Error updating transaction: {str(e)}')
-            return render(request, 'transactions/form.html', {
-                'action': 'Edit',
-                'transaction': transaction,
-                'error': str(e)
-            })
-    
+        messages.error(request, 'Error updating transaction: please correct the errors below.')
+    else:
+        form = FinancialTransactionForm(instance=transaction)
     return render(request, 'transactions/form.html', {
         'action': 'Edit',
-        'transaction': transaction
+        'form': form,
+        'transaction': transaction,
     })
 
+@login_required
+@require_POST
+@idempotent('transactions:transaction_batch_api')
+def transaction_batch_api(request):
+    """API view to create many transactions in one atomic request.
+
+    Expects ``{"transactions": [{...}, ...]}`` with the same fields as the
+    form. Every entry is validated first; if any fail, nothing is saved and
+    the errors are returned keyed by entry index.
+    """
+    try:
+        entries = json.loads(request.body)['transactions']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'A JSON body with a "transactions" list is required'}, status=400)
+    if not isinstance(entries, list) or not entries:
+        return JsonResponse({'error': '"transactions" must be a non-empty list'}, status=400)
+    if len(entries) > TRANSACTION_BATCH_LIMIT:
+        return JsonResponse({'error': f'At most {TRANSACTION_BATCH_LIMIT} transactions per batch'}, status=400)
+
+    instances = []
+    errors = {}
+    for index, entry in enumerate(entries):
+        form = FinancialTransactionForm(entry if isinstance(entry, dict) else {})
+        if form.is_valid():
+            instances.append(form.instance)
+        else:
+            errors[str(index)] = form.errors.get_json_data()
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+
+    with db_transaction.atomic():
+        FinancialTransaction.objects.bulk_create(instances)
+        publish_changes('created', instances)
+    return JsonResponse({
+        'created': len(instances),
+        'transactions': [
+            {'id': instance.id, 'reference_number': instance.reference_number}
+            for instance in instances
+        ],
+    }, status=201)
+
+@login_required
+@require_POST
+def transaction_attachment_api(request, pk):
+    """API view to attach an uploaded file to a transaction by its content hash"""
+    transaction = get_object_or_404(FinancialTransaction, pk=pk)
+    try:
+        data = json.loads(request.body)
+        sha256 = data['blob']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'A JSON body with a "blob" hash is required'}, status=400)
+    blob = get_object_or_404(visible_blobs(request.user), sha256=sha256)
+    attachment = TransactionAttachment.objects.create(
+        transaction=transaction, blob=blob, file=blob.file.name,
+        description=str(data.get('description', ''))[:200],
+    )
+    return JsonResponse({'id': attachment.id, 'blob': blob_json(blob)}, status=201)
+
+@login_required
+@require_POST
+def statement_reconcile_api(request):
+    """API view to upload a statement CSV and match it against recorded payments"""
+    upload = request.FILES.get('file')
+    source = request.POST.get('source')
+    if upload is None or source not in dict(StatementImport.SOURCE_CHOICES):
+        return JsonResponse({'error': 'A statement "file" and a valid "source" are required'}, status=400)
+    try:
+        date_window = int(request.POST.get('date_window', 3))
+        amount_tolerance = Decimal(request.POST.get('amount_tolerance', '0'))
+    except (ValueError, InvalidOperation):
+        return JsonResponse({'error': 'date_window and amount_tolerance must be numbers'}, status=400)
+    if not 0 <= date_window <= MAX_DATE_WINDOW:
+        return JsonResponse({'error': f'date_window must be between 0 and {MAX_DATE_WINDOW} days'}, status=400)
+    if not amount_tolerance.is_finite() or amount_tolerance < 0:
+        return JsonResponse({'error': 'amount_tolerance must be a non-negative number'}, status=400)
+
+    # Wrap the upload rather than reading it so large statements stream
+    lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        statement, errors = reconcile_statement(
+            lines, source, file_name=upload.name, date_window=date_window,
+            amount_tolerance=amount_tolerance, user=request.user,
+        )
+    except (StatementError, UnicodeDecodeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'id': statement.id,
+        'lines': statement.line_count,
+        'matched': statement.matched_count,
+        'summary': match_summary(statement),
+        'errors': errors[:100],
+    }, status=201)
+
 @login_required
 def transaction_delete(request, pk):
     transaction = get_object_or_404(FinancialTransaction, pk=pk)
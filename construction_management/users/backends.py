@@ -11,37 +11,36 @@ class EmailBackend(ModelBackend):
         try:
             # Handle both username and email parameters
             email = kwargs.get('email') or username
-            logger.info(f"Attempting authentication with email: {email}")
+            logger.debug("Attempting authentication with email: %s", email)
             
             if not email or not password:
-                logger.warning("Email or password is missing")
+                logger.debug("Email or password is missing")
                 return None
 
             try:
                 user = UserModel.objects.get(email=email)
-                logger.info(f"Found user with email: {email}")
+                logger.debug("Found user with email: %s", email)
                 
                 if user.check_password(password):
-                    logger.info(f"Password check successful for user: {email}")
+                    logger.debug("Password check successful for user: %s", email)
                     return user
                 else:
-                    logger.warning(f"Invalid password for user: {email}")
+                    logger.debug("Invalid password for user: %s", email)
                     return None
                     
             except UserModel.DoesNotExist:
-                logger.warning(f"No user found with email: {email}")
+                logger.debug("No user found with email: %s", email)
                 return None
                 
         except Exception as e:
-            logger.error(f"Authentication error: {str(e)}")
+            logger.exception("Authentication error")
             return None
 
     def get_user(self, user_id):
         UserModel = get_user_model()
         try:
             user = UserModel.objects.get(pk=user_id)
-            logger.info(f"Retrieved user with id: {user_id}")
             return user if self.user_can_authenticate(user) else None
         except UserModel.DoesNotExist:
-            logger.warning(f"No user found with id: {user_id}")
+            logger.debug("No user found with id: %s", user_id)
             return None
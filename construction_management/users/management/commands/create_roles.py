@@ -1,31 +1,10 @@
 from django.core.management.base import BaseCommand
-from users.models import Role, Permission
+from users.provisioning import DEFAULT_ROLE_SPEC, provision_roles
 
 class Command(BaseCommand):
     help = 'Create initial roles and permissions'
 
     def handle(self, *args, **kwargs):
-        # Create permissions for each module
-        modules = ['vendors', 'labour', 'transactions', 'reporting', 'users']
-        actions = ['view', 'add', 'edit', 'delete', 'approve']
-        
-        permissions = []
-        for module in modules:
-            for action in actions:
-                permission, created = Permission.objects.get_or_create(
-                    module=module,
-                    action=action,
-                    description=f'{action.capitalize()} {module}'
-                )
-                permissions.append(permission)
-
-        # Create admin role with all permissions
-        admin_role, created = Role.objects.get_or_create(
-            name='admin',
-            defaults={
-                'description': 'Administrator with full access'
-            }
-        )
-        admin_role.permissions.add(*permissions)
-
+        # Admin with every permission; use provision_roles for the full role matrix
+        provision_roles({'roles': {'admin': DEFAULT_ROLE_SPEC['roles']['admin']}})
         self.stdout.write(self.style.SUCCESS('Successfully created roles and permissions'))
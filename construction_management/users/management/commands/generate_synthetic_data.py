@@ -0,0 +1,79 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from construction_management import factories
+from labour.models import Labourer
+
+# Row counts at --scale 1, roughly one mid-sized company
+BASE_VOLUMES = {
+    'projects': 25,
+    'labourers': 500,
+    'vendors': 150,
+    'purchases': 10000,
+    'transactions': 20000,
+    'contractors': 200,
+}
+# Work logs are generated a month at a time to bound memory use
+WORK_LOG_CHUNK_DAYS = 30
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset at production-like volume for local benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiplier applied to every base volume')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Days of work logs, purchases and transactions to generate')
+        parser.add_argument('--start', type=date.fromisoformat, default=date(2024, 1, 1),
+                            help='First day of the generated period (YYYY-MM-DD)')
+        parser.add_argument('--seed', type=int, default=1)
+        for name, count in BASE_VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, help=f'Override the number of {name} ({count} at scale 1)')
+
+    def handle(self, *args, **options):
+        if options['scale'] <= 0 or options['days'] <= 0:
+            raise CommandError('--scale and --days must be positive')
+        volumes = {
+            name: options[name] if options[name] is not None else max(1, round(count * options['scale']))
+            for name, count in BASE_VOLUMES.items()
+        }
+        rng = random.Random(options['seed'])
+        start, days = options['start'], options['days']
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            projects = self.step('projects', lambda: factories.make_projects(volumes['projects'], rng=rng, start=start))
+            labour_types, skills = factories.make_labour_types()
+            labourers = self.step('labourers', lambda: factories.make_labourers(
+                volumes['labourers'], labour_types, skills, rng=rng, start=Labourer.objects.count()
+            ))
+            logs = 0
+            for offset in range(0, days, WORK_LOG_CHUNK_DAYS):
+                logs += len(factories.make_work_logs(
+                    labourers, skills, start + timedelta(days=offset),
+                    min(WORK_LOG_CHUNK_DAYS, days - offset), rng=rng,
+                ))
+            self.stdout.write(f'  work logs: {logs}')
+            _, products = self.step('vendors', lambda: factories.make_vendors(volumes['vendors'], rng=rng))
+            self.step('purchases', lambda: factories.make_purchases(volumes['purchases'], products, start, days, rng=rng))
+            self.step('transactions', lambda: factories.make_transactions(
+                volumes['transactions'], projects, start, days, rng=rng
+            ))
+            self.step('contractors', lambda: factories.make_contractors(
+                volumes['contractors'], projects, start=start, rng=rng
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated synthetic dataset in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def step(self, name, create):
+        result = create()
+        rows = result[0] if isinstance(result, tuple) else result
+        self.stdout.write(f'  {name}: {len(rows)}')
+        return result
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from contractors.models import Contractor
+from labour.models import Labourer
+from vendors.models import VendorProduct
+
+PERCENTILES = (50, 95, 99)
+
+
+def _get(name, params=None, args=None):
+    def request(client, rng, ctx, headers=None):
+        return client.get(
+            reverse(name, args=args(rng, ctx) if args else None), params(rng, ctx) if params else None,
+            headers=headers,
+        )
+    return request
+
+
+def _post_json(name, body):
+    def request(client, rng, ctx):
+        return client.post(reverse(name), json.dumps(body(rng, ctx)), content_type='application/json')
+    return request
+
+
+def _post_form(name, body=None):
+    def request(client, rng, ctx):
+        return client.post(reverse(name), body(rng, ctx) if body else {})
+    return request
+
+
+def _random_day(rng, ctx):
+    return (ctx['start'] + timedelta(days=rng.randrange(ctx['days']))).isoformat()
+
+
+def _purchase_body(rng, ctx):
+    product_id, vendor_id, price = rng.choice(ctx['products'])
+    return {
+        'vendor': vendor_id,
+        'product': product_id,
+        'quantity': str(rng.randint(1, 200)),
+        'price_per_unit': str(price),
+        'purchase_date': _random_day(rng, ctx),
+    }
+
+
+# name -> (weight, kind, request); weights approximate a day of office and site traffic
+SCENARIOS = {
+    'labour_list': (10, 'list', _get('labour:labour_list', params=lambda rng, ctx: {'page': rng.randint(1, 5)})),
+    'labour_types_api': (8, 'list', _get('labour:labour_types_api')),
+    'worklog_list': (10, 'list', _get(
+        'labour:worklog_list', params=lambda rng, ctx: {'start': _random_day(rng, ctx), 'format': 'json'}
+    )),
+    'contractor_list': (6, 'list', _get('contractors:contractor_list_create')),
+    'contractor_payments': (4, 'list', _get(
+        'contractors:contractor_payments', args=lambda rng, ctx: [rng.choice(ctx['contractor_ids'])]
+    )),
+    'vendor_list': (8, 'list', _get('vendor-list', params=lambda rng, ctx: {'expand': 'products'})),
+    'purchase_list': (6, 'list', _get('purchase-list')),
+    'best_prices': (4, 'list', _get('best_price_list')),
+    'transaction_list': (4, 'list', _get('transactions:transaction_list')),
+    'sync_changes': (4, 'list', _get('sync:sync_changes', params=lambda rng, ctx: {'limit': 200})),
+    'crew_attendance': (5, 'create', _post_json('labour:crew_attendance_api', lambda rng, ctx: {
+        'work_date': _random_day(rng, ctx),
+        'entries': [{'labourer': labourer_id} for labourer_id in rng.sample(ctx['labourer_ids'], min(30, len(ctx['labourer_ids'])))],
+    })),
+    'purchase_create': (4, 'create', _post_json('purchase-list', _purchase_body)),
+    'contractor_create': (2, 'create', _post_json('contractors:contractor_list_create', lambda rng, ctx: {
+        'name': f'Load test contractor {rng.randrange(10 ** 6)}',
+        'contact_person': 'Load test',
+        'phone': '0300-0000000',
+        'address': 'Lahore',
+        'specialization': 'Finishing',
+        'rate_per_day': '3000.00',
+    })),
+    'transaction_add': (3, 'create', _post_form('transactions:transaction_add', lambda rng, ctx: {
+        'transaction_type': 'expense',
+        'amount': str(rng.randint(100, 100000)),
+        'date': _random_day(rng, ctx),
+        'description': 'Load test',
+        'payment_method': 'cash',
+    })),
+    'report_generate': (1, 'report', _post_form('reports:report_generate')),
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Command(BaseCommand):
+    help = ('Replay a weighted mix of list, create and report requests against the '
+            'current database and report latency percentiles per endpoint. '
+            'Create and report requests write data; run it against a disposable database. '
+            'With --interface both, the same plan is replayed through the WSGI and ASGI '
+            'handlers and their throughput and tail latency are compared.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Total requests to send')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent client threads')
+        parser.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), help='Limit the mix to these scenarios')
+        parser.add_argument('--kinds', nargs='+', choices=['list', 'create', 'report'],
+                            default=['list', 'create', 'report'], help='Limit the mix to these request kinds')
+        parser.add_argument('--email', help='User to run as (defaults to the first superuser)')
+        parser.add_argument('--start', type=date.fromisoformat, default=date(2024, 1, 1),
+                            help='Start of the period dated requests draw from')
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+        parser.add_argument('--interface', choices=['wsgi', 'asgi', 'both'], default='wsgi',
+                            help='Handler to drive: threads through WSGI, or concurrent tasks through ASGI')
+        parser.add_argument('--poll', action='store_true',
+                            help='Resend each list ETag as If-None-Match, like mobile clients polling')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(email=options['email']) if options['email'] else User.objects.filter(is_superuser=True)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to run as; pass --email or create a superuser')
+
+        mix = {
+            name: scenario for name, scenario in SCENARIOS.items()
+            if scenario[1] in options['kinds'] and (not options['only'] or name in options['only'])
+        }
+        ctx = {
+            'start': options['start'],
+            'days': options['days'],
+            'labourer_ids': list(Labourer.objects.filter(is_active=True).values_list('id', flat=True)[:2000]),
+            'contractor_ids': list(Contractor.objects.values_list('id', flat=True)[:2000]),
+            'products': list(VendorProduct.objects.values_list('id', 'vendor_id', 'price_per_unit')[:2000]),
+        }
+        needs = {'crew_attendance': 'labourer_ids', 'contractor_payments': 'contractor_ids', 'purchase_create': 'products'}
+        mix = {name: scenario for name, scenario in mix.items() if name not in needs or ctx[needs[name]]}
+        if not mix:
+            raise CommandError('No scenarios left to replay; run generate_synthetic_data first')
+
+        rng = random.Random(options['seed'])
+        names = list(mix)
+        plan = rng.choices(names, weights=[mix[name][0] for name in names], k=options['requests'])
+        concurrency = max(1, options['concurrency'])
+        chunks = [plan[i::concurrency] for i in range(concurrency)]
+
+        reports = {}
+        interfaces = ['wsgi', 'asgi'] if options['interface'] == 'both' else [options['interface']]
+        for interface in interfaces:
+            started = time.perf_counter()
+            if interface == 'asgi':
+                results = asyncio.run(self.run_async_workers(user, chunks, mix, ctx, options))
+            elif concurrency == 1:
+                results = [self.run_worker(user, chunks[0], mix, ctx, options['seed'], options['poll'])]
+            else:
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    results = list(pool.map(
+                        lambda args: self.run_worker(user, *args, threaded=True),
+                        [(chunk, mix, ctx, options['seed'] + i, options['poll']) for i, chunk in enumerate(chunks)],
+                    ))
+            reports[interface] = self.summarise(results, time.perf_counter() - started)
+
+        if options['json']:
+            report = reports[interfaces[0]] if len(interfaces) == 1 else reports
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for interface, report in reports.items():
+            if len(reports) > 1:
+                self.stdout.write(self.style.MIGRATE_HEADING(interface.upper()))
+            self.print_report(report)
+        if len(reports) > 1:
+            self.print_comparison(reports['wsgi'], reports['asgi'])
+
+    def run_worker(self, user, plan, mix, ctx, seed, poll=False, threaded=False):
+        """Send one thread's share of the plan, returning {name: ([latencies], errors, not_modified)}"""
+        client = Client()
+        client.force_login(user)
+        rng = random.Random(seed)
+        timings = {}
+        etags = {}
+        try:
+            for name in plan:
+                extra = self._poll_headers(name, mix, etags) if poll else {}
+                start = time.perf_counter()
+                response = mix[name][2](client, rng, ctx, **extra)
+                self._record(timings, etags, name, response, time.perf_counter() - start)
+        finally:
+            if threaded:
+                connections.close_all()
+        return timings
+
+    async def run_async_workers(self, user, chunks, mix, ctx, options):
+        return await asyncio.gather(*(
+            self.run_async_worker(user, chunk, mix, ctx, options['seed'] + i, options['poll'])
+            for i, chunk in enumerate(chunks)
+        ))
+
+    async def run_async_worker(self, user, plan, mix, ctx, seed, poll=False):
+        """Send one task's share of the plan through the ASGI handler.
+
+        Each task gets its own sync thread for database work, as a server
+        gives each request one, so the two interfaces share connection setup.
+        """
+        async with ThreadSensitiveContext():
+            client = AsyncClient()
+            await client.aforce_login(user)
+            rng = random.Random(seed)
+            timings = {}
+            etags = {}
+            try:
+                for name in plan:
+                    extra = self._poll_headers(name, mix, etags) if poll else {}
+                    start = time.perf_counter()
+                    response = await mix[name][2](client, rng, ctx, **extra)
+                    self._record(timings, etags, name, response, time.perf_counter() - start)
+            finally:
+                await sync_to_async(connections.close_all)()
+        return timings
+
+    @staticmethod
+    def _poll_headers(name, mix, etags):
+        """Request kwargs replaying the last ETag seen for a list scenario"""
+        if mix[name][1] != 'list' or name not in etags:
+            return {}
+        return {'headers': {'If-None-Match': etags[name]}}
+
+    @staticmethod
+    def _record(timings, etags, name, response, latency):
+        latencies, errors, not_modified = timings.get(name, ([], 0, 0))
+        latencies.append(latency)
+        timings[name] = (latencies, errors + (response.status_code >= 400), not_modified + (response.status_code == 304))
+        if response.has_header('ETag'):
+            etags[name] = response['ETag']
+
+    def summarise(self, results, elapsed):
+        merged = {}
+        for timings in results:
+            for name, (latencies, errors, not_modified) in timings.items():
+                all_latencies, all_errors, all_not_modified = merged.get(name, ([], 0, 0))
+                merged[name] = (all_latencies + latencies, all_errors + errors, all_not_modified + not_modified)
+
+        endpoints = {}
+        for name, (latencies, errors, not_modified) in sorted(merged.items()):
+            latencies.sort()
+            endpoints[name] = {
+                'requests': len(latencies),
+                'errors': errors,
+                'not_modified': not_modified,
+                **{f'p{pct}_ms': round(percentile(latencies, pct) * 1000, 1) for pct in PERCENTILES},
+                'max_ms': round(latencies[-1] * 1000, 1),
+            }
+        overall = sorted(latency for latencies, _, _ in merged.values() for latency in latencies)
+        total = len(overall)
+        return {
+            'requests': total,
+            'elapsed_s': round(elapsed, 2),
+            'throughput_rps': round(total / elapsed, 1) if elapsed else 0.0,
+            **{f'p{pct}_ms': round(percentile(overall, pct) * 1000, 1) for pct in PERCENTILES},
+            'endpoints': endpoints,
+        }
+
+    def print_report(self, report):
+        header = f"{'endpoint':<22}{'reqs':>6}{'errs':>6}{'304s':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, row in report['endpoints'].items():
+            self.stdout.write(
+                f"{name:<22}{row['requests']:>6}{row['errors']:>6}{row['not_modified']:>6}{row['p50_ms']:>10}"
+                f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['requests']} requests in {report['elapsed_s']}s ({report['throughput_rps']} req/s), "
+            f"p95 {report['p95_ms']}ms, p99 {report['p99_ms']}ms"
+        ))
+
+    def print_comparison(self, wsgi, asgi):
+        header = f"{'':<22}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        self.stdout.write('')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for label, report in (('wsgi', wsgi), ('asgi', asgi)):
+            self.stdout.write(
+                f"{label:<22}{report['throughput_rps']:>10}{report['p50_ms']:>10}"
+                f"{report['p95_ms']:>10}{report['p99_ms']:>10}"
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from users.provisioning import DEFAULT_ROLE_SPEC, load_role_spec, provision_roles
+
+
+class Command(BaseCommand):
+    help = 'Create or update roles and permissions from a declarative JSON spec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spec', help='Path to a JSON role spec (defaults to the built-in roles)')
+        parser.add_argument('--prune', action='store_true',
+                            help='Remove permissions from listed roles when the spec no longer grants them')
+
+    def handle(self, *args, **options):
+        try:
+            spec = load_role_spec(options['spec']) if options['spec'] else DEFAULT_ROLE_SPEC
+            summary = provision_roles(spec, prune=options['prune'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            'Roles provisioned: ' + ', '.join(f"{key.replace('_', ' ')} {value}" for key, value in summary.items())
+        ))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachments', '0001_initial'),
+        ('users', '0002_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='profiles', to='attachments.blob'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, max_length=200, null=True, upload_to='profile_pictures/'),
+        ),
+    ]
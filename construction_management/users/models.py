@@ -149,6 +149,14 @@ class UserProfile(models.Model):
     )
     profile_picture = models.ImageField(
         upload_to='profile_pictures/',
+        max_length=200,
+        null=True,
+        blank=True
+    )
+    blob = models.ForeignKey(
+        'attachments.Blob',
+        on_delete=models.PROTECT,
+        related_name='profiles',
         null=True,
         blank=True
     )
@@ -0,0 +1,166 @@
+import json
+from django.db import transaction
+from construction_management.fragments import NAV_NAMESPACE, invalidate_fragments
+from .models import Role, Permission
+
+MODULES = [module for module, _ in Permission.MODULE_CHOICES]
+ACTIONS = [action for action, _ in Permission.ACTION_CHOICES]
+
+# Built-in role matrix; a spec file in the same shape can replace it
+DEFAULT_ROLE_SPEC = {
+    'roles': {
+        'admin': {
+            'description': 'Administrator with full system access',
+            'permissions': '*',
+        },
+        'manager': {
+            'description': 'Project manager overseeing vendors, labour and approvals',
+            'permissions': {
+                'vendors': '*',
+                'labour': '*',
+                'transactions': ['view', 'add', 'edit', 'approve'],
+                'reporting': ['view', 'add'],
+                'users': ['view'],
+            },
+        },
+        'accountant': {
+            'description': 'Accounts staff handling transactions and payments',
+            'permissions': {
+                'vendors': ['view'],
+                'labour': ['view'],
+                'transactions': ['view', 'add', 'edit', 'delete'],
+                'reporting': ['view', 'add'],
+            },
+        },
+        'supervisor': {
+            'description': 'Site supervisor recording labour and deliveries',
+            'permissions': {
+                'vendors': ['view', 'add'],
+                'labour': ['view', 'add', 'edit'],
+                'reporting': ['view'],
+            },
+        },
+        'staff': {
+            'description': 'Read-only access for office staff',
+            'permissions': {module: ['view'] for module in ('vendors', 'labour', 'transactions', 'reporting')},
+        },
+    },
+}
+
+
+def permission_description(module, action):
+    return f'{action.title()} {module}'
+
+
+def load_role_spec(path):
+    """Read a JSON role spec from disk"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def _expand_permissions(role, grants):
+    """Turn '*' or {module: '*' | [actions]} into a set of (module, action) pairs"""
+    if grants == '*':
+        grants = {module: '*' for module in MODULES}
+    if not isinstance(grants, dict):
+        raise ValueError(f"Role {role!r}: permissions must be '*' or a mapping of module to actions")
+    pairs = set()
+    for module, actions in grants.items():
+        if module not in MODULES:
+            raise ValueError(f'Role {role!r}: unknown module {module!r}')
+        actions = ACTIONS if actions == '*' else actions
+        unknown = set(actions) - set(ACTIONS)
+        if unknown:
+            raise ValueError(f'Role {role!r}: unknown actions {sorted(unknown)} for {module}')
+        pairs.update((module, action) for action in actions)
+    return pairs
+
+
+def provision_roles(spec=None, prune=False):
+    """Bring roles, permissions and their links in line with a spec.
+
+    The desired matrix is diffed against the database with one query per
+    table, and only missing rows are written, in bulk. Running it again
+    with the same spec reads three tables and writes nothing. With prune,
+    permission links not in the spec are removed from the roles it names;
+    roles and permissions themselves are never deleted.
+    """
+    spec = spec or DEFAULT_ROLE_SPEC
+    valid_roles = {name for name, _ in Role.ROLE_CHOICES}
+    roles_spec = spec.get('roles') or {}
+    unknown = set(roles_spec) - valid_roles
+    if unknown:
+        raise ValueError(f'Unknown roles {sorted(unknown)}; expected some of {sorted(valid_roles)}')
+    desired = {name: _expand_permissions(name, role.get('permissions', {})) for name, role in roles_spec.items()}
+    needed_permissions = set().union(*desired.values())
+
+    summary = {'permissions_created': 0, 'roles_created': 0, 'roles_updated': 0,
+               'links_added': 0, 'links_removed': 0}
+    with transaction.atomic():
+        # Permissions: one read, one bulk insert for whatever is missing
+        permission_ids = {
+            (module, action): pk
+            for pk, module, action in Permission.objects.values_list('id', 'module', 'action')
+        }
+        missing = sorted(needed_permissions - permission_ids.keys())
+        if missing:
+            Permission.objects.bulk_create([
+                Permission(module=module, action=action, description=permission_description(module, action))
+                for module, action in missing
+            ], ignore_conflicts=True)
+            permission_ids.update({
+                (module, action): pk
+                for pk, module, action in Permission.objects.filter(
+                    module__in={m for m, _ in missing}, action__in={a for _, a in missing}
+                ).values_list('id', 'module', 'action')
+            })
+            summary['permissions_created'] = len(missing)
+
+        # Roles: create missing ones, refresh changed descriptions
+        roles = {role.name: role for role in Role.objects.filter(name__in=roles_spec)}
+        new_roles = [
+            Role(name=name, description=roles_spec[name].get('description', ''))
+            for name in roles_spec if name not in roles
+        ]
+        if new_roles:
+            Role.objects.bulk_create(new_roles, ignore_conflicts=True)
+            roles = {role.name: role for role in Role.objects.filter(name__in=roles_spec)}
+            summary['roles_created'] = len(new_roles)
+        changed = []
+        for name, role in roles.items():
+            description = roles_spec[name].get('description')
+            if description is not None and role.description != description:
+                role.description = description
+                changed.append(role)
+        if changed:
+            Role.objects.bulk_update(changed, ['description', 'updated_at'])
+            summary['roles_updated'] = len(changed)
+
+        # Role-permission links: diff the through table in one query
+        Through = Role.permissions.through
+        role_ids = {name: role.id for name, role in roles.items()}
+        wanted = {
+            (role_ids[name], permission_ids[pair])
+            for name, pairs in desired.items()
+            for pair in pairs
+        }
+        existing = set(Through.objects.filter(role_id__in=role_ids.values()).values_list('role_id', 'permission_id'))
+        to_add = wanted - existing
+        if to_add:
+            Through.objects.bulk_create([
+                Through(role_id=role_id, permission_id=permission_id) for role_id, permission_id in to_add
+            ], ignore_conflicts=True)
+            summary['links_added'] = len(to_add)
+        to_remove = existing - wanted if prune else set()
+        if to_remove:
+            for role_id in {role_id for role_id, _ in to_remove}:
+                Through.objects.filter(
+                    role_id=role_id,
+                    permission_id__in=[p for r, p in to_remove if r == role_id],
+                ).delete()
+            summary['links_removed'] = len(to_remove)
+        if to_add or to_remove:
+            # Bulk writes skip the signals that drop cached navigation
+            transaction.on_commit(lambda: invalidate_fragments(NAV_NAMESPACE))
+
+    return summary
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from construction_management.fragments import NAV_NAMESPACE, invalidate_fragments
+from .models import Role, Permission
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def role_changed(sender, **kwargs):
+    """Drop cached navigation whenever roles or permissions change"""
+    invalidate_fragments(NAV_NAMESPACE)
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def role_permissions_changed(sender, action, **kwargs):
+    """Drop cached navigation when a role's permissions change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_fragments(NAV_NAMESPACE)
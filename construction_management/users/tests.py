@@ -1,3 +1,155 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import date
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from contractors.models import Contractor, ContractorBalance, ContractorPayment
+from labour.models import Labourer, WorkLog
+from transactions.models import FinancialTransaction
+from vendors.models import Purchase, Vendor
+from .models import Role, Permission
+from .provisioning import provision_roles
+
+
+class SyntheticDataTests(TestCase):
+    """Tests for the synthetic data generator and load benchmark commands"""
+
+    def generate(self, **options):
+        call_command('generate_synthetic_data', stdout=StringIO(), **options)
+
+    def test_generates_requested_volumes(self):
+        self.generate(scale=0.02, days=14)
+        self.assertEqual(Labourer.objects.count(), 10)
+        self.assertEqual(Vendor.objects.count(), 3)
+        self.assertEqual(Purchase.objects.count(), 200)
+        self.assertEqual(FinancialTransaction.objects.count(), 400)
+        self.assertEqual(Contractor.objects.count(), 4)
+        self.assertGreater(WorkLog.objects.count(), 50)
+        self.assertEqual(
+            sum(balance.paid for balance in ContractorBalance.objects.all()),
+            sum(payment.amount for payment in ContractorPayment.objects.all()),
+        )
+
+    def test_can_run_twice(self):
+        self.generate(labourers=5, transactions=5, days=3)
+        self.generate(labourers=5, transactions=5, days=3, seed=2)
+        self.assertEqual(Labourer.objects.count(), 10)
+        self.assertEqual(FinancialTransaction.objects.count(), 10)
+
+    @override_settings(MEDIA_ROOT='/tmp/construction-management-test-media')
+    def test_load_benchmark_reports_percentiles(self):
+        self.generate(scale=0.02, days=14)
+        get_user_model().objects.create_superuser(email='admin@example.com', password='test-pass-123')
+        out = StringIO()
+        call_command(
+            'load_benchmark', requests=60, concurrency=1, start=date(2024, 1, 1), days=14,
+            kinds=['list', 'create'], json=True, stdout=out,
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['requests'], 60)
+        for name, row in report['endpoints'].items():
+            self.assertEqual(row['errors'], 0, name)
+            self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+            self.assertLessEqual(row['p95_ms'], row['p99_ms'])
+
+
+class BenchmarkInterfaceTests(TransactionTestCase):
+    """Tests for replaying the benchmark through both request handlers.
+
+    The ASGI run queries from its own thread, which only sees committed data.
+    """
+
+    @override_settings(MEDIA_ROOT='/tmp/construction-management-test-media')
+    def test_load_benchmark_compares_wsgi_and_asgi_polling(self):
+        call_command('generate_synthetic_data', scale=0.02, days=14, stdout=StringIO())
+        get_user_model().objects.create_superuser(email='admin@example.com', password='test-pass-123')
+        out = StringIO()
+        call_command(
+            'load_benchmark', requests=40, concurrency=1, start=date(2024, 1, 1), days=14,
+            only=['labour_types_api', 'contractor_list', 'contractor_payments'],
+            interface='both', poll=True, json=True, stdout=out,
+        )
+        reports = json.loads(out.getvalue())
+        self.assertEqual(set(reports), {'wsgi', 'asgi'})
+        for interface, report in reports.items():
+            self.assertEqual(report['requests'], 40, interface)
+            self.assertLessEqual(report['p95_ms'], report['p99_ms'])
+            endpoints = report['endpoints']
+            self.assertFalse(any(row['errors'] for row in endpoints.values()), interface)
+            # Repeat polls of an unchanged list are answered with 304
+            self.assertGreater(endpoints['labour_types_api']['not_modified'], 0, interface)
+
+
+class RoleProvisioningTests(TestCase):
+    """Tests for declarative role and permission provisioning"""
+
+    def test_default_spec_creates_all_roles_in_bulk(self):
+        # savepoint, then read/insert/re-read for permissions and roles,
+        # read/insert for role links, release
+        with self.assertNumQueries(10):
+            summary = provision_roles()
+        self.assertEqual(summary['permissions_created'], 25)
+        self.assertEqual(summary['roles_created'], 5)
+        self.assertEqual(Role.objects.get(name='admin').permissions.count(), 25)
+        self.assertEqual(
+            set(Role.objects.get(name='staff').permissions.values_list('action', flat=True)), {'view'}
+        )
+
+    def test_second_run_reads_and_writes_nothing(self):
+        provision_roles()
+        # savepoint, permissions, roles, role links, release
+        with self.assertNumQueries(5):
+            summary = provision_roles()
+        self.assertEqual(set(summary.values()), {0})
+
+    def test_existing_permissions_with_other_descriptions_are_reused(self):
+        Permission.objects.create(module='vendors', action='view', description='Legacy wording')
+        call_command('create_roles', stdout=StringIO())
+        call_command('create_roles', stdout=StringIO())
+        self.assertEqual(Permission.objects.filter(module='vendors', action='view').count(), 1)
+        self.assertEqual(Permission.objects.count(), 25)
+
+    def test_spec_file_and_prune(self):
+        provision_roles()
+        spec = {'roles': {'supervisor': {'permissions': {'labour': ['view']}}}}
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as f:
+            json.dump(spec, f)
+            f.flush()
+            call_command('provision_roles', spec=f.name, prune=True, stdout=StringIO())
+        supervisor = Role.objects.get(name='supervisor')
+        self.assertEqual(list(supervisor.permissions.values_list('module', 'action')), [('labour', 'view')])
+        self.assertEqual(Role.objects.get(name='manager').permissions.count(), 17)
+
+    def test_invalid_spec_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, "unknown module 'payroll'"):
+            provision_roles({'roles': {'staff': {'permissions': {'payroll': ['view']}}}})
+        with self.assertRaisesMessage(ValueError, 'Unknown roles'):
+            provision_roles({'roles': {'owner': {'permissions': '*'}}})
+
+
+@override_settings(AUTHENTICATION_BACKENDS=['users.backends.EmailBackend'])
+class EmailBackendTests(TestCase):
+    """Tests for logging in through the email backend alone"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='site@example.com', password='secret-pass')
+
+    def test_login_view_authenticates_by_email(self):
+        response = self.client.post(reverse('users:login'), {'email': 'site@example.com', 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
+        self.assertEqual(self.client.session['_auth_user_backend'], 'users.backends.EmailBackend')
+        # The next request loads the user back through EmailBackend.get_user
+        self.assertEqual(self.client.get('/').wsgi_request.user, self.user)
+
+    def test_wrong_password_and_inactive_users_are_refused(self):
+        self.client.post(reverse('users:login'), {'email': 'site@example.com', 'password': 'wrong'})
+        self.assertNotIn('_auth_user_id', self.client.session)
+        self.client.force_login(self.user, backend='users.backends.EmailBackend')
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertFalse(self.client.get('/').wsgi_request.user.is_authenticated)
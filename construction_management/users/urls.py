@@ -6,4 +6,5 @@ app_name = 'users'
 urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('profile/picture/', views.profile_picture_api, name='profile_picture_api'),
 ]
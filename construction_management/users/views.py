@@ -1,10 +1,16 @@
+import json
+import logging
+
 from django.contrib.auth import authenticate, login, logout
-from django.shortcuts import render, redirect
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib import messages
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_exempt
 from django.views.decorators.http import require_POST
-import logging
-import json
+
+from attachments.views import blob_json, visible_blobs
+from .models import UserProfile
 
 logger = logging.getLogger(__name__)
 
@@ -14,37 +20,23 @@ def login_view(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
         
-        # Debug logging
-        logger.info("=== Login Attempt Debug Info ===")
-        logger.info(f"Email: {email}")
-        logger.info(f"Password length: {len(password) if password else 0}")
-        logger.info(f"POST data: {json.dumps(dict(request.POST))}")
-        logger.info(f"CSRF Cookie: {request.COOKIES.get('csrftoken')}")
-        logger.info(f"CSRF Header: {request.META.get('HTTP_X_CSRFTOKEN')}")
-        
         # Try both username and email fields for authentication
         user = authenticate(request, username=email, password=password)
         if user is None:
             user = authenticate(request, email=email, password=password)
-            
-        logger.info(f"Authentication result: {user}")
-        if user:
-            logger.info(f"User details - Active: {user.is_active}, Staff: {user.is_staff}, Superuser: {user.is_superuser}")
         
         if user is not None:
             if user.is_active:
                 login(request, user)
-                logger.info(f"Successful login for user: {user.email}")
+                logger.info("Successful login for user: %s", user.email)
                 
                 next_url = request.GET.get('next', '/')
-                logger.info(f"Redirecting to: {next_url}")
-                
                 return redirect(next_url)
             else:
-                logger.warning(f"Inactive user attempted login: {email}")
+                logger.warning("Inactive user attempted login: %s", email)
                 messages.error(request, 'Your account is inactive.')
         else:
-            logger.warning(f"Failed login attempt for email: {email}")
+            logger.warning("Failed login attempt for email: %s", email)
             messages.error(request, 'Invalid email or password')
     
     return render(request, 'registration/login.html')
@@ -66,3 +58,20 @@ def logout_view(request):
         return redirect('/login/?message=Please use the logout button to log out properly.')
     else:
         return HttpResponseNotAllowed(['POST', 'GET'])
+
+@login_required
+@require_POST
+def profile_picture_api(request):
+    """API view to set the current user's profile picture from an uploaded image"""
+    try:
+        sha256 = json.loads(request.body)['blob']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'A JSON body with a "blob" hash is required'}, status=400)
+    blob = get_object_or_404(visible_blobs(request.user), sha256=sha256)
+    if not blob.content_type.startswith('image/'):
+        return JsonResponse({'error': 'Profile pictures must be images'}, status=415)
+    profile, _ = UserProfile.objects.get_or_create(user=request.user)
+    profile.profile_picture.name = blob.file.name
+    profile.blob = blob
+    profile.save(update_fields=['profile_picture', 'blob', 'updated_at'])
+    return JsonResponse(blob_json(blob))
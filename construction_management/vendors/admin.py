@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MaterialType, Vendor, VendorProduct, Purchase, Payment
+from .models import MaterialType, Vendor, VendorProduct, Purchase, Payment, VendorPriceHistory, BestPrice
 
 @admin.register(MaterialType)
 class MaterialTypeAdmin(admin.ModelAdmin):
@@ -31,3 +31,18 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ('payment_method', 'payment_date')
     search_fields = ('purchase__vendor__name', 'transaction_id')
     date_hierarchy = 'payment_date'
+
+@admin.register(VendorPriceHistory)
+class VendorPriceHistoryAdmin(admin.ModelAdmin):
+    list_display = ('product', 'vendor', 'price_per_unit', 'source', 'effective_date')
+    list_filter = ('source', 'material_type', 'unit_type')
+    search_fields = ('product__name', 'vendor__name')
+    date_hierarchy = 'effective_date'
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(BestPrice)
+class BestPriceAdmin(admin.ModelAdmin):
+    list_display = ('material_type', 'unit_type', 'vendor', 'product', 'price_per_unit', 'offer_count')
+    list_filter = ('material_type', 'unit_type')
@@ -0,0 +1,101 @@
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from sync.events import publish_changes
+from .models import Purchase, VendorProduct
+from .pricing import record_purchase_prices
+
+DEFAULT_BATCH_SIZE = 1000
+CENTS = Decimal('0.01')
+
+
+def _batched(iterable, size):
+    """Yield lists of up to size items from any iterable"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def apply_totals(purchases):
+    """Set total_amount on a batch of unsaved or edited purchases in one pass.
+
+    The database computes the stored value; this keeps in-memory objects
+    (and anything summing them before save) consistent with it.
+    """
+    calculate = Purchase.calculate_total
+    for purchase in purchases:
+        purchase.total_amount = calculate(purchase.quantity, purchase.price_per_unit)
+    return purchases
+
+
+def bulk_create_purchases(purchases, batch_size=DEFAULT_BATCH_SIZE):
+    """bulk_create for Purchase that returns objects with correct totals.
+
+    Signals do not fire for bulk inserts, so the prices paid are appended
+    to the price history and change events are published here.
+    """
+    purchases = list(purchases)
+    with transaction.atomic():
+        Purchase.objects.bulk_create(purchases, batch_size=batch_size)
+        record_purchase_prices(purchases)
+        publish_changes('created', purchases)
+    return apply_totals(purchases)
+
+
+def bulk_update_purchases(purchases, fields, batch_size=DEFAULT_BATCH_SIZE):
+    """bulk_update for Purchase; total_amount is recomputed by the database"""
+    purchases = list(purchases)
+    fields = [field for field in fields if field != 'total_amount']
+    updated = Purchase.objects.bulk_update(purchases, fields, batch_size=batch_size)
+    apply_totals(purchases)
+    return updated
+
+
+def ingest_invoice_lines(vendor, lines, purchase_date, batch_size=DEFAULT_BATCH_SIZE, **defaults):
+    """Import supplier invoice lines for one vendor as purchases.
+
+    Each line is a mapping with a product (id or name), quantity and an
+    optional price_per_unit that defaults to the product's current price.
+    Lines are consumed lazily and written in batches inside a single
+    transaction; any invalid line aborts the whole import.
+    """
+    products = {}
+    for product in VendorProduct.objects.filter(vendor=vendor).only('id', 'name', 'price_per_unit'):
+        products[product.id] = product
+        products[product.name] = product
+
+    created = 0
+    total_amount = Decimal('0.00')
+    with transaction.atomic():
+        for batch_no, batch in enumerate(_batched(lines, batch_size)):
+            purchases = []
+            for offset, line in enumerate(batch):
+                index = batch_no * batch_size + offset
+                product = products.get(line.get('product'))
+                if product is None:
+                    raise ValidationError(f"Line {index}: unknown product {line.get('product')!r} for {vendor}")
+                price = line.get('price_per_unit')
+                if price is None:
+                    price = product.price_per_unit
+                try:
+                    quantity = Decimal(str(line['quantity'])).quantize(CENTS)
+                    price = Decimal(str(price)).quantize(CENTS)
+                except (KeyError, InvalidOperation):
+                    raise ValidationError(f'Line {index}: quantity and price_per_unit must be numbers')
+                if not (quantity.is_finite() and price.is_finite()) or quantity <= 0 or price <= 0:
+                    raise ValidationError(f'Line {index}: quantity and price_per_unit must be positive')
+                purchases.append(Purchase(
+                    vendor=vendor,
+                    product=product,
+                    quantity=quantity,
+                    price_per_unit=price,
+                    purchase_date=line.get('purchase_date', purchase_date),
+                    notes=line.get('notes', ''),
+                    **defaults,
+                ))
+            bulk_create_purchases(purchases, batch_size=batch_size)
+            created += len(purchases)
+            total_amount += sum(purchase.total_amount for purchase in purchases)
+
+    return {'created': created, 'total_amount': total_amount}
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-19 18:40
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0001_initial"),
+    ]
+
+    operations = [
+        # Generated columns cannot be altered in place, so the stored total
+        # is dropped and recreated; the database recomputes every row.
+        migrations.RemoveField(
+            model_name="purchase",
+            name="total_amount",
+        ),
+        migrations.AddField(
+            model_name="purchase",
+            name="total_amount",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.CombinedExpression(
+                    models.F("quantity"), "*", models.F("price_per_unit")
+                ),
+                output_field=models.DecimalField(decimal_places=2, max_digits=12),
+            ),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_price_history(apps, schema_editor):
+    """Start each product's history at its current price and build the index"""
+    VendorProduct = apps.get_model('vendors', 'VendorProduct')
+    VendorPriceHistory = apps.get_model('vendors', 'VendorPriceHistory')
+    BestPrice = apps.get_model('vendors', 'BestPrice')
+
+    products = list(VendorProduct.objects.order_by('material_type_id', 'unit_type', 'price_per_unit', 'id'))
+    VendorPriceHistory.objects.bulk_create([
+        VendorPriceHistory(
+            product_id=product.id,
+            vendor_id=product.vendor_id,
+            material_type_id=product.material_type_id,
+            unit_type=product.unit_type,
+            price_per_unit=product.price_per_unit,
+            source='product',
+            effective_date=product.updated_at.date(),
+        )
+        for product in products
+    ])
+
+    best = {}
+    for product in products:
+        key = (product.material_type_id, product.unit_type)
+        if key in best:
+            best[key].offer_count += 1
+        else:
+            best[key] = BestPrice(
+                material_type_id=product.material_type_id,
+                unit_type=product.unit_type,
+                product_id=product.id,
+                vendor_id=product.vendor_id,
+                price_per_unit=product.price_per_unit,
+                offer_count=1,
+            )
+    BestPrice.objects.bulk_create(best.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0002_purchase_total_amount_generated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BestPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_type', models.CharField(choices=[('kg', 'Kilogram'), ('g', 'Gram'), ('l', 'Liter'), ('m', 'Meter'), ('sqm', 'Square Meter'), ('unit', 'Unit'), ('bag', 'Bag')], max_length=10)),
+                ('price_per_unit', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('offer_count', models.PositiveIntegerField(help_text='Number of products competing for this slot')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('material_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_prices', to='vendors.materialtype')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='vendors.vendorproduct')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='vendors.vendor')),
+            ],
+            options={
+                'ordering': ['material_type', 'unit_type'],
+                'unique_together': {('material_type', 'unit_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='VendorPriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_type', models.CharField(choices=[('kg', 'Kilogram'), ('g', 'Gram'), ('l', 'Liter'), ('m', 'Meter'), ('sqm', 'Square Meter'), ('unit', 'Unit'), ('bag', 'Bag')], max_length=10)),
+                ('price_per_unit', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('source', models.CharField(choices=[('product', 'Product Price Change'), ('purchase', 'Purchase')], max_length=10)),
+                ('effective_date', models.DateField()),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('material_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='price_history', to='vendors.materialtype')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='vendors.vendorproduct')),
+                ('purchase', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_history', to='vendors.purchase')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='vendors.vendor')),
+            ],
+            options={
+                'verbose_name_plural': 'Vendor price history',
+                'ordering': ['-effective_date', '-recorded_at'],
+                'indexes': [models.Index(fields=['product', '-effective_date'], name='price_history_product_idx'), models.Index(fields=['material_type', 'unit_type', '-effective_date'], name='price_history_material_idx')],
+            },
+        ),
+        migrations.RunPython(seed_price_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0004_purchase_purchase_updated_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='materialtype',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
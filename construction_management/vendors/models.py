@@ -1,11 +1,12 @@
 from django.db import models
 from django.core.validators import MinValueValidator
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 
 class MaterialType(models.Model):
     """Model for different types of materials vendors can supply"""
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -26,6 +27,9 @@ class Vendor(models.Model):
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='vendor_updated_idx'),
+        ]
 
 class VendorProduct(models.Model):
     """Model for products/services offered by vendors"""
@@ -52,6 +56,14 @@ class VendorProduct(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded price so changes can be logged to price history"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_price = instance.__dict__.get('price_per_unit')
+        instance._loaded_material_type_id = instance.__dict__.get('material_type_id')
+        return instance
+    
     def __str__(self):
         return f"{self.name} - {self.vendor.name}"
     
@@ -82,7 +94,13 @@ class Purchase(models.Model):
         validators=[MinValueValidator(Decimal('0.01'))]
     )
     price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
-    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # Computed by the database so bulk_create, bulk_update and
+    # QuerySet.update can never leave a stale total behind
+    total_amount = models.GeneratedField(
+        expression=models.F('quantity') * models.F('price_per_unit'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
     purchase_date = models.DateField()
     payment_status = models.CharField(
         max_length=10,
@@ -105,16 +123,25 @@ class Purchase(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    @staticmethod
+    def calculate_total(quantity, price_per_unit):
+        """Return the total the database will store for a purchase line"""
+        total = Decimal(str(quantity)) * Decimal(str(price_per_unit))
+        return total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
     def save(self, *args, **kwargs):
-        """Override save to calculate total amount"""
-        self.total_amount = self.quantity * self.price_per_unit
+        """Override save to keep the in-memory total in step with the database"""
         super().save(*args, **kwargs)
+        self.total_amount = self.calculate_total(self.quantity, self.price_per_unit)
     
     def __str__(self):
         return f"Purchase from {self.vendor.name} - {self.purchase_date}"
     
     class Meta:
         ordering = ['-purchase_date']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='purchase_updated_idx'),
+        ]
 
 class Payment(models.Model):
     """Model for tracking payments made to vendors"""
@@ -143,3 +170,54 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-payment_date']
+
+class VendorPriceHistory(models.Model):
+    """Append-only log of vendor product prices"""
+    SOURCE_CHOICES = [
+        ('product', 'Product Price Change'),
+        ('purchase', 'Purchase'),
+    ]
+
+    product = models.ForeignKey(VendorProduct, on_delete=models.CASCADE, related_name='price_history')
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='price_history')
+    material_type = models.ForeignKey(MaterialType, on_delete=models.PROTECT, related_name='price_history')
+    unit_type = models.CharField(max_length=10, choices=VendorProduct.UNIT_CHOICES)
+    price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    purchase = models.ForeignKey(
+        Purchase,
+        on_delete=models.SET_NULL,
+        related_name='price_history',
+        null=True,
+        blank=True
+    )
+    effective_date = models.DateField()
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.product.name} @ PKR {self.price_per_unit} on {self.effective_date}"
+
+    class Meta:
+        ordering = ['-effective_date', '-recorded_at']
+        verbose_name_plural = 'Vendor price history'
+        indexes = [
+            models.Index(fields=['product', '-effective_date'], name='price_history_product_idx'),
+            models.Index(fields=['material_type', 'unit_type', '-effective_date'], name='price_history_material_idx'),
+        ]
+
+class BestPrice(models.Model):
+    """Precomputed cheapest current offer per material type and unit"""
+    material_type = models.ForeignKey(MaterialType, on_delete=models.CASCADE, related_name='best_prices')
+    unit_type = models.CharField(max_length=10, choices=VendorProduct.UNIT_CHOICES)
+    product = models.ForeignKey(VendorProduct, on_delete=models.CASCADE, related_name='+')
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='+')
+    price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
+    offer_count = models.PositiveIntegerField(help_text='Number of products competing for this slot')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.material_type.name} per {self.unit_type}: PKR {self.price_per_unit}"
+
+    class Meta:
+        ordering = ['material_type', 'unit_type']
+        unique_together = ['material_type', 'unit_type']
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class SyncCursorPagination(CursorPagination):
+    """Stable cursor pagination for syncing large vendor lists"""
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
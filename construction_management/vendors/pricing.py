@@ -0,0 +1,73 @@
+from collections import Counter
+from django.db import transaction
+from django.utils import timezone
+from .models import VendorProduct, VendorPriceHistory, BestPrice
+
+
+def record_product_price(product):
+    """Append the product's current catalogue price to its history"""
+    return VendorPriceHistory.objects.create(
+        product=product,
+        vendor_id=product.vendor_id,
+        material_type_id=product.material_type_id,
+        unit_type=product.unit_type,
+        price_per_unit=product.price_per_unit,
+        source='product',
+        effective_date=timezone.localdate(),
+    )
+
+
+def record_purchase_prices(purchases):
+    """Append the prices paid on a batch of saved purchases in one insert"""
+    purchases = [purchase for purchase in purchases if purchase.pk]
+    products = VendorProduct.objects.in_bulk(
+        {purchase.product_id for purchase in purchases}
+    )
+    return VendorPriceHistory.objects.bulk_create([
+        VendorPriceHistory(
+            product_id=purchase.product_id,
+            vendor_id=purchase.vendor_id,
+            material_type_id=products[purchase.product_id].material_type_id,
+            unit_type=products[purchase.product_id].unit_type,
+            price_per_unit=purchase.price_per_unit,
+            source='purchase',
+            purchase_id=purchase.pk,
+            effective_date=purchase.purchase_date,
+        )
+        for purchase in purchases
+    ])
+
+
+def refresh_best_prices(material_type_ids=None):
+    """Rebuild the best-price index for the given material types (or all)"""
+    offers = VendorProduct.objects.order_by(
+        'material_type_id', 'unit_type', 'price_per_unit', 'id'
+    )
+    best_prices = BestPrice.objects.all()
+    if material_type_ids is not None:
+        material_type_ids = set(material_type_ids)
+        offers = offers.filter(material_type_id__in=material_type_ids)
+        best_prices = best_prices.filter(material_type_id__in=material_type_ids)
+
+    best = {}
+    offer_counts = Counter()
+    for product_id, vendor_id, material_type_id, unit_type, price in offers.values_list(
+        'id', 'vendor_id', 'material_type_id', 'unit_type', 'price_per_unit'
+    ):
+        key = (material_type_id, unit_type)
+        offer_counts[key] += 1
+        best.setdefault(key, (product_id, vendor_id, price))
+
+    with transaction.atomic():
+        best_prices.delete()
+        BestPrice.objects.bulk_create([
+            BestPrice(
+                material_type_id=material_type_id,
+                unit_type=unit_type,
+                product_id=product_id,
+                vendor_id=vendor_id,
+                price_per_unit=price,
+                offer_count=offer_counts[(material_type_id, unit_type)],
+            )
+            for (material_type_id, unit_type), (product_id, vendor_id, price) in best.items()
+        ])
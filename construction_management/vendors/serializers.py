@@ -1,7 +1,95 @@
 from rest_framework import serializers
-from .models import Vendor
+from .models import MaterialType, Vendor, VendorProduct, Purchase, Payment, VendorPriceHistory, BestPrice
 
-class VendorSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Limit output to the comma-separated ?fields= list and add ?expand= fields"""
+
+    def get_expanded_fields(self, expand):
+        return {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None:
+            return fields
+        expand = set(filter(None, request.query_params.get('expand', '').split(',')))
+        fields.update(self.get_expanded_fields(expand))
+        wanted = request.query_params.get('fields')
+        if wanted:
+            wanted = set(wanted.split(',')) | {'id'}
+            fields = {name: field for name, field in fields.items() if name in wanted}
+        return fields
+
+class MaterialTypeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MaterialType
+        fields = ['id', 'name', 'description']
+
+class VendorProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = VendorProduct
+        fields = [
+            'id', 'vendor', 'name', 'material_type', 'price_per_unit',
+            'unit_type', 'description', 'created_at', 'updated_at'
+        ]
+
+class NestedVendorProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VendorProduct
+        fields = ['id', 'name', 'material_type', 'price_per_unit', 'unit_type']
+
+class VendorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Vendor
-        fields = '__all__'
+        fields = [
+            'id', 'name', 'contact_person', 'phone', 'email', 'address',
+            'material_types', 'created_at', 'updated_at'
+        ]
+
+    def get_expanded_fields(self, expand):
+        if 'products' in expand:
+            return {'products': NestedVendorProductSerializer(many=True, read_only=True)}
+        return {}
+
+class PurchaseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    total_amount = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Purchase
+        fields = [
+            'id', 'vendor', 'product', 'quantity', 'price_per_unit', 'total_amount',
+            'purchase_date', 'payment_status', 'payment_method', 'transaction_id',
+            'notes', 'created_at', 'updated_at'
+        ]
+
+    def validate(self, attrs):
+        vendor = attrs.get('vendor', getattr(self.instance, 'vendor', None))
+        product = attrs.get('product', getattr(self.instance, 'product', None))
+        if vendor and product and product.vendor_id != vendor.id:
+            raise serializers.ValidationError({'product': 'Product does not belong to this vendor.'})
+        return attrs
+
+class PaymentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Payment
+        fields = [
+            'id', 'purchase', 'amount', 'payment_date', 'payment_method',
+            'transaction_id', 'notes', 'created_at'
+        ]
+
+class BestPriceSerializer(serializers.ModelSerializer):
+    material_type_name = serializers.CharField(source='material_type.name', read_only=True)
+    vendor_name = serializers.CharField(source='vendor.name', read_only=True)
+    product_name = serializers.CharField(source='product.name', read_only=True)
+
+    class Meta:
+        model = BestPrice
+        fields = [
+            'material_type', 'material_type_name', 'unit_type', 'vendor', 'vendor_name',
+            'product', 'product_name', 'price_per_unit', 'offer_count', 'updated_at'
+        ]
+
+class PriceHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VendorPriceHistory
+        fields = ['price_per_unit', 'source', 'purchase', 'effective_date', 'recorded_at']
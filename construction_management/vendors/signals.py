@@ -0,0 +1,32 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import VendorProduct, Purchase
+from .pricing import record_product_price, record_purchase_prices, refresh_best_prices
+
+
+@receiver(post_save, sender=VendorProduct)
+def vendor_product_saved(sender, instance, created, **kwargs):
+    """Log price changes and keep the best-price index current"""
+    loaded_price = getattr(instance, '_loaded_price', None)
+    if created or loaded_price != instance.price_per_unit:
+        record_product_price(instance)
+    affected = {instance.material_type_id}
+    loaded_material_type_id = getattr(instance, '_loaded_material_type_id', None)
+    if loaded_material_type_id:
+        affected.add(loaded_material_type_id)
+    refresh_best_prices(affected)
+    instance._loaded_price = instance.price_per_unit
+    instance._loaded_material_type_id = instance.material_type_id
+
+
+@receiver(post_delete, sender=VendorProduct)
+def vendor_product_deleted(sender, instance, **kwargs):
+    """Drop a deleted product from the best-price index"""
+    refresh_best_prices({instance.material_type_id})
+
+
+@receiver(post_save, sender=Purchase)
+def purchase_saved(sender, instance, created, **kwargs):
+    """Log the price paid on each new purchase"""
+    if created:
+        record_purchase_prices([instance])
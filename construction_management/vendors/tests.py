@@ -1,3 +1,215 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.urls import reverse
+
+from .ingestion import bulk_create_purchases, bulk_update_purchases, ingest_invoice_lines
+from .models import MaterialType, Vendor, VendorProduct, Purchase, VendorPriceHistory, BestPrice
+
+
+class VendorTestMixin:
+    """Shared fixtures for vendor tests"""
+
+    def setUp(self):
+        self.cement = MaterialType.objects.create(name='Cement')
+        self.vendor = Vendor.objects.create(
+            name='Lucky Traders', contact_person='Asif', phone='0300-1111111', address='Lahore'
+        )
+        self.vendor.material_types.add(self.cement)
+        self.product = VendorProduct.objects.create(
+            vendor=self.vendor, name='OPC Cement', material_type=self.cement,
+            price_per_unit=Decimal('1250.00'), unit_type='bag',
+        )
+
+    def make_purchase(self, quantity, price, **kwargs):
+        return Purchase(
+            vendor=self.vendor, product=self.product, quantity=Decimal(quantity),
+            price_per_unit=Decimal(price), purchase_date=kwargs.pop('purchase_date', date(2024, 3, 1)),
+            **kwargs
+        )
+
+
+class PurchaseTotalTests(VendorTestMixin, TestCase):
+    """Totals must hold on every write path, not only Purchase.save"""
+
+    def test_save_sets_total(self):
+        purchase = self.make_purchase('10', '1250.00')
+        purchase.save()
+        self.assertEqual(purchase.total_amount, Decimal('12500.00'))
+        purchase.refresh_from_db()
+        self.assertEqual(purchase.total_amount, Decimal('12500.00'))
+
+    def test_bulk_paths_keep_totals(self):
+        purchases = bulk_create_purchases([self.make_purchase(str(i), '2.50') for i in range(1, 6)])
+        self.assertEqual([p.total_amount for p in purchases], [Decimal(i) * Decimal('2.5') for i in range(1, 6)])
+
+        for purchase in purchases:
+            purchase.quantity += 1
+        bulk_update_purchases(purchases, ['quantity', 'total_amount'])
+        self.assertEqual(purchases[0].total_amount, Decimal('5.00'))
+        self.assertEqual(
+            sorted(Purchase.objects.values_list('total_amount', flat=True)),
+            [Decimal(i) * Decimal('2.5') for i in range(2, 7)],
+        )
+
+        Purchase.objects.update(price_per_unit=Decimal('1.00'))
+        self.assertEqual(
+            sorted(Purchase.objects.values_list('total_amount', flat=True)),
+            [Decimal(i) for i in range(2, 7)],
+        )
+
+    def test_ingest_invoice_lines_in_batches(self):
+        lines = ({'product': 'OPC Cement', 'quantity': '2'} for _ in range(25))
+        result = ingest_invoice_lines(self.vendor, lines, date(2024, 3, 1), batch_size=10)
+        self.assertEqual(result, {'created': 25, 'total_amount': Decimal('62500.00')})
+        self.assertEqual(Purchase.objects.filter(total_amount=Decimal('2500.00')).count(), 25)
+
+    def test_ingest_rejects_whole_invoice_on_bad_line(self):
+        lines = [
+            {'product': self.product.id, 'quantity': '1', 'price_per_unit': '1200'},
+            {'product': 'Unknown', 'quantity': '1'},
+        ]
+        with self.assertRaises(ValidationError):
+            ingest_invoice_lines(self.vendor, lines, date(2024, 3, 1))
+        self.assertFalse(Purchase.objects.exists())
+
+    def test_ingest_rejects_explicit_non_positive_prices(self):
+        for price, message in ((0, 'must be positive'), ('-5', 'must be positive'),
+                               ('NaN', 'must be positive'), ('', 'must be numbers')):
+            lines = [{'product': self.product.id, 'quantity': '1', 'price_per_unit': price}]
+            with self.assertRaisesMessage(ValidationError, message):
+                ingest_invoice_lines(self.vendor, lines, date(2024, 3, 1))
+        self.assertFalse(Purchase.objects.exists())
+
+
+class PriceHistoryTests(VendorTestMixin, TestCase):
+    """Price history logging and the best-price index"""
+
+    def setUp(self):
+        super().setUp()
+        self.rival = Vendor.objects.create(
+            name='Bestway Depot', contact_person='Hina', phone='0300-2222222', address='Multan'
+        )
+        self.rival_product = VendorProduct.objects.create(
+            vendor=self.rival, name='Bestway OPC', material_type=self.cement,
+            price_per_unit=Decimal('1300.00'), unit_type='bag',
+        )
+
+    def test_product_price_changes_are_appended(self):
+        product = VendorProduct.objects.get(pk=self.product.pk)
+        product.description = 'Grade 53'
+        product.save()
+        self.assertEqual(product.price_history.count(), 1)
+        product.price_per_unit = Decimal('1275.00')
+        product.save()
+        self.assertEqual(
+            list(product.price_history.order_by('recorded_at').values_list('price_per_unit', flat=True)),
+            [Decimal('1250.00'), Decimal('1275.00')],
+        )
+
+    def test_purchases_are_logged_on_save_and_bulk(self):
+        self.make_purchase('3', '1240.00').save()
+        bulk_create_purchases([self.make_purchase('1', '1235.00'), self.make_purchase('2', '1230.00')])
+        self.assertEqual(
+            sorted(VendorPriceHistory.objects.filter(source='purchase').values_list('price_per_unit', flat=True)),
+            [Decimal('1230.00'), Decimal('1235.00'), Decimal('1240.00')],
+        )
+
+    def test_best_price_index_follows_catalogue(self):
+        best = BestPrice.objects.get(material_type=self.cement, unit_type='bag')
+        self.assertEqual((best.product_id, best.offer_count), (self.product.id, 2))
+
+        self.rival_product.price_per_unit = Decimal('1200.00')
+        self.rival_product.save()
+        best = BestPrice.objects.get(material_type=self.cement, unit_type='bag')
+        self.assertEqual((best.vendor_id, best.price_per_unit), (self.rival.id, Decimal('1200.00')))
+
+        self.rival_product.delete()
+        best = BestPrice.objects.get(material_type=self.cement, unit_type='bag')
+        self.assertEqual((best.product_id, best.offer_count), (self.product.id, 1))
+
+    def test_lookup_api(self):
+        user = get_user_model().objects.create_user(email='buyer@example.com', password='test-pass-123')
+        self.client.force_login(user)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('best_price_list'), {'material_type': self.cement.id})
+        self.assertEqual(response.json()[0]['vendor_name'], 'Lucky Traders')
+
+        response = self.client.get(reverse('best_price_list'), {'material_type': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(reverse('vendor-product-price-history', args=[self.product.id]))
+        self.assertEqual(response.json()['history'][0]['price_per_unit'], '1250.00')
+
+
+class VendorApiTests(VendorTestMixin, TestCase):
+    """The vendors DRF API: pagination, prefetching, sparse fields and filters"""
+
+    def setUp(self):
+        super().setUp()
+        self.steel = MaterialType.objects.create(name='Steel')
+        for i in range(30):
+            vendor = Vendor.objects.create(
+                name=f'Vendor {i:03d}', contact_person='Contact', phone='0300', address='Site'
+            )
+            vendor.material_types.add(self.steel if i % 2 else self.cement)
+            VendorProduct.objects.create(
+                vendor=vendor, name=f'Product {i}', material_type=self.steel,
+                price_per_unit=Decimal('100.00'), unit_type='kg',
+            )
+        user = get_user_model().objects.create_user(email='sync@example.com', password='test-pass-123')
+        self.client.force_login(user)
+
+    def test_vendor_list_is_cursor_paginated_with_fixed_queries(self):
+        # session, user, ETag watermarks, vendors, prefetched material types and products
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/vendors/', {'page_size': 20, 'expand': 'products'})
+        payload = response.json()
+        self.assertEqual(len(payload['results']), 20)
+        self.assertEqual(len(payload['results'][1]['products']), 1)
+        self.assertIsNotNone(payload['next'])
+        remaining = self.client.get(payload['next']).json()
+        self.assertEqual(len(remaining['results']), 11)
+        self.assertIsNone(remaining['next'])
+
+    def test_old_double_prefix_is_gone(self):
+        self.assertEqual(self.client.get('/api/vendors/api/vendors/').status_code, 404)
+
+    def test_sparse_fieldsets(self):
+        payload = self.client.get('/api/vendors/', {'fields': 'name,material_types'}).json()
+        self.assertEqual(set(payload['results'][0]), {'id', 'name', 'material_types'})
+
+    def test_filters(self):
+        payload = self.client.get('/api/vendors/', {'material_type': self.cement.id, 'page_size': 100}).json()
+        self.assertEqual(len(payload['results']), 16)
+
+        self.make_purchase('1', '1250.00', payment_status='paid').save()
+        self.make_purchase('2', '1250.00').save()
+        payload = self.client.get('/api/vendors/purchases/', {'payment_status': 'paid'}).json()
+        self.assertEqual([p['total_amount'] for p in payload['results']], ['1250.00'])
+        payload = self.client.get('/api/vendors/purchases/', {'material_type': self.steel.id}).json()
+        self.assertEqual(payload['results'], [])
+
+    def test_malformed_filters_are_rejected(self):
+        for url, params in (
+            ('/api/vendors/', {'material_type': 'abc'}),
+            ('/api/vendors/products/', {'vendor': 'abc'}),
+            ('/api/vendors/products/', {'material_type': 'abc'}),
+            ('/api/vendors/purchases/', {'product': '1.5'}),
+            ('/api/vendors/payments/', {'purchase': 'x'}),
+            (reverse('vendor-product-price-history', args=[self.product.id]), {'since': 'garbage'}),
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, (url, params))
+            self.assertIn(next(iter(params)), response.json())
 
-# Create your tests here.
+    def test_purchase_rejects_product_from_another_vendor(self):
+        other = Vendor.objects.exclude(pk=self.vendor.pk).first()
+        response = self.client.post('/api/vendors/purchases/', {
+            'vendor': other.id, 'product': self.product.id, 'quantity': '1',
+            'price_per_unit': '10.00', 'purchase_date': '2024-03-01',
+        })
+        self.assertEqual(response.status_code, 400)
@@ -1,10 +1,20 @@
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
-from .views import VendorViewSet
+from rest_framework.routers import SimpleRouter
+from .views import (
+    MaterialTypeViewSet, VendorViewSet, VendorProductViewSet,
+    PurchaseViewSet, PaymentViewSet, best_price_list
+)
 
-router = DefaultRouter()
-router.register(r'vendors', VendorViewSet, basename='vendor')
+# Mounted at /api/vendors/; vendors themselves sit at the root of that
+# prefix, so they are registered last with a numeric-only lookup.
+router = SimpleRouter()
+router.register(r'material-types', MaterialTypeViewSet, basename='material-type')
+router.register(r'products', VendorProductViewSet, basename='vendor-product')
+router.register(r'purchases', PurchaseViewSet, basename='purchase')
+router.register(r'payments', PaymentViewSet, basename='payment')
+router.register(r'', VendorViewSet, basename='vendor')
 
 urlpatterns = [
-    path('api/', include(router.urls)),
+    path('best-prices/', best_price_list, name='best_price_list'),
+    path('', include(router.urls)),
 ]
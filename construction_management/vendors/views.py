@@ -1,12 +1,128 @@
-from rest_framework import viewsets, permissions
-from .models import Vendor
-from .serializers import VendorSerializer
+from datetime import date
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import api_view, action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from django.db.models import Prefetch
+from idempotency.keys import IdempotentCreateMixin
+from .models import MaterialType, Vendor, VendorProduct, Purchase, Payment, BestPrice
+from .pagination import SyncCursorPagination
+from .serializers import (
+    MaterialTypeSerializer, VendorSerializer, VendorProductSerializer,
+    PurchaseSerializer, PaymentSerializer, BestPriceSerializer, PriceHistorySerializer
+)
+
+PRICE_HISTORY_LIMIT = 500
+
+def _expanded(request):
+    return set(filter(None, request.query_params.get('expand', '').split(',')))
+
+def _query_param(request, param, parse=str):
+    """Parse a query parameter, answering 400 rather than letting a bad value reach the database"""
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    try:
+        return parse(value)
+    except ValueError:
+        raise ValidationError({param: f'Invalid value: {value!r}'})
+
+def _filtered(queryset, request, filters):
+    """Apply (param, lookup, parse) filters for the query parameters present"""
+    for param, lookup, parse in filters:
+        value = _query_param(request, param, parse)
+        if value is not None:
+            queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+class MaterialTypeViewSet(viewsets.ModelViewSet):
+    queryset = MaterialType.objects.all()
+    serializer_class = MaterialTypeSerializer
+    permission_classes = [permissions.IsAuthenticated]
 
 class VendorViewSet(viewsets.ModelViewSet):
-    queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SyncCursorPagination
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        vendors = Vendor.objects.prefetch_related('material_types')
+        if 'products' in _expanded(self.request):
+            vendors = vendors.prefetch_related(
+                Prefetch('products', queryset=VendorProduct.objects.order_by('name'))
+            )
+        return _filtered(vendors, self.request, (('material_type', 'material_types__id', int),))
+
+    @action(detail=True, methods=['get', 'post'])
+    def products(self, request, pk=None):
+        """List or add products for one vendor"""
+        vendor = self.get_object()
+        if request.method == 'POST':
+            serializer = VendorProductSerializer(
+                data={**request.data, 'vendor': vendor.id}, context=self.get_serializer_context()
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        products = vendor.products.all()
+        return Response(VendorProductSerializer(
+            products, many=True, context=self.get_serializer_context()
+        ).data)
+
+class VendorProductViewSet(viewsets.ModelViewSet):
+    serializer_class = VendorProductSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SyncCursorPagination
 
     def get_queryset(self):
-        # Optionally filter by user or other criteria
-        return super().get_queryset()
+        return _filtered(VendorProduct.objects.all(), self.request, (
+            ('vendor', 'vendor_id', int), ('material_type', 'material_type_id', int),
+            ('unit_type', 'unit_type', str),
+        ))
+
+    @action(detail=True, methods=['get'], url_path='price-history')
+    def price_history(self, request, pk=None):
+        """Price movements for one vendor product, newest first"""
+        product = self.get_object()
+        history = _filtered(product.price_history.all(), request, (
+            ('since', 'effective_date__gte', date.fromisoformat),
+        ))
+        return Response({
+            'product': product.id,
+            'current_price': str(product.price_per_unit),
+            'history': PriceHistorySerializer(history[:PRICE_HISTORY_LIMIT], many=True).data,
+        })
+
+class PurchaseViewSet(viewsets.ModelViewSet):
+    serializer_class = PurchaseSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SyncCursorPagination
+
+    def get_queryset(self):
+        return _filtered(Purchase.objects.all(), self.request, (
+            ('vendor', 'vendor_id', int), ('product', 'product_id', int),
+            ('material_type', 'product__material_type_id', int),
+            ('payment_status', 'payment_status', str),
+        ))
+
+class PaymentViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
+    serializer_class = PaymentSerializer
+    idempotency_scope = 'vendors:payment'
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SyncCursorPagination
+
+    def get_queryset(self):
+        return _filtered(Payment.objects.all(), self.request, (
+            ('purchase', 'purchase_id', int), ('vendor', 'purchase__vendor_id', int),
+            ('payment_status', 'purchase__payment_status', str),
+            ('payment_method', 'payment_method', str),
+        ))
+
+@api_view(['GET'])
+def best_price_list(request):
+    """Cheapest current offer per material type and unit from the precomputed index"""
+    best_prices = _filtered(BestPrice.objects.select_related('material_type', 'vendor', 'product'), request, (
+        ('material_type', 'material_type_id', int), ('unit_type', 'unit_type', str),
+    ))
+    return Response(BestPriceSerializer(best_prices, many=True).data)
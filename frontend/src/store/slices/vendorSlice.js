@@ -9,10 +9,17 @@ export const fetchVendors = createAsyncThunk(
   async (_, { rejectWithValue }) => {
     try {
       const token = localStorage.getItem('token');
-      const response = await axios.get(`${API_URL}/vendors/`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      return response.data;
+      // The vendors API is cursor-paginated; follow `next` until exhausted
+      const vendors = [];
+      let url = `${API_URL}/vendors/?page_size=1000`;
+      while (url) {
+        const response = await axios.get(url, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        vendors.push(...response.data.results);
+        url = response.data.next;
+      }
+      return vendors;
     } catch (error) {
       return rejectWithValue(error.response.data);
     }